@@ -1,5 +1,17 @@
+from clustree._cache import ClustreeCache
+from clustree._clustree_graph import ClustreeGraph
 from clustree._graph import clustree
+from clustree._images import clear_image_cache, image_cache_info, set_image_cache_size
+from clustree._model import ClustreeModel
+from clustree._profile import Profiler
 
 __all__ = [
     "clustree",
+    "ClustreeModel",
+    "ClustreeCache",
+    "ClustreeGraph",
+    "image_cache_info",
+    "clear_image_cache",
+    "set_image_cache_size",
+    "Profiler",
 ]
@@ -0,0 +1,144 @@
+from collections.abc import Mapping, Sequence
+
+import numpy as np
+
+# aggregates computed by aggregate_nodes: moments by np.bincount, order statistics
+# by sorting
+MOMENT_AGGREGATES = ("count", "sum", "mean", "std")
+ORDER_AGGREGATES = ("min", "max", "median")
+AGGREGATES = MOMENT_AGGREGATES + ORDER_AGGREGATES
+
+
+def local_node_index(
+    column: np.ndarray, k: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Position of each sample's node among the nodes of one resolution.
+
+    Parameters
+    ----------
+    column : ndarray
+        Cluster membership at the resolution.
+    k : ndarray
+        Sorted cluster numbers of the nodes of the resolution.
+
+    Returns
+    -------
+        Index into k of the cluster of each sample, and whether the cluster of each \
+        sample is present in k. Indexes are stored in the smallest unsigned integer \
+        type that holds them, so that sorting by them uses radix sort.
+    """
+    column = np.asarray(column).astype(np.intp, copy=False)
+    dtype = np.uint16 if len(k) <= np.iinfo(np.uint16).max else np.intp
+    size = max(int(column.max(initial=0)), int(k.max(initial=0))) + 1
+    lut = np.zeros(size, dtype=dtype)
+    present = np.zeros(size, dtype=bool)
+    lut[k] = np.arange(len(k))
+    present[k] = True
+    return lut[column], present[column]
+
+
+def aggregate_nodes(
+    membership: Sequence[np.ndarray],
+    columns: Mapping[str, np.ndarray],
+    node_res: np.ndarray,
+    node_k: np.ndarray,
+    aggregates: Sequence[str] = AGGREGATES,
+) -> dict[tuple[str, str], np.ndarray]:
+    """
+
+    Parameters
+    ----------
+    membership : Sequence[ndarray]
+        Cluster membership, one array per resolution.
+    columns : Mapping[str, ndarray]
+        Numeric metadata columns, one value per sample, by name.
+    node_res, node_k : ndarray
+        Resolution (1, ..., kk) and cluster number of each node, ordered by \
+        (res, k).
+    aggregates : Sequence[str]
+        Aggregates required, from AGGREGATES. Moments (count, sum, mean, std) and \
+        order statistics (min, max, median) are each computed together, so all of \
+        a group are returned if any of it is required.
+
+    Returns
+    -------
+        Aggregates of every column, by (column, aggregate), each as an array with \
+        one entry per node. NaN values are skipped and aggregates \
+        of nodes without values are NaN (0 for count and sum), and std has one \
+        degree of freedom, as for pandas' groupby.
+
+    Notes
+    -------
+    Per resolution, count, sum and sum of squared deviations are found with \
+    np.bincount over the index of each sample's node. For order statistics, each \
+    column is sorted once, then per resolution its sorted values are stably sorted \
+    by node index, so that each node's values form a sorted run. Node indexes are \
+    local to the resolution, so usually fit in 16 bits and are sorted by radix \
+    sort in linear time. All aggregates of all columns are thus computed in one \
+    pass over the resolutions, rather than one groupby per resolution, column and \
+    aggregate.
+    """
+    unknown = set(aggregates) - set(AGGREGATES)
+    if unknown:
+        raise ValueError(f"unknown aggregates {sorted(unknown)}, use {AGGREGATES}")
+    moments = any(aggr in MOMENT_AGGREGATES for aggr in aggregates)
+    order_stats = any(aggr in ORDER_AGGREGATES for aggr in aggregates)
+    required = (MOMENT_AGGREGATES if moments else ()) + (
+        ORDER_AGGREGATES if order_stats else ()
+    )
+    n_nodes = len(node_res)
+    bounds = np.searchsorted(node_res, np.arange(1, len(membership) + 2))
+    index = []
+    for k_upper, column in enumerate(membership, 1):
+        start, stop = bounds[k_upper - 1], bounds[k_upper]
+        local, present = local_node_index(column=column, k=node_k[start:stop])
+        if not present.all():
+            raise KeyError(
+                f"cluster numbers at resolution {k_upper} missing from node table"
+            )
+        index.append(local)
+
+    out = {}
+    for name, values in columns.items():
+        values = np.asarray(values, dtype=float)
+        valid = ~np.isnan(values)
+        all_valid = bool(valid.all())
+        weights = None if all_valid else valid.astype(float)
+        filled = values if all_valid else np.where(valid, values, 0.0)
+        if order_stats:
+            order = np.argsort(values, kind="stable")[: int(valid.sum())]  # NaN last
+            sorted_values = values[order]
+        aggs = {aggr: np.full(n_nodes, np.nan) for aggr in required}
+        for k_upper, local in enumerate(index, 1):
+            start, stop = bounds[k_upper - 1], bounds[k_upper]
+            rows = np.arange(start, stop)
+            count = np.bincount(local, weights=weights, minlength=stop - start)
+            count = count.astype(np.intp)
+            has = count > 0
+            if moments:
+                total = np.bincount(local, weights=filled, minlength=stop - start)
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    mean = total / count
+                    dev = filled - mean[local]
+                    if not all_valid:
+                        dev[~valid] = 0
+                    m2 = np.bincount(local, weights=dev * dev, minlength=stop - start)
+                    std = np.sqrt(m2 / (count - 1))
+                aggs["count"][rows] = count
+                aggs["sum"][rows] = total
+                aggs["mean"][rows[has]] = mean[has]
+                aggs["std"][rows[count > 1]] = std[count > 1]
+            if order_stats:
+                # values of each node as a sorted run, runs ordered by node
+                runs = sorted_values[np.argsort(local[order], kind="stable")]
+                stops = np.cumsum(count)
+                starts = stops - count
+                lo = (starts + (count - 1) // 2)[has]
+                hi = (starts + count // 2)[has]
+                aggs["min"][rows[has]] = runs[starts[has]]
+                aggs["max"][rows[has]] = runs[stops[has] - 1]
+                aggs["median"][rows[has]] = (runs[lo] + runs[hi]) / 2
+        for aggr, agg in aggs.items():
+            out[(name, aggr)] = agg
+    return out
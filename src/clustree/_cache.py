@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from clustree._clustree_typing import DATA_INPUT_TYPE
+
+CACHE_VERSION = 5
+CACHE_SUFFIX = ".npz"
+DIGEST_SUFFIX = ".digest"
+_BLOCK_SIZE = 1 << 20
+
+
+def digest_file(path: Union[str, Path]) -> str:
+    """Hash of the bytes of a file, read in blocks so that the file is never parsed \
+    or held in memory."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(_BLOCK_SIZE):
+            h.update(block)
+    return h.hexdigest()
+
+
+def digest_membership(columns: list[np.ndarray]) -> str:
+    """Hash of the values of cluster membership (and metadata) columns, one column \
+    at a time. Columns of Python objects, e.g. strings, are hashed by value."""
+    h = hashlib.sha256()
+    for column in columns:
+        column = np.ascontiguousarray(column)
+        h.update(f"{column.dtype.str}{column.shape}".encode())
+        if column.dtype.hasobject:
+            column = pd.util.hash_array(column.reshape(-1))
+        h.update(memoryview(column).cast("B"))
+    return h.hexdigest()
+
+
+class ClustreeCache:
+    """
+    Directory of counted clustree tables, stored as one .npz file per input. \
+    Each file holds node and edge tables, node values aggregated from metadata and \
+    layout positions, so that reloading a clustree whose input is unchanged takes \
+    milliseconds rather than re-reading and re-counting the data.
+
+    Entries are keyed by a content hash of the input, plus the parameters that \
+    change the counts (prefix, membership columns, count_col and edge pruning). Files \
+    are hashed byte for byte, so no parsing is needed to look up a path, and the \
+    hash of a file is remembered under its path, size and modification time, so \
+    that an unchanged file is not read again to look it up. In-memory tables are \
+    keyed by all their columns, as metadata aggregates are stored alongside the \
+    counts. Aggregates are stored by column and aggregate name within an entry, \
+    so one entry serves every node_color_aggr.
+
+    Parameters
+    ----------
+    path : Union[Path, str]
+        Cache directory, created if it does not exist.
+    max_bytes : int, optional
+        Least recently used entries are evicted once the total size of the cache \
+        exceeds max_bytes. Defaults to 1 GiB. If None, the cache is not limited by \
+        size.
+    max_age : float, optional
+        Entries not used for max_age seconds are evicted. If None, the default, the \
+        cache is not limited by age.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        max_bytes: Optional[int] = 1 << 30,
+        max_age: Optional[float] = None,
+    ):
+        self.path = Path(path).expanduser()
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def key(self, data: DATA_INPUT_TYPE, membership: list[np.ndarray], **params) -> str:
+        """Cache key of data, whose membership (and metadata) columns are given, \
+        and params."""
+        if isinstance(data, (str, Path)):
+            digest = self._file_digest(path=data)
+        else:
+            digest = digest_membership(membership)
+        params = json.dumps(
+            {"version": CACHE_VERSION, **params}, sort_keys=True, default=str
+        )
+        return hashlib.sha256(f"{digest}{params}".encode()).hexdigest()
+
+    def _file_digest(self, path: Union[str, Path]) -> str:
+        """digest_file of path, remembered under its resolved path, size and \
+        modification time, so that an unchanged file is hashed only once."""
+        path = Path(path).resolve()
+        stat = path.stat()
+        stat_key = hashlib.sha256(
+            f"{path}{stat.st_size}{stat.st_mtime_ns}".encode()
+        ).hexdigest()
+        alias = self.path / f"{stat_key}{DIGEST_SUFFIX}"
+        try:
+            digest = alias.read_text()
+            os.utime(alias)  # mark as recently used
+            return digest
+        except (FileNotFoundError, OSError):
+            pass
+        digest = digest_file(path)
+        tmp = alias.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(digest)
+        os.replace(tmp, alias)
+        return digest
+
+    def _entry(self, key: str) -> Path:
+        return self.path / f"{key}{CACHE_SUFFIX}"
+
+    def load(self, key: str) -> Optional[dict[str, np.ndarray]]:
+        """Arrays stored under key, or None if there is no such entry."""
+        entry = self._entry(key)
+        try:
+            with np.load(entry, allow_pickle=False) as npz:
+                arrays = {name: npz[name] for name in npz.files}
+        except (FileNotFoundError, OSError, ValueError):
+            return None
+        os.utime(entry)  # mark as recently used
+        return arrays
+
+    def save(self, key: str, arrays: dict[str, Any]) -> None:
+        """Store arrays under key, replacing any existing entry, then evict."""
+        entry = self._entry(key)
+        tmp = entry.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, entry)  # readers never see a partially written entry
+        self.evict(keep=entry)
+
+    def evict(self, keep: Optional[Path] = None) -> list[Path]:
+        """Remove entries older than max_age, then least recently used entries until \
+        the cache is no larger than max_bytes. Remembered file digests are evicted \
+        alike. Returns the paths removed."""
+        entries = []
+        paths = [
+            *self.path.glob(f"*{CACHE_SUFFIX}"),
+            *self.path.glob(f"*{DIGEST_SUFFIX}"),
+        ]
+        for entry in paths:
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:  # removed concurrently
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+        entries.sort()
+
+        removed = []
+        now = time.time()
+        total = sum(size for _, size, _ in entries)
+        for mtime, size, entry in entries:
+            expired = self.max_age is not None and now - mtime > self.max_age
+            too_big = self.max_bytes is not None and total > self.max_bytes
+            if not (expired or too_big) or entry == keep:
+                continue
+            entry.unlink(missing_ok=True)
+            removed.append(entry)
+            total -= size
+        return removed
@@ -0,0 +1,206 @@
+import copy
+from typing import TYPE_CHECKING, Any, Optional, Union
+
+import numpy as np
+
+from clustree._tables import EdgeTable, NodeTable, _Table
+
+if TYPE_CHECKING:
+    import igraph as ig
+    from networkx import DiGraph
+    from scipy.sparse import csr_array
+
+    from clustree._config import ClustreeConfig
+
+
+def _columns(table: _Table) -> dict[str, list[Any]]:
+    """Computed columns of table as lists of Python values, RGBA rows as tuples."""
+    out = {}
+    for name in table.columns:
+        col: Optional[np.ndarray] = getattr(table, name)
+        if col is None:
+            continue
+        out[name] = list(map(tuple, col.tolist())) if col.ndim == 2 else col.tolist()
+    return out
+
+
+def _attr_dicts(table: _Table) -> list[dict[str, Any]]:
+    """Attributes of each row of table as a dict, as TableView gives them."""
+    columns = _columns(table)
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*columns.values())]
+
+
+def _import_scipy_sparse():
+    try:
+        import scipy.sparse as sparse
+    except ImportError as e:  # pragma: no cover
+        raise ImportError(
+            "converting a clustree to a sparse adjacency matrix requires scipy, "
+            "install it with 'pip install clustree[sparse]'"
+        ) from e
+    return sparse
+
+
+class ClustreeGraph:
+    """
+    Clustree graph backed by the node and edge tables it was built from.
+
+    Node ids are dense, so node i is row i of nodes, and edge j is row j of edges, \
+    with edges.start and edges.end holding node ids. Drawing reads these arrays \
+    directly, so a clustree can be laid out and drawn without building Python \
+    objects per node or edge. Conversions to networkx, igraph or a scipy sparse \
+    adjacency matrix are built on request.
+
+    Parameters
+    ----------
+    nodes : NodeTable
+        Nodes, ordered by (res, k).
+    edges : EdgeTable
+        Edges, ordered by (res, k_end, k_start).
+    resolutions : list[str], optional
+        Resolution of each membership column as named, e.g. '0.4' for \
+        'leiden_0.4', used to name node images.
+    """
+
+    def __init__(
+        self,
+        nodes: NodeTable,
+        edges: EdgeTable,
+        resolutions: Optional[list[str]] = None,
+    ):
+        self.nodes = nodes
+        self.edges = edges
+        self.resolutions = resolutions
+        self._networkx: Optional["DiGraph"] = None
+
+    @classmethod
+    def from_config(cls, cf: "ClustreeConfig") -> "ClustreeGraph":
+        """Snapshot of the nodes and edges of cf, with their current colors. \
+        Restyling cf assigns new color arrays, so does not change the snapshot."""
+        return cls(
+            nodes=copy.copy(cf.nodes),
+            edges=copy.copy(cf.edges),
+            resolutions=cf.resolutions,
+        )
+
+    @classmethod
+    def from_networkx(cls, dg: "DiGraph") -> "ClustreeGraph":
+        """Inverse of to_networkx. Node ids of dg must be 0, ..., n - 1."""
+        n = dg.number_of_nodes()
+        nodes = sorted(dg.nodes)
+        if nodes != list(range(n)):
+            raise ValueError("node ids must be 0, ..., n - 1")
+        node_attrs = [dg.nodes[v] for v in nodes]
+        node_table = NodeTable(
+            res=[attr["res"] for attr in node_attrs],
+            k=[attr["k"] for attr in node_attrs],
+        )
+        for name in ("samples", "node_color"):
+            if node_attrs and all(name in attr for attr in node_attrs):
+                setattr(node_table, name, np.array([a[name] for a in node_attrs]))
+
+        edges = list(dg.edges(data=True))
+        edge_table = EdgeTable(
+            res=[node_table.res[end] for _, end, _ in edges],
+            start=[start for start, _, _ in edges],
+            end=[end for _, end, _ in edges],
+            samples=[attr.get("samples", 0) for *_, attr in edges],
+            in_prop=[attr.get("in_prop", np.nan) for *_, attr in edges],
+        )
+        if edges and all("edge_color" in attr for *_, attr in edges):
+            edge_table.edge_color = np.array(
+                [attr["edge_color"] for *_, attr in edges], dtype=float
+            )
+        return cls(
+            nodes=node_table,
+            edges=edge_table,
+            resolutions=dg.graph.get("resolutions"),
+        )
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def number_of_nodes(self) -> int:
+        return len(self.nodes)
+
+    def number_of_edges(self) -> int:
+        return len(self.edges)
+
+    def has_networkx(self) -> bool:
+        """Whether to_networkx has been built already."""
+        return self._networkx is not None
+
+    def to_networkx(self) -> "DiGraph":
+        """
+        networkx DiGraph with the attributes of each node ('k', 'res', 'samples', \
+        'node_color') and edge ('res', 'start', 'end', 'samples', 'in_prop', \
+        'edge_color'), and the graph attribute 'resolutions'. Built on the first \
+        call and returned by later calls.
+        """
+        if self._networkx is None:
+            from networkx import DiGraph
+
+            dg = DiGraph(resolutions=self.resolutions)
+            dg.add_nodes_from(zip(self.nodes.ids.tolist(), _attr_dicts(self.nodes)))
+            dg.add_edges_from(
+                zip(
+                    self.edges.start.tolist(),
+                    self.edges.end.tolist(),
+                    _attr_dicts(self.edges),
+                )
+            )
+            self._networkx = dg
+        return self._networkx
+
+    def to_igraph(self) -> "ig.Graph":
+        """Directed igraph Graph, whose vertex and edge indexes are the node and edge \
+        ids, with the same attributes as to_networkx. Built in one call from the \
+        edge arrays."""
+        import igraph as ig
+
+        return ig.Graph(
+            n=len(self.nodes),
+            edges=np.column_stack([self.edges.start, self.edges.end]).tolist(),
+            directed=True,
+            graph_attrs={"resolutions": self.resolutions},
+            vertex_attrs=_columns(self.nodes),
+            edge_attrs=_columns(self.edges),
+        )
+
+    def to_scipy(self, weight: Optional[str] = "samples") -> "csr_array":
+        """
+        Parameters
+        ----------
+        weight : str, optional
+            Numeric edge column, e.g. 'samples' or 'in_prop', giving the value of \
+            each edge. If None, each edge has value 1.
+
+        Returns
+        -------
+            Sparse adjacency matrix of shape (n_nodes, n_nodes), in CSR format, \
+            whose entry (start, end) is the value of the edge from start to end.
+        """
+        sparse = _import_scipy_sparse()
+        n = len(self.nodes)
+        if weight is None:
+            values = np.ones(len(self.edges), dtype=np.int64)
+        elif weight in ("samples", "in_prop", "res"):
+            values = getattr(self.edges, weight)
+        else:
+            raise ValueError(
+                f"unknown weight '{weight}', use 'samples', 'in_prop', 'res' or None"
+            )
+        return sparse.csr_array(
+            (values, (self.edges.start, self.edges.end)), shape=(n, n)
+        )
+
+
+GRAPH_INPUT_TYPE = Union[ClustreeGraph, "DiGraph"]
+
+
+def as_clustree_graph(graph: GRAPH_INPUT_TYPE) -> ClustreeGraph:
+    """graph as a ClustreeGraph, converting a networkx DiGraph."""
+    if isinstance(graph, ClustreeGraph):
+        return graph
+    return ClustreeGraph.from_networkx(graph)
@@ -1,28 +1,40 @@
+from collections.abc import Mapping
 from pathlib import Path
-from typing import Any, Callable, Literal, Optional, Union
+from typing import TYPE_CHECKING, Any, Callable, Literal, Optional, Union, get_args
 
-import matplotlib as mpl
+import numpy as np
 import pandas as pd
 
+if TYPE_CHECKING:
+    import matplotlib as mpl
+    import pyarrow as pa
+
 OUTPUT_PATH_TYPE = Optional[Union[str, Path]]
 
-NODE_CONFIG_TYPE = [
-    int,  # (K, k) hashed
-    dict[str, Any],  # 'color': XYZ, 'samples': 75, 'image': np.array
+NODE_CONFIG_TYPE = Mapping[
+    int,  # node id, i.e. position in node table, see clustree._hash.lookup_node_ids
+    dict[str, Any],  # 'k', 'res', 'samples', 'node_color'
 ]
 
-EDGE_CONFIG_TYPE = [
-    int,  # (K, k_start, k_end) hashed
-    dict[str, Any],  # 'color', 'samples', 'alpha', 'start', 'end', 'res'
+EDGE_CONFIG_TYPE = Mapping[
+    int,  # edge id, i.e. position in edge table
+    dict[str, Any],  # 'res', 'start', 'end', 'samples', 'in_prop', 'edge_color'
 ]
 
-DATA_INPUT_TYPE = Union[str, Path, pd.DataFrame]
+TABLE_TYPE = Union[pd.DataFrame, np.ndarray, "pa.Table", "pa.RecordBatch"]
+DATA_INPUT_TYPE = Union[str, Path, TABLE_TYPE]
 IMAGE_INPUT_TYPE = Union[str, Path]
 ORIENTATION_INPUT_TYPE = Literal["vertical", "horizontal"]
+LAYOUT_INPUT_TYPE = Literal["tidy", "layered", "igraph", "multipartite"]
+LAYOUTS = get_args(LAYOUT_INPUT_TYPE)
+GRAPH_TYPE = Literal["networkx", "clustree"]
+GRAPH_TYPES = get_args(GRAPH_TYPE)
 MIN_CLUSTER_NUMBER_TYPE = Optional[Literal[0, 1]]
 CIRCLE_POS_TYPE = Optional[Literal["tl", "t", "tr", "l", "r", "bl", "b", "br"]]
 
 NODE_COLOR_TYPE = str  # e.g. 'samples', 'K', data col name
 EDGE_COLOR_TYPE = str
 COLOR_AGG_TYPE = Optional[Union[Callable, str]]
-CMAP_TYPE = Union[mpl.colors.Colormap, str]
+CMAP_TYPE = Union["mpl.colors.Colormap", str]
+NORM_TYPE = Literal["linear", "log", "quantile"]
+NORMS = get_args(NORM_TYPE)
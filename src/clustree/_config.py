@@ -1,22 +1,56 @@
-from collections import defaultdict
-from typing import Optional
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from typing import TYPE_CHECKING, Any, Optional, Union
 
-import matplotlib as mpl
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
-from matplotlib.cm import ScalarMappable
+from pandas.api.types import is_numeric_dtype
 
+from clustree._aggregate import AGGREGATES, aggregate_nodes
 from clustree._clustree_typing import (
     CMAP_TYPE,
     COLOR_AGG_TYPE,
+    DATA_INPUT_TYPE,
     EDGE_COLOR_TYPE,
     EDGE_CONFIG_TYPE,
     NODE_COLOR_TYPE,
     NODE_CONFIG_TYPE,
+    NORM_TYPE,
+    TABLE_TYPE,
 )
-from clustree._config_helpers import data_to_color, get_aggr_func_name
-from clustree._hash import hash_edge_id, hash_node_id
+from clustree._config_helpers import (
+    data_to_color,
+    fixed_to_color,
+    get_aggr_func_name,
+    get_aggr_key,
+    prune_edges,
+    res_to_color,
+)
+from clustree._count import (
+    MEMBERSHIP_TYPE,
+    EdgeCounts,
+    RunningStats,
+    TransitionCounts,
+    count_transitions,
+    unique_paths,
+)
+from clustree._handle_pars import (
+    get_column,
+    get_membership,
+    get_membership_cols,
+    get_resolutions,
+    handle_data,
+)
+from clustree._hash import lookup_node_ids
+from clustree._tables import (
+    EdgeTable,
+    NodeTable,
+    TableView,
+    empty_edge_table,
+    empty_node_table,
+)
+
+if TYPE_CHECKING:
+    from matplotlib.cm import ScalarMappable
 
 CONTROL_LIST = ["init", "sample_info", "node_color", "edge_color"]
 DEFAULT_CONFIG = {k: True for k in CONTROL_LIST}
@@ -26,14 +60,23 @@ class ClustreeConfig:
     def __init__(
         self,
         kk: int,
-        data: pd.DataFrame,
+        data: Optional[Union[DATA_INPUT_TYPE, Iterable[TABLE_TYPE]]],
         prefix: str,
         node_color: NODE_COLOR_TYPE = None,
         node_color_aggr: COLOR_AGG_TYPE = None,
         node_cmap: CMAP_TYPE = None,
         edge_color: EDGE_COLOR_TYPE = None,
         edge_cmap: CMAP_TYPE = None,
-        start_at_1: bool = True,
+        node_norm: NORM_TYPE = "linear",
+        edge_norm: NORM_TYPE = "linear",
+        start_at_1: Optional[bool] = True,
+        metadata_cols: Optional[list[str]] = None,
+        membership_cols: Optional[list[str]] = None,
+        deduplicate: bool = False,
+        count_col: Optional[str] = None,
+        min_edge_samples: int = 0,
+        min_in_prop: float = 0.0,
+        max_in_edges_per_node: Optional[int] = None,
         _setup_cf: Optional[dict[str, bool]] = None,
     ):
         if not node_color or node_color == "prefix":
@@ -45,115 +88,483 @@ class ClustreeConfig:
         if not _setup_cf:
             _setup_cf = DEFAULT_CONFIG
         if not node_cmap:
-            node_cmap = plt.cm.Blues
+            node_cmap = "Blues"
         if not edge_cmap:
-            edge_cmap = plt.cm.Reds
+            edge_cmap = "Reds"
 
         self.prefix = prefix
         self.kk = kk
-        self.start_at_1 = start_at_1
-        self.node_cf: NODE_CONFIG_TYPE = defaultdict(dict)
-        self.edge_cf: EDGE_CONFIG_TYPE = defaultdict(dict)
+        self.nodes: NodeTable = empty_node_table()
+        self.edges: EdgeTable = empty_edge_table()
         self.k_upper_to_node_id: dict[int, list[int]] = {}
-        self.node_color_sm: Optional[ScalarMappable] = None
-        self.edge_color_sm: Optional[ScalarMappable] = None
+        self.node_color_sm: Optional["ScalarMappable"] = None
+        self.edge_color_sm: Optional["ScalarMappable"] = None
         self.node_color_legend_title: Optional[str] = None
         self.edge_color_legend_title: Optional[str] = None
 
-        self.membership_cols = [
-            f"{prefix}{str(k_upper)}" for k_upper in range(1, kk + 1)
-        ]
-        cluster_membership = data[self.membership_cols].to_numpy()
+        if membership_cols is None:
+            membership_cols = get_membership_cols(prefix=prefix, kk=kk)
+        elif len(membership_cols) != kk:
+            raise ValueError(
+                f"expected kk={kk} membership cols, got {len(membership_cols)}"
+            )
+        self.membership_cols = membership_cols
+        # resolution of each column as named, e.g. '0.4' for 'leiden_0.4'
+        self.resolutions = get_resolutions(
+            membership_cols=membership_cols, prefix=prefix
+        )
+        # metadata retained for coloring nodes, as DataFrame or running statistics
+        self.data: Optional[pd.DataFrame] = None
+        self.node_stats: dict[str, RunningStats] = {}
+
+        # node values aggregated from metadata, by (column, aggregate)
+        self.aggregates: dict[tuple[str, Any], np.ndarray] = {}
+
+        # rows are collapsed to unique paths before counting if deduplicate, and
+        # each row stands for count_col samples if supplied
+        self.deduplicate = deduplicate
+        self.count_col = count_col
+        self.n_paths: Optional[int] = None  # #rows counted after deduplication
+
+        # edges discarded while building the edge table, see prune_edges
+        self.min_edge_samples = min_edge_samples
+        self.min_in_prop = min_in_prop
+        self.max_in_edges_per_node = max_in_edges_per_node
+        self.n_pruned_edges = 0
+
+        counts: Optional[TransitionCounts] = None
+        metadata_cols = [node_color] + (metadata_cols or [])
+        # aggregated together, so that switching node_color between them is free
+        self.metadata_cols = [col for col in metadata_cols if isinstance(col, str)]
+        if data is not None:
+            data = handle_data(
+                data=data,
+                membership_cols=self.membership_cols,
+                metadata_cols=metadata_cols + ([count_col] if count_col else []),
+            )
+        if isinstance(data, Iterator) or (data is not None and count_col):
+            # chunks, or rows standing for count_col samples each, so only running
+            # totals are kept
+            counts, self.node_stats = self.read_chunks(
+                chunks=data if isinstance(data, Iterator) else [data],
+                metadata_cols=metadata_cols,
+            )
+        elif data is not None:
+            cluster_membership = get_membership(
+                data=data, membership_cols=self.membership_cols
+            )
+            counts = self._count(membership=cluster_membership)
+            if isinstance(data, pd.DataFrame):
+                self.data = data
+            else:
+                self.data = self._metadata_frame(
+                    data=data,
+                    membership=cluster_membership,
+                    metadata_cols=metadata_cols,
+                )
+        elif start_at_1 is None:
+            raise ValueError("start_at_1 must be supplied if data is None")
+        if start_at_1 is None:
+            start_at_1 = counts.min_cluster_number == 1
+        # whether cluster numbers start at 1, for reference only: nodes are created
+        # for the cluster numbers observed either way
+        self.start_at_1 = start_at_1
+        # running totals, kept for update only if edges are pruned, as otherwise
+        # they are found from the node and edge tables
+        self.counts = counts if self.prunes_edges else None
 
-        if _setup_cf["init"]:
-            self.init_cf()
-        if _setup_cf["sample_info"]:
-            self.set_sample_information(data=cluster_membership)
+        if _setup_cf["init"] and counts is not None:
+            self.init_cf(node_counts=counts.node_counts)
+        if _setup_cf["sample_info"] and counts is not None:
+            self.set_sample_information(data=counts)
         if _setup_cf["node_color"]:
             self.set_node_color(
                 node_color=node_color,
                 aggr=node_color_aggr,
                 cmap=node_cmap,
                 prefix=prefix,
-                data=data,
+                data=self.data,
+                stats=self.node_stats,
+                norm=node_norm,
             )
         if _setup_cf["edge_color"]:
-            self.set_edge_color(edge_color=edge_color, cmap=edge_cmap, prefix=prefix)
+            self.set_edge_color(
+                edge_color=edge_color, cmap=edge_cmap, prefix=prefix, norm=edge_norm
+            )
+
+    @property
+    def prunes_edges(self) -> bool:
+        return (
+            self.min_edge_samples > 0
+            or self.min_in_prop > 0
+            or self.max_in_edges_per_node is not None
+        )
+
+    @property
+    def node_cf(self) -> NODE_CONFIG_TYPE:
+        return TableView(self.nodes)
+
+    @property
+    def edge_cf(self) -> EDGE_CONFIG_TYPE:
+        return TableView(self.edges)
+
+    def to_arrays(self) -> dict[str, np.ndarray]:
+        """Node and edge tables, and node values aggregated from metadata, as a flat \
+        dict of arrays that can be saved with np.savez. Aggregates computed with \
+        anonymous functions are omitted, as they cannot be identified by name."""
+        arrays = {
+            "start_at_1": np.array(self.start_at_1),
+            "nodes_res": self.nodes.res,
+            "nodes_k": self.nodes.k,
+            "nodes_samples": self.nodes.samples,
+            "edges_res": self.edges.res,
+            "edges_start": self.edges.start,
+            "edges_end": self.edges.end,
+            "edges_samples": self.edges.samples,
+            "edges_in_prop": self.edges.in_prop,
+            "n_pruned_edges": np.array(self.n_pruned_edges),
+            "min_edge_samples": np.array(self.min_edge_samples),
+            "min_in_prop": np.array(self.min_in_prop),
+            # -1 for None, as np.savez stores no object arrays
+            "max_in_edges_per_node": np.array(
+                -1 if self.max_in_edges_per_node is None else self.max_in_edges_per_node
+            ),
+        }
+        for (col, aggr), values in self.aggregates.items():
+            if isinstance(aggr, str):
+                arrays[f"aggregate/{aggr}/{col}"] = values
+        return arrays
+
+    @classmethod
+    def from_arrays(
+        cls,
+        arrays: Mapping[str, np.ndarray],
+        kk: int,
+        prefix: str,
+        membership_cols: Optional[list[str]] = None,
+    ) -> "ClustreeConfig":
+        """Inverse of to_arrays. The config holds no data, so node_color may only be \
+        'samples', 'prefix', a fixed color or a column with a stored aggregate."""
+        cf = cls(
+            kk=kk,
+            data=None,
+            prefix=prefix,
+            membership_cols=membership_cols,
+            start_at_1=bool(arrays["start_at_1"]),
+            min_edge_samples=int(arrays["min_edge_samples"]),
+            min_in_prop=float(arrays["min_in_prop"]),
+            max_in_edges_per_node=(
+                None
+                if int(arrays["max_in_edges_per_node"]) < 0
+                else int(arrays["max_in_edges_per_node"])
+            ),
+            _setup_cf={k: False for k in CONTROL_LIST},
+        )
+        cf.nodes = NodeTable(res=arrays["nodes_res"], k=arrays["nodes_k"])
+        cf.nodes.samples = np.asarray(arrays["nodes_samples"], dtype=np.int64)
+        cf.edges = EdgeTable(
+            res=arrays["edges_res"],
+            start=arrays["edges_start"],
+            end=arrays["edges_end"],
+            samples=arrays["edges_samples"],
+            in_prop=arrays["edges_in_prop"],
+        )
+        cf.n_pruned_edges = int(arrays["n_pruned_edges"])
+        for name, values in arrays.items():
+            if name.startswith("aggregate/"):
+                _, aggr, col = name.split("/", 2)
+                cf.aggregates[(col, aggr)] = np.asarray(values, dtype=float)
+        return cf
+
+    def read_chunks(
+        self,
+        chunks: Iterable[TABLE_TYPE],
+        metadata_cols: list[str],
+        counts: Optional[TransitionCounts] = None,
+        stats: Optional[dict[str, RunningStats]] = None,
+    ) -> tuple[TransitionCounts, dict[str, RunningStats]]:
+        """Add node and edge counts and running statistics of metadata_cols of \
+        each chunk to counts and stats, new ones if not supplied."""
+        if counts is None:
+            counts = TransitionCounts()
+        if stats is None:
+            stats = {}
+        for chunk in chunks:
+            membership = get_membership(
+                data=chunk, membership_cols=self.membership_cols
+            )
+            weights = self._weights(data=chunk)
+            self._count(membership=membership, weights=weights, counts=counts)
+            for col in metadata_cols:
+                values = get_column(data=chunk, col=col)
+                if values is None or col == self.count_col:
+                    continue
+                if col not in stats:
+                    stats[col] = RunningStats(column=col)
+                stats[col].update(data=membership, values=values, weights=weights)
+        return counts, stats
+
+    def update(self, data: DATA_INPUT_TYPE) -> None:
+        """
+        Add rows of cluster membership, e.g. newly scored samples, to the counts \
+        and metadata statistics, without recounting the rows already counted.
+
+        Parameters
+        ----------
+        data : Union[Path, str, pd.DataFrame, np.ndarray, pa.Table]
+            New rows, with the membership columns of the config and its metadata \
+            columns with running statistics (and count_col, if supplied).
+
+        Returns
+        -------
+            None
+
+        Notes
+        -------
+        Node and edge counts of the new rows are added to the running totals, and \
+        nodes, edges and in_prop are rebuilt from them, in time proportional to the \
+        new rows plus the size of the clustree. Metadata is kept as running \
+        statistics, so only mergeable aggregates ('sum', 'mean', 'std', 'min', \
+        'max' and 'count') are available after an update: if the config holds its \
+        metadata in memory, the first update summarises it into running \
+        statistics and releases it. Node and edge colors must be set again.
+        """
+        counts = self._running_counts()
+        if self.data is not None:
+            membership = get_membership(
+                data=self.data, membership_cols=self.membership_cols
+            )
+            for col in self.metadata_cols:
+                if col in self.data.columns and col not in self.membership_cols:
+                    if is_numeric_dtype(self.data[col]):
+                        self.node_stats[col] = RunningStats(column=col)
+                        self.node_stats[col].update(
+                            data=membership, values=self.data[col].to_numpy()
+                        )
+            self.data = None
+
+        metadata_cols = list(self.node_stats)
+        data = handle_data(
+            data=data,
+            membership_cols=self.membership_cols,
+            metadata_cols=metadata_cols + ([self.count_col] if self.count_col else []),
+        )
+        missing = [
+            col for col in metadata_cols if get_column(data=data, col=col) is None
+        ]
+        if missing:
+            raise ValueError(f"metadata columns {missing} not found in data")
+        counts, self.node_stats = self.read_chunks(
+            chunks=[data],
+            metadata_cols=metadata_cols,
+            counts=counts,
+            stats=self.node_stats,
+        )
+        if self.prunes_edges:
+            self.counts = counts
+        self.set_sample_information(data=counts)
+        self.aggregates = {}
+        self.aggregate_metadata(
+            cols=metadata_cols,
+            aggregates=RunningStats.AGGREGATES,
+            stats=self.node_stats,
+        )
 
-    def init_cf(self) -> None:
+    def _running_counts(self) -> TransitionCounts:
+        """Node and edge counts of the rows counted so far. Unless edges are \
+        pruned, every non-empty transition is an edge, so these are rebuilt from \
+        the node and edge tables rather than kept."""
+        if self.counts is not None:
+            return self.counts
+        if self.prunes_edges or self.n_pruned_edges:
+            raise ValueError("counts of pruned edges were not kept, so cannot update")
+        counts = TransitionCounts()
+        bounds = np.searchsorted(self.nodes.res, np.arange(1, self.kk + 2))
         for k_upper in range(1, self.kk + 1):
-            if self.start_at_1:
-                _iter = range(1, k_upper + 1)
-            else:
-                _iter = range(0, k_upper)
-            for k_lower in _iter:
-                ind = hash_node_id(k_upper=k_upper, k_lower=k_lower)
-                self.node_cf[ind].update({"k": k_lower, "res": k_upper})
+            start, stop = bounds[k_upper - 1], bounds[k_upper]
+            k = self.nodes.k[start:stop]
+            samples = np.zeros(int(k.max(initial=-1)) + 1, dtype=np.int64)
+            samples[k] = self.nodes.samples[start:stop]
+            counts.node_counts.append(samples)
+        edge_bounds = np.searchsorted(self.edges.res, np.arange(2, self.kk + 2))
+        for k_upper in range(2, self.kk + 1):
+            start, stop = edge_bounds[k_upper - 2], edge_bounds[k_upper - 1]
+            counts.edge_counts.append(
+                EdgeCounts(
+                    k_start=self.nodes.k[self.edges.start[start:stop]],
+                    k_end=self.nodes.k[self.edges.end[start:stop]],
+                    samples=self.edges.samples[start:stop],
+                )
+            )
+        return counts
+
+    def _weights(self, data: TABLE_TYPE) -> Optional[np.ndarray]:
+        """#samples represented by each row of data, None if one per row."""
+        if self.count_col is None:
+            return None
+        weights = get_column(data=data, col=self.count_col)
+        if weights is None:
+            raise ValueError(f"count_col '{self.count_col}' not found in data")
+        if not np.issubdtype(weights.dtype, np.integer):
+            raise ValueError(f"count_col '{self.count_col}' should hold integers")
+        return weights
+
+    def _count(
+        self,
+        membership: list[np.ndarray],
+        weights: Optional[np.ndarray] = None,
+        counts: Optional[TransitionCounts] = None,
+    ) -> TransitionCounts:
+        """Add node and edge counts of membership to counts, counting its unique \
+        paths only if deduplicate."""
+        if counts is None:
+            counts = TransitionCounts()
+        if self.deduplicate:
+            membership, weights = unique_paths(data=membership, weights=weights)
+            self.n_paths = (self.n_paths or 0) + len(weights)
+        counts.update(data=membership, weights=weights)
+        return counts
 
-    def set_sample_information(self, data: np.ndarray) -> None:
+    def _metadata_frame(
+        self,
+        data: TABLE_TYPE,
+        membership: list[np.ndarray],
+        metadata_cols: list[str],
+    ) -> Optional[pd.DataFrame]:
+        """DataFrame of membership and metadata columns, for tables that are not \
+        DataFrames. None if no metadata column is present."""
+        columns = {}
+        for col in metadata_cols:
+            values = get_column(data=data, col=col)
+            if values is not None:
+                columns[col] = values
+        if not columns:
+            return None
+        return pd.DataFrame(
+            {**dict(zip(self.membership_cols, membership)), **columns}, copy=False
+        )
+
+    def init_cf(self, node_counts: list[np.ndarray]) -> None:
+        """Create the node table, ordered by (res, k), from node_counts as returned \
+        by count_transitions. Nodes are created only for clusters with samples, so \
+        resolutions may have any number of clusters with any cluster numbers."""
+        labels = [np.flatnonzero(samples) for samples in node_counts]
+        res = np.repeat(np.arange(1, len(labels) + 1), [len(x) for x in labels])
+        k = np.concatenate(labels)
+        self.nodes = NodeTable(res=res, k=k)
+
+    def set_sample_information(
+        self, data: Union[MEMBERSHIP_TYPE, TransitionCounts]
+    ) -> None:
         """
 
         Parameters
         ----------
-        data : ndarray
+        data : Union[ndarray, Sequence[ndarray], TransitionCounts]
             Column 0 must be cluster membership for K = 1, and so on, finally column \
-            (kk - 1) must be cluster membership for K = kk
+            (kk - 1) must be cluster membership for K = kk. Alternatively, counts \
+            already accumulated from data read in chunks.
 
         Returns
         -------
             None
         """
-        for k_upper in range(1, self.kk + 1):
+        if isinstance(data, TransitionCounts):
+            node_counts, edge_counts = data.node_counts, data.edge_counts
+        else:
+            node_counts, edge_counts = count_transitions(data=data)
 
-            col = k_upper - 1  # use (k_upper - 1) since data is 0-indexed
-            vals, counts = np.unique(data[:, col], return_counts=True)
-            for k_end, node_samples in zip(vals, counts):
-                # get #samples at each node
-                end_hashed = hash_node_id(k_upper=k_upper, k_lower=int(k_end))
-                self.node_cf[end_hashed]["samples"] = int(node_samples)
-
-                if k_upper > 1:
-                    # get #samples along each incoming edge
-                    ind = data[:, col] == k_end
-                    to_count = data[ind, col - 1]
-                    vals, counts = np.unique(to_count, return_counts=True)
-                    for k_start, edge_samples in zip(vals, counts):
-                        start_hashed = hash_node_id(
-                            k_upper=k_upper - 1, k_lower=int(k_start)
-                        )
-                        self.edge_cf[
-                            hash_edge_id(
-                                k_upper=k_upper,
-                                k_end=int(k_end),
-                                k_start=int(k_start),
-                            )
-                        ].update(
-                            {
-                                "in_prop": (float(edge_samples) / float(node_samples)),
-                                "samples": int(edge_samples),
-                                "start": start_hashed,
-                                "end": end_hashed,
-                                "res": k_upper,
-                            }
-                        )
+        # nodes: one per observed cluster, ordered by (res, k)
+        self.init_cf(node_counts=node_counts)
+        self.nodes.samples = self._to_node_order(
+            per_res=node_counts, fill=0, dtype=np.int64
+        )
+
+        # edges: ordered by (res, k_end, k_start), pruned before they are stored
+        prune = self.prunes_edges
+        self.n_pruned_edges = 0
+        res, k_start, k_end, samples, in_prop = [], [], [], [], []
+        for k_upper, edges in enumerate(edge_counts, 2):
+            k_starts, k_ends, edge_samples = edges
+            edge_in_prop = edge_samples / node_counts[k_upper - 1][k_ends]
+            if prune:
+                keep = prune_edges(
+                    k_end=k_ends,
+                    samples=edge_samples,
+                    in_prop=edge_in_prop,
+                    min_edge_samples=self.min_edge_samples,
+                    min_in_prop=self.min_in_prop,
+                    max_in_edges_per_node=self.max_in_edges_per_node,
+                )
+                self.n_pruned_edges += len(keep) - int(keep.sum())
+                k_ends, k_starts = k_ends[keep], k_starts[keep]
+                edge_samples, edge_in_prop = edge_samples[keep], edge_in_prop[keep]
+            res.append(np.full(len(k_ends), k_upper))
+            k_start.append(k_starts)
+            k_end.append(k_ends)
+            samples.append(edge_samples)
+            in_prop.append(edge_in_prop)
+        if not edge_counts:
+            return
+        res = np.concatenate(res)
+        self.edges = EdgeTable(
+            res=res,
+            start=self._node_ids(k_upper=res - 1, k_lower=np.concatenate(k_start)),
+            end=self._node_ids(k_upper=res, k_lower=np.concatenate(k_end)),
+            samples=np.concatenate(samples),
+            in_prop=np.concatenate(in_prop),
+        )
+
+    def _node_ids(self, k_upper: np.ndarray, k_lower: np.ndarray) -> np.ndarray:
+        return lookup_node_ids(
+            k_upper=k_upper,
+            k_lower=k_lower,
+            node_res=self.nodes.res,
+            node_k=self.nodes.k,
+        )
+
+    def _to_node_order(
+        self, per_res: list[np.ndarray], fill: float, dtype: type = float
+    ) -> np.ndarray:
+        """Convert arrays indexed by cluster number, one per resolution, to an array \
+        with one entry per node."""
+        out = np.full(len(self.nodes), fill, dtype=dtype)
+        bounds = np.searchsorted(self.nodes.res, np.arange(1, len(per_res) + 2))
+        for k_upper, values in enumerate(per_res, 1):
+            start, stop = bounds[k_upper - 1], bounds[k_upper]
+            k = self.nodes.k[start:stop]
+            present = k < len(values)
+            out[start:stop][present] = values[k[present]]
+        return out
 
     def set_node_color(
         self,
         node_color: NODE_COLOR_TYPE,
         cmap: CMAP_TYPE,
         aggr: COLOR_AGG_TYPE,
-        data: pd.DataFrame,
+        data: Optional[pd.DataFrame],
         prefix: str,
+        stats: Optional[dict[str, RunningStats]] = None,
+        norm: NORM_TYPE = "linear",
     ) -> None:
+        if not node_color or node_color == "prefix":
+            node_color = prefix
+        if not cmap:
+            cmap = "Blues"
+        self.node_color_sm = None
+        self.node_color_legend_title = None
+
+        use_samples = node_color == "samples"
+        aggr_key = (node_color, get_aggr_key(aggr=aggr))
+        use_cached = aggr_key in self.aggregates
+        use_stats = node_color in (stats or {})
+        use_column = data is not None and node_color in data.columns
         if node_color == prefix:
-            for node_id, attr in self.node_cf.items():
-                self.node_cf[node_id]["node_color"] = mpl.colors.to_rgba(
-                    f"C{attr['res']}"
-                )
-        elif (use_samples := node_color == "samples") or (node_color in data.columns):
-            # create to_parse = {node_id: value}
+            self.nodes.node_color = res_to_color(res=self.nodes.res)
+        elif use_samples or use_cached or use_stats or use_column:
+            # create to_parse = value per node
             if use_samples:
-                to_parse = {k: v["samples"] for k, v in self.node_cf.items()}
+                to_parse = self.nodes.samples
                 self.node_color_legend_title = "node: count"
             else:
                 if not aggr:
@@ -163,44 +574,128 @@ class ClustreeConfig:
                 self.node_color_legend_title = (
                     f"node: {get_aggr_func_name(aggr=aggr)}_{node_color}"
                 )
-                to_parse = {
-                    hash_node_id(k_upper=k_upper, k_lower=k_lower): float(val)
-                    for k_upper, cluster_col in enumerate(self.membership_cols, 1)
-                    for k_lower, val in data.groupby(cluster_col)[node_color]
-                    .agg(aggr)
-                    .to_dict()
-                    .items()
-                }
-
-            # convert to_parse to {node_id: color}
-            rgba, sm = data_to_color(data=to_parse, cmap=cmap)
+                if not use_cached:
+                    # a column of data is aggregated once, for every aggregate
+                    aggr_name = get_aggr_func_name(aggr=aggr)
+                    self.aggregate_metadata(
+                        cols=[node_color],
+                        aggregates=(
+                            AGGREGATES
+                            if aggr_name in AGGREGATES and not use_stats
+                            else [aggr_name]
+                        ),
+                        data=data,
+                        stats=stats,
+                    )
+                if aggr_key not in self.aggregates:
+                    # anonymous or other functions, or non-numeric column
+                    to_parse = np.full(len(self.nodes), np.nan)
+                    for k_upper, cluster_col in enumerate(self.membership_cols, 1):
+                        agg = data.groupby(cluster_col)[node_color].agg(aggr)
+                        ids = self._node_ids(
+                            k_upper=np.full(len(agg), k_upper),
+                            k_lower=agg.index.to_numpy(),
+                        )
+                        to_parse[self.nodes.rows(ids)] = agg.to_numpy(dtype=float)
+                    self.aggregates[aggr_key] = to_parse
+                to_parse = self.aggregates[aggr_key]
+
+            # convert to_parse to RGBA per node
+            rgba, sm = data_to_color(data=to_parse, cmap=cmap, norm=norm)
             self.node_color_sm = sm
-            for k, v in rgba.items():
-                self.node_cf[k]["node_color"] = v
+            self.nodes.node_color = rgba
         else:  # fixed color, e.g., mpl.colors object
-            for node_id in self.node_cf:
-                self.node_cf[node_id]["node_color"] = mpl.colors.to_rgba(node_color)
+            self.nodes.node_color = fixed_to_color(color=node_color, n=len(self.nodes))
+
+    def aggregate_metadata(
+        self,
+        cols: list[str],
+        aggregates: Sequence[str],
+        data: Optional[pd.DataFrame] = None,
+        stats: Optional[dict[str, RunningStats]] = None,
+    ) -> None:
+        """
+        Aggregate metadata columns for every node, storing each (column, \
+        aggregate) in self.aggregates so that coloring nodes by any of them later \
+        needs no pass over the data.
+
+        Parameters
+        ----------
+        cols : list[str]
+            Columns to aggregate, along with all metadata_cols.
+        aggregates : Sequence[str]
+            Names of the aggregates required. Columns with running statistics get \
+            every aggregate of RunningStats, raising ValueError if one required \
+            is not among them. Numeric columns of data get all aggregates computed \
+            alongside those required by aggregate_nodes, in one pass over the \
+            data. Other aggregates and columns are left to the caller.
+        data : pd.DataFrame, optional
+            Cluster membership and metadata.
+        stats : dict[str, RunningStats], optional
+            Running statistics of metadata columns read in chunks.
+
+        Returns
+        -------
+            None
+        """
+        stats = stats or {}
+        cols = list(dict.fromkeys(cols + self.metadata_cols))
+        for col in cols:
+            if col not in stats:
+                continue
+            for aggr in dict.fromkeys([*aggregates, *RunningStats.AGGREGATES]):
+                if (col, aggr) not in self.aggregates:
+                    self.aggregates[(col, aggr)] = self._to_node_order(
+                        per_res=stats[col].aggregate(aggr=aggr), fill=np.nan
+                    )
+
+        aggregates = [aggr for aggr in aggregates if aggr in AGGREGATES]
+        if data is None or not aggregates:
+            return
+        columns = {
+            col: data[col].to_numpy()
+            for col in cols
+            if col not in stats
+            and col in data.columns
+            and col not in self.membership_cols
+            and is_numeric_dtype(data[col])
+            and any((col, aggr) not in self.aggregates for aggr in aggregates)
+        }
+        if columns:
+            self.aggregates.update(
+                aggregate_nodes(
+                    membership=get_membership(
+                        data=data, membership_cols=self.membership_cols
+                    ),
+                    columns=columns,
+                    node_res=self.nodes.res,
+                    node_k=self.nodes.k,
+                    aggregates=aggregates,
+                )
+            )
 
     def set_edge_color(
         self,
         edge_color: EDGE_COLOR_TYPE,
         cmap: CMAP_TYPE,
         prefix: str,
+        norm: NORM_TYPE = "linear",
     ) -> None:
+        if not edge_color:
+            edge_color = "samples"
+        elif edge_color == "prefix":
+            edge_color = prefix
+        if not cmap:
+            cmap = "Reds"
+        self.edge_color_sm = None
+        self.edge_color_legend_title = None
+
         if edge_color == prefix:
-            for edge_id, attr in self.edge_cf.items():
-                self.edge_cf[edge_id]["edge_color"] = f"C{attr['res']}"
+            self.edges.edge_color = res_to_color(res=self.edges.res)
         elif edge_color == "samples":
-            # create to_parse = {edge_id: value}
-            to_parse = {k: v["samples"] for k, v in self.edge_cf.items()}
-
-            # convert to_parse to {edge_id: color}
-            rgba, sm = data_to_color(data=to_parse, cmap=cmap)
+            rgba, sm = data_to_color(data=self.edges.samples, cmap=cmap, norm=norm)
             self.edge_color_sm = sm
             self.edge_color_legend_title = "edge: count"
-
-            for k, v in rgba.items():
-                self.edge_cf[k]["edge_color"] = v
+            self.edges.edge_color = rgba
         else:  # fixed color, e.g., mpl.colors object
-            for edge_id in self.edge_cf:
-                self.edge_cf[edge_id]["edge_color"] = edge_color
+            self.edges.edge_color = fixed_to_color(color=edge_color, n=len(self.edges))
@@ -1,9 +1,13 @@
-from typing import Union
+from typing import TYPE_CHECKING, Any, Callable, Optional, Union
 
-import matplotlib as mpl
-from matplotlib.cm import ScalarMappable
+import numpy as np
 
-from clustree._clustree_typing import COLOR_AGG_TYPE
+from clustree._clustree_typing import COLOR_AGG_TYPE, NORM_TYPE, NORMS
+
+if TYPE_CHECKING:
+    import matplotlib as mpl
+    from matplotlib.cm import ScalarMappable
+    from matplotlib.colors import Normalize
 
 
 def get_aggr_func_name(aggr: COLOR_AGG_TYPE) -> str:
@@ -12,32 +16,154 @@ def get_aggr_func_name(aggr: COLOR_AGG_TYPE) -> str:
     return aggr.__name__
 
 
+def get_aggr_key(aggr: COLOR_AGG_TYPE) -> Any:
+    """Name of aggr, or aggr itself for anonymous functions whose name does not \
+    identify them."""
+    name = get_aggr_func_name(aggr=aggr) if aggr else None
+    if name == "<lambda>":
+        return aggr
+    return name
+
+
+def prune_edges(
+    k_end: np.ndarray,
+    samples: np.ndarray,
+    in_prop: np.ndarray,
+    min_edge_samples: int = 0,
+    min_in_prop: float = 0.0,
+    max_in_edges_per_node: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Parameters
+    ----------
+    k_end : ndarray
+        Cluster number of the end node of each edge of one resolution, sorted.
+    samples, in_prop : ndarray
+        #samples of each edge, and its proportion of the samples of its end node.
+    min_edge_samples : int
+        Edges with fewer samples are discarded.
+    min_in_prop : float
+        Edges with a smaller proportion of the samples of their end node are \
+        discarded.
+    max_in_edges_per_node : int, optional
+        Of the edges into each node remaining, only this many with the most \
+        samples are kept, ties kept in order of k_start. If None, all are kept.
+
+    Returns
+    -------
+        Boolean mask of edges kept.
+    """
+    if max_in_edges_per_node is not None and max_in_edges_per_node < 1:
+        raise ValueError("max_in_edges_per_node must be at least 1")
+    keep = (samples >= min_edge_samples) & (in_prop >= min_in_prop)
+    if max_in_edges_per_node is not None:
+        kept = np.flatnonzero(keep)
+        order = kept[np.lexsort((-samples[kept], k_end[kept]))]
+        ends = k_end[order]
+        rank = np.arange(len(order)) - np.searchsorted(ends, ends, side="left")
+        keep[order[rank >= max_in_edges_per_node]] = False
+    return keep
+
+
+def quantile_functions(
+    data: np.ndarray,
+) -> tuple[Callable[[np.ndarray], np.ndarray], Callable[[np.ndarray], np.ndarray]]:
+    """Empirical CDF of data, ignoring NaN, and its inverse. Each distinct value \
+    is mapped to its mid rank scaled to [0, 1], and values in between are \
+    interpolated linearly, so that both functions are strictly increasing."""
+    values = np.sort(data[~np.isnan(data)])
+    uniq = np.unique(values)
+    mid_rank = (
+        np.searchsorted(values, uniq, side="left")
+        + np.searchsorted(values, uniq, side="right")
+        - 1
+    ) / 2
+    quantile = mid_rank / max(len(values) - 1, 1)
+
+    def forward(x: np.ndarray) -> np.ndarray:
+        return np.interp(x, uniq, quantile)
+
+    def inverse(q: np.ndarray) -> np.ndarray:
+        return np.interp(q, quantile, uniq)
+
+    return forward, inverse
+
+
+def get_norm(data: np.ndarray, norm: NORM_TYPE = "linear") -> "Normalize":
+    """
+    Parameters
+    ----------
+    data : ndarray
+        Values to normalise. NaN values are ignored.
+    norm : Literal["linear", "log", "quantile"]
+        'linear' maps the range of data linearly to [0, 1]. 'log' does so for the \
+        logarithm of data, which must be positive, e.g. for #samples spanning \
+        orders of magnitude. 'quantile' maps each value to its quantile in data, \
+        so that colors are spread evenly over nodes / edges however skewed data is.
+
+    Returns
+    -------
+        Matplotlib normalisation, also used to draw colorbars in the same scale.
+    """
+    from matplotlib.colors import FuncNorm, LogNorm, Normalize
+
+    if norm not in NORMS:
+        raise ValueError(f"unknown norm '{norm}', use one of {NORMS}")
+    vmin, vmax = np.nanmin(data), np.nanmax(data)
+    if norm == "log":
+        if vmin <= 0:
+            raise ValueError("log normalisation requires positive values")
+        return LogNorm(vmin=vmin, vmax=vmax)
+    if norm == "quantile":
+        return FuncNorm(functions=quantile_functions(data), vmin=vmin, vmax=vmax)
+    return Normalize(vmin=vmin, vmax=vmax)
+
+
 def data_to_color(
-    data: dict[int, Union[int, float]],
-    cmap: mpl.colors.Colormap = mpl.cm.Blues,
+    data: np.ndarray,
+    cmap: Union["mpl.colors.Colormap", str] = "Blues",
     return_sm: bool = True,
-) -> Union[
-    dict[int, tuple[float, float, float, float]],
-    tuple[dict[int, tuple[float, float, float, float]], ScalarMappable],
-]:
+    norm: NORM_TYPE = "linear",
+) -> Union[np.ndarray, tuple[np.ndarray, "ScalarMappable"]]:
     """
     Parameters
     ----------
     data
-        Node / edge id as key and value to use for RGBA mapping as value. For example, \
-        if determining RGBA value for node_color, value of dict could be #samples.
+        Value to use for RGBA mapping, one per node / edge. For example, if \
+        determining RGBA value for node_color, value could be #samples. NaN values \
+        are ignored when normalising.
     cmap
         Colormap to use for int to RGBA mapping.
+    norm
+        Normalisation of data before mapping to colors, see get_norm.
 
     Returns
     -------
-        The keys (node or edge key) and RGBA values.
+        The RGBA values, array of shape (len(data), 4), mapped from all of data in \
+        one call of the colormap.
 
         The ScalarMappable object to allow colorbar visualization at plot time.
     """
-    val = data.values()
-    norm = mpl.colors.Normalize(vmin=min(val), vmax=max(val))
-    sm = mpl.cm.ScalarMappable(norm=norm, cmap=cmap)
+    from matplotlib.cm import ScalarMappable
+
+    data = np.asarray(data, dtype=float)
+    sm = ScalarMappable(norm=get_norm(data=data, norm=norm), cmap=cmap)
+    rgba = np.asarray(sm.to_rgba(data), dtype=float).reshape(-1, 4)
     if return_sm:
-        return {k: sm.to_rgba(v) for k, v in data.items()}, sm
-    return {k: sm.to_rgba(v) for k, v in data.items()}
+        return rgba, sm
+    return rgba
+
+
+def res_to_color(res: np.ndarray) -> np.ndarray:
+    """RGBA color 'C{res}' of the matplotlib color cycle for each resolution."""
+    from matplotlib.colors import to_rgba
+
+    uniq, inv = np.unique(res, return_inverse=True)
+    lut = np.array([to_rgba(f"C{k_upper}") for k_upper in uniq.tolist()])
+    return lut.reshape(-1, 4)[inv.reshape(-1)]
+
+
+def fixed_to_color(color: str, n: int) -> np.ndarray:
+    from matplotlib.colors import to_rgba
+
+    return np.tile(to_rgba(color), (n, 1))
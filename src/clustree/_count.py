@@ -0,0 +1,366 @@
+from collections.abc import Sequence
+from typing import NamedTuple, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+MEMBERSHIP_TYPE = Union[np.ndarray, Sequence[np.ndarray]]
+# odd multiplier of the polynomial hash of membership rows, see unique_paths
+_PATH_HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+def membership_columns(data: MEMBERSHIP_TYPE) -> list[np.ndarray]:
+    """Columns of a 2d array as (possibly strided) views, or a sequence of columns \
+    unchanged."""
+    if isinstance(data, np.ndarray):
+        return [data[:, col] for col in range(data.shape[1])]
+    return list(data)
+
+
+def _bincount(
+    x: np.ndarray, weights: Optional[np.ndarray] = None, minlength: int = 0
+) -> np.ndarray:
+    """np.bincount, keeping counts as integers if weights are integers."""
+    counts = np.bincount(x, weights=weights, minlength=minlength)
+    if weights is not None and np.issubdtype(weights.dtype, np.integer):
+        counts = counts.astype(np.int64)
+    return counts
+
+
+def unique_paths(
+    data: MEMBERSHIP_TYPE, weights: Optional[np.ndarray] = None
+) -> tuple[list[np.ndarray], np.ndarray]:
+    """
+
+    Parameters
+    ----------
+    data : Union[ndarray, Sequence[ndarray]]
+        Cluster membership, as accepted by count_transitions.
+    weights : ndarray, optional
+        Number of samples represented by each row. Defaults to one sample per row.
+
+    Returns
+    -------
+        Unique rows of data, i.e. paths of samples through the clustree, as one \
+        column per resolution, and the number of samples following each path. \
+        count_transitions(paths, weights=counts) gives the same counts as \
+        count_transitions(data, weights).
+
+    Notes
+    -------
+    Each row is hashed to a single uint64 and rows are grouped by hash with a hash \
+    table (pd.factorize), in time linear in the number of rows rather than \
+    sorting rows as np.unique(axis=0) does. Every row is then compared with the \
+    path of its group, so that a hash collision falls back to np.unique rather \
+    than merging distinct paths.
+    """
+    columns = [np.asarray(column) for column in membership_columns(data)]
+    n = len(columns[0])
+    if weights is not None:
+        weights = np.asarray(weights)
+    row_hash = np.zeros(n, dtype=np.uint64)
+    for column in columns:
+        row_hash *= _PATH_HASH_MULTIPLIER
+        row_hash += column.astype(np.uint64)
+    codes, uniques = pd.factorize(row_hash)
+    first = np.empty(len(uniques), dtype=np.intp)
+    first[codes] = np.arange(n)  # any row of each group
+    paths = [column[first] for column in columns]
+    if not all(np.array_equal(path[codes], col) for path, col in zip(paths, columns)):
+        matrix, codes = np.unique(np.column_stack(columns), axis=0, return_inverse=True)
+        codes = codes.reshape(-1)
+        paths = [matrix[:, col] for col in range(matrix.shape[1])]
+    counts = _bincount(codes, weights=weights, minlength=len(paths[0]))
+    return paths, counts
+
+
+class EdgeCounts(NamedTuple):
+    """Non-empty transitions between two adjacent resolutions, ordered by \
+    (k_end, k_start)."""
+
+    k_start: np.ndarray
+    k_end: np.ndarray
+    samples: np.ndarray
+
+
+def _observed_ranks(labels: np.ndarray, n: int) -> tuple[np.ndarray, np.ndarray]:
+    """Sorted cluster numbers present in labels, and the rank of each label among \
+    them."""
+    present = np.zeros(n, dtype=bool)
+    present[labels] = True
+    rank = np.cumsum(present) - 1
+    return np.flatnonzero(present), rank[labels]
+
+
+def _count_edges(
+    prev: np.ndarray,
+    cur: np.ndarray,
+    n_prev: int,
+    n_cur: int,
+    weights: Optional[np.ndarray] = None,
+) -> EdgeCounts:
+    """Transitions from cluster numbers prev to cur, see count_transitions."""
+    if n_prev * n_cur <= 2 * len(cur):  # every pair of cluster numbers is counted
+        prev_labels, cur_labels = np.arange(n_prev), np.arange(n_cur)
+    else:  # only pairs of clusters observed
+        prev_labels, prev = _observed_ranks(labels=prev, n=n_prev)
+        cur_labels, cur = _observed_ranks(labels=cur, n=n_cur)
+    width = len(prev_labels)
+    code = cur * width + prev
+    n_codes = width * len(cur_labels)
+    if n_codes <= 2 * len(code):
+        samples = _bincount(code, weights=weights, minlength=n_codes)
+        code = np.flatnonzero(samples)
+        samples = samples[code]
+    else:  # still too many pairs of clusters to count them all
+        code, inverse = np.unique(code, return_inverse=True)
+        samples = _bincount(inverse.reshape(-1), weights=weights, minlength=len(code))
+        nonzero = samples != 0
+        code, samples = code[nonzero], samples[nonzero]
+    return EdgeCounts(
+        k_start=prev_labels[code % width],
+        k_end=cur_labels[code // width],
+        samples=samples,
+    )
+
+
+def count_transitions(
+    data: MEMBERSHIP_TYPE, weights: Optional[np.ndarray] = None
+) -> tuple[list[np.ndarray], list[EdgeCounts]]:
+    """
+
+    Parameters
+    ----------
+    data : Union[ndarray, Sequence[ndarray]]
+        Column 0 must be cluster membership for K = 1, and so on, finally column \
+        (kk - 1) must be cluster membership for K = kk. Cluster numbers must be \
+        non-negative integers. A sequence of 1d columns may be supplied instead of \
+        a 2d array, so that columns need not be copied into one matrix.
+    weights : ndarray, optional
+        Number of samples represented by each row. Defaults to one sample per row.
+
+    Returns
+    -------
+        Node counts, where element (K - 1) is indexed by cluster number k and gives \
+        #samples in node (K, k), so takes memory linear in the largest cluster \
+        number.
+
+        Edge counts, where element (K - 2) holds each non-empty transition from \
+        node (K - 1, k_start) to node (K, k_end) and its #samples, so takes memory \
+        linear in the number of edges.
+
+    Notes
+    -------
+    Each pair of adjacent columns is encoded as a single integer \
+    (k_end * n_start + k_start) so that all transitions between two resolutions \
+    are counted with one call to np.bincount, rather than one boolean mask per \
+    cluster. If cluster numbers are sparse, so that there are more pairs of them \
+    than rows, they are first replaced by their rank among those observed, and if \
+    there are still too many pairs, the codes present are counted with np.unique, \
+    so no array is allocated per pair of cluster numbers.
+    """
+    node_counts: list[np.ndarray] = []
+    edge_counts: list[EdgeCounts] = []
+    columns = membership_columns(data)
+    if len(columns[0]) == 0:
+        raise ValueError("cannot count cluster membership of empty data")
+    if weights is not None:
+        weights = np.asarray(weights)
+
+    prev, n_prev = None, 0
+    for column in columns:
+        cur = np.asarray(column).astype(np.intp, copy=False)
+        if cur.min() < 0:
+            raise ValueError("cluster numbers should be non-negative integers")
+        n_cur = int(cur.max()) + 1
+        node_counts.append(_bincount(cur, weights=weights, minlength=n_cur))
+        if prev is not None:
+            edge_counts.append(
+                _count_edges(
+                    prev=prev, cur=cur, n_prev=n_prev, n_cur=n_cur, weights=weights
+                )
+            )
+        prev, n_prev = cur, n_cur
+    return node_counts, edge_counts
+
+
+def _combine_edges(a: EdgeCounts, b: EdgeCounts) -> EdgeCounts:
+    """Sum of two edge counts, ordered by (k_end, k_start)."""
+    k_start = np.concatenate([a.k_start, b.k_start])
+    k_end = np.concatenate([a.k_end, b.k_end])
+    width = int(k_start.max(initial=0)) + 1
+    code, inverse = np.unique(k_end * width + k_start, return_inverse=True)
+    samples = _bincount(
+        inverse.reshape(-1),
+        weights=np.concatenate([a.samples, b.samples]),
+        minlength=len(code),
+    )
+    return EdgeCounts(k_start=code % width, k_end=code // width, samples=samples)
+
+
+def _combine_padded(
+    a: np.ndarray, b: np.ndarray, func: np.ufunc = np.add, fill: float = 0
+) -> np.ndarray:
+    """Combine label-indexed arrays of different shapes, padding with fill."""
+    shape = tuple(max(x, y) for x, y in zip(a.shape, b.shape))
+    dtype = np.result_type(a, b)
+    padded = []
+    for arr in (a, b):
+        out = np.full(shape, fill, dtype=dtype)
+        out[tuple(slice(0, n) for n in arr.shape)] = arr
+        padded.append(out)
+    return func(*padded)
+
+
+class TransitionCounts:
+    """
+    Running totals of node and edge counts, in the format returned by \
+    count_transitions. Allows data to be counted in chunks so that only one chunk \
+    of cluster membership is held in memory at a time.
+    """
+
+    def __init__(self):
+        self.node_counts: list[np.ndarray] = []
+        self.edge_counts: list[EdgeCounts] = []
+
+    def update(
+        self, data: MEMBERSHIP_TYPE, weights: Optional[np.ndarray] = None
+    ) -> None:
+        node_counts, edge_counts = count_transitions(data=data, weights=weights)
+        if not self.node_counts:
+            self.node_counts, self.edge_counts = node_counts, edge_counts
+            return
+        self.node_counts = [
+            _combine_padded(a, b) for a, b in zip(self.node_counts, node_counts)
+        ]
+        self.edge_counts = [
+            _combine_edges(a, b) for a, b in zip(self.edge_counts, edge_counts)
+        ]
+
+    @property
+    def min_cluster_number(self) -> int:
+        return int(np.flatnonzero(self.node_counts[0])[0])
+
+
+def _merge_m2(
+    count_a: np.ndarray,
+    sum_a: np.ndarray,
+    m2_a: np.ndarray,
+    count_b: np.ndarray,
+    sum_b: np.ndarray,
+    m2_b: np.ndarray,
+) -> np.ndarray:
+    """Sum of squared deviations from the mean of the union of two sets of \
+    samples, from the count, sum and sum of squared deviations of each (Chan et \
+    al.'s parallel algorithm). Arrays are indexed by label and may differ in \
+    length."""
+    n = max(len(count_a), len(count_b))
+    count_a, sum_a, m2_a, count_b, sum_b, m2_b = (
+        _combine_padded(np.zeros(n), arr)
+        for arr in (count_a, sum_a, m2_a, count_b, sum_b, m2_b)
+    )
+    both = (count_a > 0) & (count_b > 0)
+    delta = sum_b[both] / count_b[both] - sum_a[both] / count_a[both]
+    m2 = m2_a + m2_b
+    m2[both] += (
+        delta**2 * count_a[both] * count_b[both] / (count_a[both] + count_b[both])
+    )
+    return m2
+
+
+class RunningStats:
+    """
+    Running sum, count, sum of squared deviations from the mean, min and max of a \
+    metadata column for every node, indexed like TransitionCounts.node_counts. \
+    These statistics can be merged across chunks, so aggregates 'sum', 'mean', \
+    'std', 'min', 'max' and 'count' can be computed without holding the full \
+    column in memory.
+    """
+
+    AGGREGATES = ("sum", "mean", "std", "min", "max", "count")
+
+    def __init__(self, column: str):
+        self.column = column
+        self.sum: list[np.ndarray] = []
+        self.count: list[np.ndarray] = []
+        self.m2: list[np.ndarray] = []
+        self.min: list[np.ndarray] = []
+        self.max: list[np.ndarray] = []
+
+    def update(
+        self,
+        data: MEMBERSHIP_TYPE,
+        values: np.ndarray,
+        weights: Optional[np.ndarray] = None,
+    ) -> None:
+        """Add rows of cluster membership and their values. If weights are \
+        supplied, each row stands for weights samples with the same value. NaN \
+        values are skipped, as by aggregate_nodes."""
+        values = np.asarray(values, dtype=float)
+        valid = ~np.isnan(values)
+        all_valid = bool(valid.all())
+        if weights is not None:
+            weights = np.asarray(weights)
+            if not all_valid:
+                weights = np.where(valid, weights, 0)
+        elif not all_valid:
+            weights = valid.astype(np.int64)
+        filled = values if all_valid else np.where(valid, values, 0.0)
+        weighted_values = filled if weights is None else filled * weights
+        low = values if all_valid else np.where(valid, values, np.inf)
+        high = values if all_valid else np.where(valid, values, -np.inf)
+        for col, column in enumerate(membership_columns(data)):
+            labels = np.asarray(column).astype(np.intp, copy=False)
+            n = int(labels.max()) + 1
+            _sum = np.bincount(labels, weights=weighted_values, minlength=n)
+            _count = _bincount(labels, weights=weights, minlength=n)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                dev = filled - (_sum / _count)[labels]
+            if not all_valid:
+                dev[~valid] = 0
+            dev_sq = dev * dev if weights is None else dev * dev * weights
+            _m2 = np.bincount(labels, weights=dev_sq, minlength=n)
+            _min = np.full(n, np.inf)
+            np.minimum.at(_min, labels, low)
+            _max = np.full(n, -np.inf)
+            np.maximum.at(_max, labels, high)
+            if col == len(self.sum):
+                self.sum.append(_sum)
+                self.count.append(_count)
+                self.m2.append(_m2)
+                self.min.append(_min)
+                self.max.append(_max)
+                continue
+            self.m2[col] = _merge_m2(
+                self.count[col], self.sum[col], self.m2[col], _count, _sum, _m2
+            )
+            self.sum[col] = _combine_padded(self.sum[col], _sum)
+            self.count[col] = _combine_padded(self.count[col], _count)
+            self.min[col] = _combine_padded(self.min[col], _min, np.fmin, np.inf)
+            self.max[col] = _combine_padded(self.max[col], _max, np.fmax, -np.inf)
+
+    def aggregate(self, aggr: str) -> list[np.ndarray]:
+        """Aggregate per node, as by aggregate_nodes: NaN for nodes without values \
+        (0 for count and sum), and std NaN for nodes with one value."""
+        if aggr not in self.AGGREGATES:
+            raise ValueError(
+                f"aggregate '{aggr}' cannot be computed from data read in chunks, "
+                f"use one of {self.AGGREGATES}"
+            )
+        out = []
+        for col in range(len(self.sum)):
+            with np.errstate(invalid="ignore", divide="ignore"):
+                val = {
+                    "sum": self.sum[col],
+                    "mean": self.sum[col] / self.count[col],
+                    "std": np.sqrt(self.m2[col] / (self.count[col] - 1)),
+                    "min": self.min[col],
+                    "max": self.max[col],
+                    "count": self.count[col].astype(float),
+                }[aggr]
+            if aggr in ("sum", "count"):
+                out.append(val)
+                continue
+            has = self.count[col] > (1 if aggr == "std" else 0)
+            out.append(np.where(has, val, np.nan))
+        return out
@@ -1,47 +1,102 @@
-from typing import Optional, Sequence
+import os
+from pathlib import Path
+from typing import Callable, Optional
 
-import cv2
-import igraph as ig
+import matplotlib as mpl
 import matplotlib.pyplot as plt
-import networkx as nx
 import numpy as np
 from matplotlib.cm import ScalarMappable
-from matplotlib.path import get_path_collection_extents
-from networkx import DiGraph, draw_networkx_edges, get_edge_attributes
 
+from clustree._clustree_graph import GRAPH_INPUT_TYPE, ClustreeGraph, as_clustree_graph
 from clustree._clustree_typing import (
     IMAGE_INPUT_TYPE,
+    LAYOUT_INPUT_TYPE,
+    LAYOUTS,
     ORIENTATION_INPUT_TYPE,
     OUTPUT_PATH_TYPE,
 )
+from clustree._edges import edge_collections
+from clustree._images import (
+    IMAGE_CACHE,
+    ImageCache,
+    compose_atlas,
+    prefetch_node_images,
+)
+from clustree._layout import layered_layout, tidy_tree_layout
+from clustree._profile import Profiler, profile_phase
 
 
-def ig_node_name_to_id(name, g):
-    return g.vs.find(name=name).index
+def _array_layout_coords(
+    g: ClustreeGraph, layout_func: Callable[..., np.ndarray]
+) -> dict[int, tuple[float, float]]:
+    """Positions from a layout function of node and edge arrays, see \
+    clustree._layout."""
+    coords = layout_func(
+        res=g.nodes.res, start=g.edges.start, end=g.edges.end, samples=g.edges.samples
+    )
+    return dict(zip(g.nodes.ids.tolist(), coords.tolist()))
 
 
-def get_pos(
-    dg: DiGraph, orientation: ORIENTATION_INPUT_TYPE, rt_layout: bool
-) -> dict[int, tuple[float, float]]:
+def _igraph_coords(g: ClustreeGraph) -> dict[int, tuple[float, float]]:
+    # vertex indexes are node ids, edges followed in both directions as before
+    layout = g.to_igraph().layout_reingold_tilford(mode="all", root=[0])
+    return dict(zip(g.nodes.ids.tolist(), layout.coords))
 
-    if rt_layout:
-        nodes = list(dg.nodes)
-        edges = list(dg.edges)
 
-        g = ig.Graph()
-        g.add_vertices(n=nodes)
-        ls_as_id = [
-            (
-                ig_node_name_to_id(name=node_from, g=g),
-                ig_node_name_to_id(name=node_to, g=g),
-            )
-            for node_from, node_to in edges
-        ]
-        g.add_edges(ls_as_id)
-        layout = g.layout_reingold_tilford(root=[0])
-        pos = {k: v for k, v in zip(nodes, layout.coords)}
+def _multipartite_coords(g: ClustreeGraph) -> dict[int, tuple[float, float]]:
+    import networkx as nx
+
+    # multipartite_layout only reads the layer of each node
+    layers = nx.empty_graph(0)
+    layers.add_nodes_from(
+        (node, {"res": res}) for node, res in zip(g.nodes.ids.tolist(), g.nodes.res)
+    )
+    return nx.multipartite_layout(layers, "res")
+
+
+def _node_xy(g: ClustreeGraph, pos: dict[int, tuple[float, float]]) -> np.ndarray:
+    """Positions as an array of shape (n_nodes, 2), indexed by node id."""
+    return np.array([pos[v] for v in g.nodes.ids.tolist()], dtype=float).reshape(-1, 2)
+
+
+def get_pos(
+    dg: GRAPH_INPUT_TYPE,
+    orientation: ORIENTATION_INPUT_TYPE,
+    layout: LAYOUT_INPUT_TYPE,
+) -> dict[int, tuple[float, float]]:
+    """
+    Node positions, normalised to the unit square.
+
+    Parameters
+    ----------
+    dg : Union[ClustreeGraph, DiGraph]
+        Clustree graph.
+    orientation : Literal["vertical", "horizontal"]
+        Orientation of clustree drawing.
+    layout : Literal["tidy", "layered", "igraph", "multipartite"]
+        'tidy' for the native Reingold-Tilford style layout (see \
+        clustree._layout.tidy_tree_layout), 'layered' for one layer per resolution \
+        ordered to reduce edge crossings (see clustree._layout.layered_layout), \
+        'igraph' for igraph's layout_reingold_tilford, or 'multipartite' for \
+        networkx's multipartite_layout with one layer per resolution, in arbitrary \
+        order.
+
+    Returns
+    -------
+        Dict mapping node id to (x, y) position.
+    """
+    g = as_clustree_graph(dg)
+    if layout == "tidy":
+        pos = _array_layout_coords(g=g, layout_func=tidy_tree_layout)
+    elif layout == "layered":
+        pos = _array_layout_coords(g=g, layout_func=layered_layout)
+    elif layout == "igraph":
+        pos = _igraph_coords(g=g)
+    elif layout == "multipartite":
+        pos = _multipartite_coords(g=g)
     else:
-        pos = nx.multipartite_layout(dg, "res")
+        raise ValueError(f"unknown layout '{layout}', use one of {LAYOUTS}")
+    res_on_x = layout == "multipartite"
     x_vals, y_vals = [v[0] for k, v in pos.items()], [v[1] for k, v in pos.items()]
     min_y, max_y = min(y_vals), max(y_vals)
     min_x, max_x = min(x_vals), max(x_vals)
@@ -49,7 +104,7 @@ def get_pos(
     norm_x = [(x - min_x) / (max_x - min_x) for x in x_vals]
     norm_y = [(y - min_y) / (max_y - min_y) for y in y_vals]
 
-    if not rt_layout:
+    if res_on_x:
         if orientation == "vertical":
             return {k: (y, 1 - x) for k, x, y in zip(list(pos.keys()), norm_x, norm_y)}
         return {k: (x, 1 - y) for k, x, y in zip(list(pos.keys()), norm_x, norm_y)}
@@ -58,129 +113,260 @@ def get_pos(
     return {k: (y, x) for k, x, y in zip(list(pos.keys()), norm_x, norm_y)}
 
 
-def getbb(sc, ax):
-    """Function to return a list of bounding boxes in data coordinates
-    for a scatter plot"""
-    ax.figure.canvas.draw()  # need to draw before the transforms are set.
-    transform = sc.get_transform()
-    transOffset = sc.get_offset_transform()
-    offsets = sc._offsets
-    paths = sc.get_paths()
-    transforms = sc.get_transforms()
-
-    if not transform.is_affine:
-        paths = [transform.transform_path_non_affine(p) for p in paths]
-        transform = transform.get_affine()
-    if not transOffset.is_affine:
-        offsets = transOffset.transform_non_affine(offsets)
-        transOffset = transOffset.get_affine()
-
-    if isinstance(offsets, np.ma.MaskedArray):
-        offsets = offsets.filled(np.nan)
-
-    bboxes = []
-
-    if len(paths) and len(offsets):
-        if len(paths) < len(offsets):
-            # for usual scatters you have one path, but several offsets
-            paths = [paths[0]] * len(offsets)
-        if len(transforms) < len(offsets):
-            # often you may have a single scatter size, but several offsets
-            transforms = [transforms[0]] * len(offsets)
-
-        for p, o, t in zip(paths, offsets, transforms):
-            result = get_path_collection_extents(
-                transform.frozen(), [p], [t], [o], transOffset.frozen()
-            )
-            bboxes.append(result.transformed(ax.transData.inverted()))
-
-    return bboxes
-
-
-def bb_to_extent(bb):
-    bb = bb._points
-    l, b = bb[0][0], bb[0][1]
-    r, t = bb[1][0], bb[1][1]
-    return (l, r, b, t)
-
-
-def get_nodes_bbox(dg, pos, figsize, node_size, node_size_edge):
-    fig, ax = plt.subplots(figsize=figsize)
-
-    # draw_edges
-    draw_networkx_edges(G=dg, pos=pos, node_shape="s", node_size=node_size_edge, ax=ax)
-
-    # draw scatter
-    nodelist = list(dg)
-    xy = np.asarray([pos[v] for v in nodelist])
-    node_color = "#1f78b4"
-    alpha = None
-    cmap = None
-    vmin = None
-    vmax = None
-    ax = ax
-    linewidths = None
-    edgecolors = None
-    label = None
-
-    node_collection = ax.scatter(
-        xy[:, 0],
-        xy[:, 1],
-        s=node_size,
-        c=node_color,
-        marker="s",
-        cmap=cmap,
-        vmin=vmin,
-        vmax=vmax,
-        alpha=alpha,
-        linewidths=linewidths,
-        edgecolors=edgecolors,
-        label=label,
-    )
-
-    # use get_bb
-    bbox = {
-        node_id: bb for node_id, bb in zip(nodelist, getbb(sc=node_collection, ax=ax))
+def get_nodes_extent(
+    dg: GRAPH_INPUT_TYPE,
+    pos: dict[int, tuple[float, float]],
+    figsize: tuple[float, float],
+    node_size: float,
+) -> dict[int, tuple[float, float, float, float]]:
+    """
+    Extent (left, right, bottom, top) in data coordinates of a square marker of \
+    area node_size (points^2) centred on each node, in axes of a figure of size \
+    figsize.
+
+    Computed analytically rather than by drawing: data limits are those set by \
+    draw_edges (edge bounding box padded by 5%) and \
+    Axes.scatter, widened by the axes margins, and the axes occupy the subplot \
+    area given by matplotlib's rcParams. Marker side is sqrt(node_size) points \
+    whatever the dpi, so the extent does not depend on dpi.
+    """
+    g = as_clustree_graph(dg)
+    xy = _node_xy(g=g, pos=pos)
+    lo, hi = xy.min(axis=0), xy.max(axis=0)
+    if g.number_of_edges():
+        edge_xy = np.concatenate([xy[g.edges.start], xy[g.edges.end]])
+        edge_lo, edge_hi = edge_xy.min(axis=0), edge_xy.max(axis=0)
+        pad = 0.05 * (edge_hi - edge_lo)
+        lo = np.minimum(lo, edge_lo - pad)
+        hi = np.maximum(hi, edge_hi + pad)
+    margins = np.array([mpl.rcParams["axes.xmargin"], mpl.rcParams["axes.ymargin"]])
+    span = (hi - lo) * (1 + 2 * margins)
+
+    subplot = {
+        side: mpl.rcParams[f"figure.subplot.{side}"]
+        for side in ("left", "right", "bottom", "top")
     }
-    extent = {node_id: bb_to_extent(ele) for node_id, ele in bbox.items()}
-    plt.close()
-    return extent
+    axes_inches = np.asarray(figsize, dtype=float) * [
+        subplot["right"] - subplot["left"],
+        subplot["top"] - subplot["bottom"],
+    ]
+    half = np.sqrt(node_size) / 72 / 2 / axes_inches * span
+    extent = np.column_stack([xy[:, 0] - half[0], xy[:, 0] + half[0]])
+    extent = np.column_stack([extent, xy[:, 1] - half[1], xy[:, 1] + half[1]])
+    return dict(zip(g.nodes.ids.tolist(), map(tuple, extent.tolist())))
+
+
+def get_nodes_pixels(
+    extent: dict[int, tuple[float, float, float, float]], ax: plt.Axes, dpi: float
+) -> dict[int, int]:
+    """Side in pixels of each node image, when the figure of ax is saved at dpi. \
+    Found from the current data to display transform of ax, which adding images \
+    (which widens data limits) and equal aspect can only shrink, so this is an \
+    upper bound."""
+    scale = np.abs(np.diff(ax.transData.transform([[0, 0], [1, 1]]), axis=0)[0])
+    scale *= dpi / ax.figure.dpi
+    bounds = np.array(list(extent.values()), dtype=float).reshape(-1, 4)
+    width = (bounds[:, 1] - bounds[:, 0]) * scale[0]
+    height = (bounds[:, 3] - bounds[:, 2]) * scale[1]
+    side = np.ceil(np.maximum(width, height)).astype(int)
+    return dict(zip(extent, side.tolist()))
+
+
+def _load_node_images(
+    dg: GRAPH_INPUT_TYPE,
+    path: IMAGE_INPUT_TYPE,
+    border_size_prop: float,
+    target_size: dict[int, int],
+    image_cache: Optional[ImageCache],
+    image_workers: Optional[int],
+    profiler: Optional[Profiler] = None,
+) -> tuple[list[int], list[np.ndarray]]:
+    # resolutions as named in the membership columns, e.g. '0.4' for 'leiden_0.4'
+    g = as_clustree_graph(dg)
+    resolutions = g.resolutions
+    node_ids = g.nodes.ids.tolist()
+    requests = []
+    for node_id, res, k, color in zip(
+        node_ids,
+        g.nodes.res.tolist(),
+        g.nodes.k.tolist(),
+        map(tuple, g.nodes.node_color.tolist()),
+    ):
+        res = res if resolutions is None else resolutions[res - 1]
+        file_name: str = f"{res}_{k}.png"
+        requests.append(
+            dict(
+                img_path=path + file_name,
+                border_size_prop=border_size_prop,
+                border_color=color,
+                target_size=target_size.get(node_id),
+            )
+        )
+    with profile_phase(profiler, "images") as counters:
+        misses = 0
+        if profiler is not None and image_cache is not None:
+            misses = image_cache.info().misses
+        images = prefetch_node_images(
+            requests=requests, image_cache=image_cache, max_workers=image_workers
+        )
+        if profiler is not None:
+            counters["images"] = len(images)
+            counters["images_decoded"] = len(images)
+            if image_cache is not None:
+                counters["images_decoded"] = image_cache.info().misses - misses
+            counters["image_bytes"] = sum(img.nbytes for img in images)
+    return node_ids, images
 
 
 def draw_custom_nodes(
-    dg: DiGraph,
-    extent: Sequence[float],
+    dg: GRAPH_INPUT_TYPE,
+    extent: dict[int, tuple[float, float, float, float]],
     path: IMAGE_INPUT_TYPE,
     ax: plt.Axes,
     border_size_prop: float,
+    dpi: Optional[float] = None,
+    image_cache: Optional[ImageCache] = IMAGE_CACHE,
+    image_workers: Optional[int] = None,
+    profiler: Optional[Profiler] = None,
 ):
-    for node_id, attr in dg.nodes.data():
-        file_name: str = f"{attr['res']}_{attr['k']}.png"
-        img_path = path + file_name
-        img = cv2.imread(img_path)
-        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        if border_size_prop == float(0):
-            ax.imshow(img, extent=extent[node_id], aspect=1, origin="upper", zorder=2)
-        else:
-            border_size = int(img.shape[0] * border_size_prop)
-            border_color = tuple(val * 255 for val in attr["node_color"])
-            img_with_border = cv2.copyMakeBorder(
-                img,
-                border_size,
-                border_size,
-                border_size,
-                border_size,
-                cv2.BORDER_CONSTANT,
-                value=border_color,
-            )
-            ax.imshow(
-                img_with_border,
-                extent=extent[node_id],
-                aspect="equal",
-                origin="upper",
-                zorder=2,
-            )
-    ax.autoscale()
+    """Draw each node as its image. If dpi is supplied, images are downscaled to \
+    the size they will have when saved at dpi. All images are loaded on a pool of \
+    image_workers threads before any is drawn."""
+    target_size = {}
+    if dpi:
+        target_size = get_nodes_pixels(extent=extent, ax=ax, dpi=dpi)
+    node_ids, images = _load_node_images(
+        dg=dg,
+        path=path,
+        border_size_prop=border_size_prop,
+        target_size=target_size,
+        image_cache=image_cache,
+        image_workers=image_workers,
+        profiler=profiler,
+    )
+    with profile_phase(profiler, "draw_nodes") as counters:
+        for node_id, img in zip(node_ids, images):
+            if border_size_prop == float(0):
+                ax.imshow(
+                    img, extent=extent[node_id], aspect=1, origin="upper", zorder=2
+                )
+            else:
+                ax.imshow(
+                    img,
+                    extent=extent[node_id],
+                    aspect="equal",
+                    origin="upper",
+                    zorder=2,
+                )
+        ax.autoscale()
+        counters["nodes"] = len(node_ids)
+
+
+def draw_nodes_atlas(
+    dg: GRAPH_INPUT_TYPE,
+    extent: dict[int, tuple[float, float, float, float]],
+    path: IMAGE_INPUT_TYPE,
+    ax: plt.Axes,
+    border_size_prop: float,
+    dpi: Optional[float] = None,
+    image_cache: Optional[ImageCache] = IMAGE_CACHE,
+    image_workers: Optional[int] = None,
+    profiler: Optional[Profiler] = None,
+):
+    """Draw all node images as one image artist. Images are placed at their \
+    pixel position, at the resolution they will have when saved at dpi, in a \
+    transparent canvas covering all node extents, so matplotlib draws one artist \
+    rather than one per node."""
+    if len(extent) == 0:
+        return
+    if not dpi:
+        dpi = ax.figure.dpi
+    target_size = get_nodes_pixels(extent=extent, ax=ax, dpi=dpi)
+    node_ids, images = _load_node_images(
+        dg=dg,
+        path=path,
+        border_size_prop=border_size_prop,
+        target_size=target_size,
+        image_cache=image_cache,
+        image_workers=image_workers,
+        profiler=profiler,
+    )
+
+    with profile_phase(profiler, "draw_nodes") as counters:
+        # pixel bounds of each node within the canvas, at dpi
+        scale = np.abs(np.diff(ax.transData.transform([[0, 0], [1, 1]]), axis=0)[0])
+        scale *= dpi / ax.figure.dpi
+        bounds = np.array([extent[node_id] for node_id in node_ids], dtype=float)
+        left, right = bounds[:, 0].min(), bounds[:, 1].max()
+        bottom, top = bounds[:, 2].min(), bounds[:, 3].max()
+        cols = np.rint((bounds[:, :2] - left) * scale[0]).astype(int)
+        rows = np.rint((top - bounds[:, [3, 2]]) * scale[1]).astype(int)
+        shape = (
+            max(int(np.ceil((top - bottom) * scale[1])), 1),
+            max(int(np.ceil((right - left) * scale[0])), 1),
+        )
+        canvas = compose_atlas(
+            images=images, boxes=np.column_stack([rows, cols]), shape=shape
+        )
+        ax.imshow(
+            canvas,
+            extent=(left, right, bottom, top),
+            aspect="equal",
+            origin="upper",
+            zorder=2,
+        )
+        ax.autoscale()
+        counters["nodes"] = len(node_ids)
+
+
+def draw_edges(
+    dg: GRAPH_INPUT_TYPE,
+    pos: dict[int, tuple[float, float]],
+    ax: plt.Axes,
+    node_size: float,
+    arrows: bool,
+):
+    """
+    Draw all edges as one LineCollection, colored by edge_color with alpha \
+    in_prop, plus their arrowheads as one PolyCollection if arrows is True.
+
+    Replaces networkx.draw_networkx_edges, which draws a FancyArrowPatch per edge \
+    when arrows are drawn. Arrows are kept clear of square nodes of area node_size \
+    (points^2), and data limits and ticks are set as networkx sets them.
+    """
+    g = as_clustree_graph(dg)
+    if g.number_of_edges() == 0:
+        return
+    # drawn grouped by start node, in the order networkx iterates edges
+    order = np.argsort(g.edges.start, kind="stable")
+    node_xy = _node_xy(g=g, pos=pos)
+    start, end = node_xy[g.edges.start[order]], node_xy[g.edges.end[order]]
+    colors = np.array(g.edges.edge_color, dtype=float)[order].reshape(-1, 4)
+    colors[:, 3] = g.edges.in_prop[order]
+    lines, heads = edge_collections(
+        start=start,
+        end=end,
+        colors=colors,
+        node_size=node_size,
+        arrows=arrows,
+    )
+    ax.add_collection(lines, autolim=False)
+    if heads is not None:
+        ax.add_collection(heads, autolim=False)
+
+    xy = np.concatenate([start, end])
+    lo, hi = xy.min(axis=0), xy.max(axis=0)
+    pad = 0.05 * (hi - lo)
+    ax.update_datalim([lo - pad, hi + pad])
+    ax.autoscale_view()
+    ax.tick_params(
+        axis="both",
+        which="both",
+        bottom=False,
+        left=False,
+        labelbottom=False,
+        labelleft=False,
+    )
 
 
 def add_legend(
@@ -208,11 +394,11 @@ def add_legend(
 
 
 def draw_clustree(
-    dg: DiGraph,
+    dg: GRAPH_INPUT_TYPE,
     path: OUTPUT_PATH_TYPE,
     images: IMAGE_INPUT_TYPE,
     orientation: ORIENTATION_INPUT_TYPE,
-    rt_layout: bool,
+    layout: LAYOUT_INPUT_TYPE,
     figsize: tuple[float, float],
     node_size: float,
     node_size_edge: float,
@@ -223,46 +409,48 @@ def draw_clustree(
     node_color_title: str,
     edge_color_title: str,
     dpi: float,
+    pos: Optional[dict[int, tuple[float, float]]] = None,
+    extent: Optional[dict[int, tuple[float, float, float, float]]] = None,
+    image_cache: Optional[ImageCache] = IMAGE_CACHE,
+    image_workers: Optional[int] = None,
+    atlas: bool = False,
+    profiler: Optional[Profiler] = None,
 ):
-
-    pos = get_pos(dg=dg, orientation=orientation, rt_layout=rt_layout)
-    extent = get_nodes_bbox(
-        dg=dg,
-        pos=pos,
-        figsize=figsize,
-        node_size=node_size,
-        node_size_edge=node_size_edge,
-    )
+    dg = as_clustree_graph(dg)
+    if pos is None:
+        pos = get_pos(dg=dg, orientation=orientation, layout=layout)
+    if extent is None:
+        extent = get_nodes_extent(dg=dg, pos=pos, figsize=figsize, node_size=node_size)
 
     fig, ax = plt.subplots()
 
-    colors = get_edge_attributes(dg, "edge_color").values()
-    alpha = list(get_edge_attributes(dg, "in_prop").values())
-    draw_networkx_edges(
-        G=dg,
-        pos=pos,
-        node_shape="s",
-        node_size=node_size_edge,
-        arrows=arrows,
-        ax=ax,
-        edge_color=colors,
-        alpha=alpha,
-    )
-    draw_custom_nodes(
+    with profile_phase(profiler, "draw_edges") as counters:
+        draw_edges(dg=dg, pos=pos, ax=ax, node_size=node_size_edge, arrows=arrows)
+        counters["edges"] = dg.number_of_edges()
+    draw_nodes = draw_nodes_atlas if atlas else draw_custom_nodes
+    draw_nodes(
         dg=dg,
         extent=extent,
         path=images,
         ax=ax,
         border_size_prop=border_size,
+        dpi=dpi,
+        image_cache=image_cache,
+        image_workers=image_workers,
+        profiler=profiler,
     )
-    add_legend(
-        fig=fig,
-        ax=ax,
-        node_color_sm=node_color_sm,
-        edge_color_sm=edge_color_sm,
-        node_color_title=node_color_title,
-        edge_color_title=edge_color_title,
-    )
+    with profile_phase(profiler, "legend"):
+        add_legend(
+            fig=fig,
+            ax=ax,
+            node_color_sm=node_color_sm,
+            edge_color_sm=edge_color_sm,
+            node_color_title=node_color_title,
+            edge_color_title=edge_color_title,
+        )
     if path:
-        plt.savefig(path, dpi=dpi, bbox_inches="tight")
+        with profile_phase(profiler, "savefig") as counters:
+            plt.savefig(path, dpi=dpi, bbox_inches="tight")
+            if profiler is not None and isinstance(path, (str, Path)):
+                counters["bytes_written"] = os.path.getsize(path)
     plt.close(fig)
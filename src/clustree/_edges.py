@@ -0,0 +1,213 @@
+from typing import Optional
+
+import numpy as np
+from matplotlib.collections import LineCollection, PolyCollection
+
+# arrowhead of matplotlib's "-|>" arrow style at networkx's default arrowsize
+ARROW_SIZE = 10
+HEAD_LENGTH = 0.4 * ARROW_SIZE
+HEAD_HALF_WIDTH = 0.2 * ARROW_SIZE
+
+
+def marker_clearance(node_size: float) -> float:
+    """Distance in points from the centre of a square marker of area node_size \
+    (points^2) to its corner, which networkx keeps clear between an arrow and a \
+    square node."""
+    return float(np.sqrt(2 * node_size) / 2)
+
+
+def shrink_segments(
+    start: np.ndarray, end: np.ndarray, shrink_start: float, shrink_end: float
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Move both ends of segments towards each other.
+
+    Parameters
+    ----------
+    start, end : ndarray
+        Arrays of shape (n, 2) holding the ends of each segment.
+    shrink_start, shrink_end : float
+        Distance removed from the start and from the end of each segment. \
+        Segments shorter than the distance removed collapse to a point.
+
+    Returns
+    -------
+        Shrunk start and end, and the unit direction of each segment (zero for \
+        segments of zero length).
+    """
+    vec = end - start
+    length = np.hypot(vec[:, 0], vec[:, 1])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        direction = np.where(length[:, None] > 0, vec / length[:, None], 0.0)
+    total = shrink_start + shrink_end
+    scale = np.minimum(
+        1.0, np.divide(length, total, where=total > 0, out=np.ones(len(length)))
+    )
+    new_start = start + direction * (shrink_start * scale)[:, None]
+    new_end = end - direction * (shrink_end * scale)[:, None]
+    return new_start, new_end, direction
+
+
+def arrow_heads(
+    tip: np.ndarray, direction: np.ndarray, length: float, half_width: float
+) -> np.ndarray:
+    """Triangles of shape (n, 3, 2) with their apex at tip, pointing along \
+    direction."""
+    base = tip - direction * length
+    normal = np.column_stack([-direction[:, 1], direction[:, 0]]) * half_width
+    return np.stack([tip, base + normal, base - normal], axis=1)
+
+
+class EdgeCollection(LineCollection):
+    """
+    Straight edges between node positions, drawn as one LineCollection.
+
+    Ends are shrunk by a clearance given in points, like \
+    matplotlib.patches.FancyArrowPatch shrinkA and shrinkB, so segments are \
+    recomputed from the data to display transform each time they are drawn. If \
+    head_length is nonzero, edges also stop that many points short of their end, \
+    leaving room for an arrowhead, see ArrowHeadCollection.
+
+    Parameters
+    ----------
+    start, end : ndarray
+        Arrays of shape (n_edges, 2) holding start and end position of each edge, \
+        in data coordinates.
+    clearance : float
+        Distance in points kept clear around the start and end of each edge.
+    head_length : float
+        Length in points of the arrowhead at the end of each edge, if any.
+    **kwargs
+        Passed to LineCollection, e.g. colors and linewidths.
+    """
+
+    def __init__(
+        self,
+        start: np.ndarray,
+        end: np.ndarray,
+        clearance: float = 0.0,
+        head_length: float = 0.0,
+        **kwargs,
+    ):
+        super().__init__([], **kwargs)
+        self.start = np.asarray(start, dtype=float).reshape(-1, 2)
+        self.end = np.asarray(end, dtype=float).reshape(-1, 2)
+        self.clearance = clearance
+        self.head_length = head_length
+        self.set_segments(np.stack([self.start, self.end], axis=1))
+
+    def display_geometry(self, renderer) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Start, tip and unit direction of each edge in display coordinates, \
+        after clearance is removed from both ends."""
+        trans = self.axes.transData
+        clearance = renderer.points_to_pixels(self.clearance)
+        return shrink_segments(
+            start=trans.transform(self.start),
+            end=trans.transform(self.end),
+            shrink_start=clearance,
+            shrink_end=clearance,
+        )
+
+    def draw(self, renderer):
+        if len(self.start) and self.clearance + self.head_length > 0:
+            start, tip, direction = self.display_geometry(renderer)
+            head = np.minimum(
+                renderer.points_to_pixels(self.head_length),
+                np.hypot(*(tip - start).T),
+            )
+            end = tip - direction * head[:, None]
+            to_data = self.axes.transData.inverted()
+            self.set_segments(
+                np.stack([to_data.transform(start), to_data.transform(end)], axis=1)
+            )
+        super().draw(renderer)
+
+
+class ArrowHeadCollection(PolyCollection):
+    """
+    Filled triangular arrowheads at the end of the edges of an EdgeCollection, \
+    drawn as one PolyCollection and recomputed along with the edges.
+
+    Parameters
+    ----------
+    edges : EdgeCollection
+        Edges whose ends carry the arrowheads.
+    half_width : float
+        Half of the arrowhead width, in points.
+    **kwargs
+        Passed to PolyCollection, e.g. facecolors.
+    """
+
+    def __init__(
+        self, edges: EdgeCollection, half_width: float = HEAD_HALF_WIDTH, **kwargs
+    ):
+        super().__init__([], **kwargs)
+        self.edges = edges
+        self.half_width = half_width
+
+    def draw(self, renderer):
+        if len(self.edges.start):
+            _, tip, direction = self.edges.display_geometry(renderer)
+            heads = arrow_heads(
+                tip=tip,
+                direction=direction,
+                length=renderer.points_to_pixels(self.edges.head_length),
+                half_width=renderer.points_to_pixels(self.half_width),
+            )
+            to_data = self.axes.transData.inverted()
+            self.set_verts(to_data.transform(heads.reshape(-1, 2)).reshape(-1, 3, 2))
+        super().draw(renderer)
+
+
+def edge_collections(
+    start: np.ndarray,
+    end: np.ndarray,
+    colors: np.ndarray,
+    node_size: float,
+    arrows: bool,
+    linewidth: float = 1.0,
+) -> tuple[EdgeCollection, Optional[ArrowHeadCollection]]:
+    """
+    Collections drawing edges between node positions.
+
+    Parameters
+    ----------
+    start, end : ndarray
+        Arrays of shape (n_edges, 2) holding start and end position of each edge, \
+        in data coordinates.
+    colors : ndarray
+        RGBA color of each edge, of shape (n_edges, 4).
+    node_size : float
+        Area in points^2 of the square markers kept clear of arrows.
+    arrows : bool
+        If True, edge ends are kept clear of markers of node_size and carry an \
+        arrowhead. Otherwise, as with networkx, edges join node centres.
+    linewidth : float
+        Width of edges in points.
+
+    Returns
+    -------
+        Edge collection, and arrowhead collection if arrows is True.
+    """
+    if not arrows:
+        lines = EdgeCollection(
+            start=start, end=end, colors=colors, linewidths=linewidth, zorder=1
+        )
+        return lines, None
+    lines = EdgeCollection(
+        start=start,
+        end=end,
+        clearance=marker_clearance(node_size),
+        head_length=HEAD_LENGTH,
+        colors=colors,
+        linewidths=linewidth,
+        zorder=1,
+    )
+    heads = ArrowHeadCollection(
+        edges=lines,
+        facecolors=colors,
+        edgecolors=colors,
+        linewidths=linewidth,
+        zorder=1,
+    )
+    return lines, heads
@@ -1,21 +1,27 @@
-from typing import Optional
-
-from networkx import DiGraph
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional, Union
 
+from clustree._cache import ClustreeCache
+from clustree._clustree_graph import ClustreeGraph
 from clustree._clustree_typing import (
     CMAP_TYPE,
     COLOR_AGG_TYPE,
     DATA_INPUT_TYPE,
     EDGE_COLOR_TYPE,
+    GRAPH_TYPE,
     IMAGE_INPUT_TYPE,
+    LAYOUT_INPUT_TYPE,
     MIN_CLUSTER_NUMBER_TYPE,
     NODE_COLOR_TYPE,
+    NORM_TYPE,
     ORIENTATION_INPUT_TYPE,
     OUTPUT_PATH_TYPE,
 )
-from clustree._config import ClustreeConfig
-from clustree._draw import draw_clustree
-from clustree._handle_pars import get_and_check_cluster_cols, handle_data
+from clustree._model import ClustreeModel, warn_min_cluster_number
+from clustree._profile import Profiler
+
+if TYPE_CHECKING:
+    from networkx import DiGraph
 
 
 def clustree(
@@ -27,10 +33,13 @@ def clustree(
     node_color: NODE_COLOR_TYPE = "prefix",
     node_color_aggr: COLOR_AGG_TYPE = None,
     node_cmap: CMAP_TYPE = "inferno",
+    node_norm: NORM_TYPE = "linear",
     edge_color: EDGE_COLOR_TYPE = "samples",
     edge_cmap: CMAP_TYPE = "viridis",
+    edge_norm: NORM_TYPE = "linear",
     orientation: ORIENTATION_INPUT_TYPE = "vertical",
     layout_reingold_tilford: bool = None,
+    layout: Optional[LAYOUT_INPUT_TYPE] = None,
     min_cluster_number: MIN_CLUSTER_NUMBER_TYPE = None,
     border_size: float = 0.05,
     figsize: tuple[float, float] = None,
@@ -38,16 +47,35 @@ def clustree(
     node_size: float = 300,
     node_size_edge: Optional[float] = None,
     dpi: float = 500,
+    image_workers: Optional[int] = None,
+    atlas: bool = False,
     kk: Optional[int] = None,
-) -> DiGraph:
+    chunksize: Optional[int] = None,
+    deduplicate: bool = False,
+    count_col: Optional[str] = None,
+    min_edge_samples: int = 0,
+    min_in_prop: float = 0.0,
+    max_in_edges_per_node: Optional[int] = None,
+    graph_type: GRAPH_TYPE = "networkx",
+    cache_dir: Optional[Union[str, Path, ClustreeCache]] = None,
+    profiler: Optional[Profiler] = None,
+) -> Union["DiGraph", ClustreeGraph]:
     """
 
     Parameters
     ----------
-    data : Union[Path, str]
-        Path of csv or DataFrame object.
+    data : Union[Path, str, pd.DataFrame, np.ndarray, pa.Table]
+        Path of csv, Parquet (.parquet), Feather (.feather, .arrow) or NumPy (.npy) \
+        file, or DataFrame, Arrow table or array (including np.memmap) object. Arrays \
+        must have shape (n, kk) and hold cluster membership for K in 1, ..., kk. \
+        Only the columns needed are read from Parquet and Feather files, and .npy \
+        files are memory-mapped. Reading Parquet, Feather or Arrow data requires \
+        pyarrow.
     prefix : str
-        String indicating columns containing clustering information.
+        String indicating columns containing clustering information. Columns named \
+        prefix followed by a resolution, e.g. 'K1', 'K2', ... for prefix 'K' or \
+        'leiden_0.2', 'leiden_0.4', ... for prefix 'leiden_', hold cluster \
+        membership, ordered by resolution.
     images : Union[Path, str]
         Path of directory that contains images.
     output_path : Union[Path, str], optional
@@ -64,11 +92,19 @@ def clustree(
         set equal to value of prefix to color by resolution.
     node_color_aggr : Union[Callable, str], optional
         If node_color is a column name then a function or string giving the name of a \
-        function to aggregate that column for samples in each cluster.
+        function to aggregate that column for samples in each cluster. 'mean', \
+        'median', 'sum', 'min', 'max', 'std' and 'count' (or functions of these \
+        names) are computed for all resolutions and metadata columns at once and \
+        cached, so recoloring by any of them needs no further pass over the data.
     node_cmap : Union[mpl.colors.Colormap, str]
         If node_color is 'samples' or a column name then a colourmap to use (see \
         Colormap Matplotlib tutorial here: \
         https://matplotlib.org/stable/tutorials/colors/colormaps.html).
+    node_norm : Literal["linear", "log", "quantile"]
+        If node_color is 'samples' or a column name then how values are mapped onto \
+        node_cmap: 'linear' from minimum to maximum, 'log' on a log scale (values \
+        must be positive) or 'quantile' by rank, so that skewed values spread over \
+        the whole colormap. Defaults to 'linear'.
     edge_color : str
         For continuous colormap, use 'samples'. For discrete colors, use 'prefix' to \
         color by resolution or specify a fixed color (see Specifying colors in \
@@ -78,16 +114,28 @@ def clustree(
     edge_cmap : Union[mpl.colors.Colormap, str]
         If edge_color is 'samples' then a colourmap to use (see Colormap Matplotlib \
         tutorial here: https://matplotlib.org/stable/tutorials/colors/colormaps.html).
+    edge_norm : Literal["linear", "log", "quantile"]
+        If edge_color is 'samples' then how values are mapped onto edge_cmap, as for \
+        node_norm. Defaults to 'linear'.
     orientation : Literal["vertical", "horizontal"]
         Orientation of clustree drawing. Defaults to 'vertical'.
     layout_reingold_tilford : bool, optional
-        Whether to use the Reingold-Tilford algorithm for node positioning. Defaults \
-        to True if (kk <= 12), False otherwise. Setting True not recommended if \
-        (kk > 12) due to memory bottleneck in igraph dependency.
+        Whether to use a Reingold-Tilford style tidy tree layout for node \
+        positioning, placing each node under the parent that contributes most \
+        samples. Otherwise nodes are placed in one layer per resolution. Defaults \
+        to True.
+    layout : Literal["tidy", "layered", "igraph", "multipartite"], optional
+        Layout algorithm, overrides layout_reingold_tilford if supplied. 'tidy' is \
+        the tidy tree layout used by layout_reingold_tilford=True. 'layered' places \
+        nodes in one layer per resolution, ordered within each layer to reduce \
+        crossings of edges weighted by #samples. 'igraph' uses igraph's \
+        Reingold-Tilford layout, which runs out of memory for large kk. \
+        'multipartite' places nodes in one layer per resolution in arbitrary order, \
+        as used by layout_reingold_tilford=False.
     min_cluster_number : Literal[0, 1], optional
-        Cluster number can take values (0, ..., K-1) or (1, ..., K). If the former \
-        option is preferred, parameter should take value 0, and 1 otherwise. \
-        Defaults to None, in which case, minimum cluster number is found automatically.
+        Deprecated, has no effect. Nodes are created for the cluster numbers \
+        observed in data, whether they start at 0 or 1, and node images are named \
+        by those numbers.
     border_size : float
         Border width as proportion of image width. Defaults to 0.05.
     figsize : tuple[float, float]
@@ -100,17 +148,74 @@ def clustree(
         Size of nodes in clustree graph drawing. Parsed directly to \
         networkx.draw_networkx_nodes. Deafult to 300.
     node_size_edge: float
-        Controls edge start and end point. Parsed directly to \
-        networkx.draw_networkx_edges.
+        Controls edge start and end point: if arrows are drawn, edges stop at the \
+        corner of a square of area node_size_edge (points^2) centred on each node. \
+        Defaults to 3 * node_size.
     dpi : float
         Controls resolution of output if saved to file.
+    image_workers : int, optional
+        Number of threads used to decode node images. Defaults to None, the \
+        default of concurrent.futures.ThreadPoolExecutor. If 1, images are decoded \
+        sequentially.
+    atlas : bool
+        Whether to compose all node images into one image, drawn with a single \
+        matplotlib artist, rather than drawing one image per node. Faster to draw \
+        and save for trees with many nodes. Defaults to False.
     kk : int, optional
-        Choose custom depth of clustree graph.
+        Choose custom depth of clustree graph, i.e. keep only the first kk \
+        resolutions.
+    chunksize : int, optional
+        If data is a path, read the file in chunks of chunksize rows and keep only \
+        running totals of node and edge counts, so that memory use does not grow with \
+        the number of rows. If node_color is a column name, node_color_aggr must be \
+        one of 'sum', 'mean', 'std', 'min', 'max' or 'count'. Ignored if data is not \
+        a path.
+    deduplicate : bool
+        Whether to collapse rows of cluster membership into unique paths through \
+        the clustree, with the number of samples following each, before counting \
+        nodes and edges. Counts are unchanged, but counting time scales with the \
+        number of unique paths rather than rows, which saves time when many \
+        samples share the same clusters at every resolution. Defaults to False.
+    count_col : str, optional
+        Name of a column of data holding the number of samples represented by each \
+        row, e.g. for data already collapsed into unique paths with their counts. \
+        If node_color is a column name, it is aggregated weighted by count_col, and \
+        node_color_aggr must be one of 'sum', 'mean', 'std', 'min', 'max' or \
+        'count'. Defaults to None, in which case each row is one sample.
+    min_edge_samples : int
+        Edges with fewer samples are discarded. Defaults to 0.
+    min_in_prop : float
+        Edges carrying a smaller proportion of the samples of the node they end at \
+        are discarded. Defaults to 0.
+    max_in_edges_per_node : int, optional
+        Of the edges into each node remaining, keep only this many with the most \
+        samples. Edges are pruned while the edge table is built, so pruned edges \
+        never reach the graph, its layout or its drawing. Nodes keep their \
+        samples, and in_prop of the edges kept is unchanged. Defaults to None, in \
+        which case all edges are kept.
+    graph_type : Literal["networkx", "clustree"]
+        Type of graph returned. 'clustree' returns a ClustreeGraph, backed by the \
+        node and edge arrays that layout and drawing use, which converts to \
+        networkx, igraph or a scipy sparse adjacency matrix on request, so no \
+        Python object is built per node or edge unless asked for. Defaults to \
+        'networkx'.
+    cache_dir : Union[Path, str, ClustreeCache], optional
+        Directory in which to cache node and edge counts, aggregated node_color \
+        values and layout positions, keyed by a hash of the contents of data. If the \
+        same data is drawn again, counts are loaded from the cache instead of being \
+        recomputed. Least recently used entries are evicted once the cache exceeds \
+        1 GiB; supply a ClustreeCache to change this limit or to evict by age. \
+        Defaults to None, in which case nothing is cached.
+    profiler : Profiler, optional
+        If supplied, the wall time, peak traced memory (if profiler.trace_memory) \
+        and counters such as nodes, edges and images decoded of each phase, from \
+        reading data to savefig, are recorded to profiler. See clustree.Profiler. \
+        Defaults to None, in which case nothing is recorded.
 
     Returns
     -------
-    networkx.DiGraph
-        Clustree drawing.
+    Union[networkx.DiGraph, ClustreeGraph]
+        Clustree graph, as a networkx DiGraph or ClustreeGraph by graph_type.
 
     Notes
     -------
@@ -120,76 +225,56 @@ def clustree(
  chosen by user.
 
     The directory of images should contain files in format 'K_k.png', where K \
-    (in 1, ..., kk) is cluster resolution and k (in 1, ..., K) is cluster number. \
-    Alternatively, by setting the parameter min_cluster_number = 0, k is expected to \
-    take values in 0, ..., K-1.
-    """
-
-    _data = handle_data(data=data)
-    kk = get_and_check_cluster_cols(cols=_data.columns, prefix=prefix, user_kk=kk)
+    (in 1, ..., kk) is cluster resolution and k is cluster number as in data, e.g. \
+    in 1, ..., K or 0, ..., K-1.
 
-    border_size = float(border_size)
-    images = str(images)
-    if images[-1] != "/":
-        images = images + "/"
-    if min_cluster_number:
-        start_at_1 = bool(min_cluster_number)
-    else:
-        start_at_1 = int(_data[f"{prefix}1"].min()) == 1
-    if not figsize:
-        if kk < 6:
-            figsize = (3, 3)
-        else:
-            w = min([kk, 20]) / 2
-            figsize = (w, w)
-    if arrows is None:
-        arrows = False
-        if kk <= 10:
-            arrows = True
-    if not node_size_edge:
-        node_size_edge = 3 * node_size
-
-    if layout_reingold_tilford is None:
-        layout_reingold_tilford = False
-        if kk < 13:
-            layout_reingold_tilford = True
+    Resolutions need not be consecutive integers, and a resolution may have any \
+    number of clusters: one node is created per cluster number observed in data. \
+    Images are then named by resolution as written in the column name and cluster \
+    number, e.g. '0.4_17.png' for cluster 17 of column 'leiden_0.4'.
+    """
 
-    config = ClustreeConfig(
+    if min_cluster_number is not None:
+        warn_min_cluster_number()
+    model = ClustreeModel(
+        data=data,
         prefix=prefix,
         kk=kk,
-        data=_data,
+        chunksize=chunksize,
+        metadata_cols=[node_color],
+        deduplicate=deduplicate,
+        count_col=count_col,
+        min_edge_samples=min_edge_samples,
+        min_in_prop=min_in_prop,
+        max_in_edges_per_node=max_in_edges_per_node,
+        cache_dir=cache_dir,
+        profiler=profiler,
+    )
+    style = dict(
         node_color=node_color,
         node_color_aggr=node_color_aggr,
         node_cmap=node_cmap,
+        node_norm=node_norm,
         edge_color=edge_color,
         edge_cmap=edge_cmap,
-        start_at_1=start_at_1,
+        edge_norm=edge_norm,
     )
-
-    dg = construct_clustree(cf=config)
     if draw or output_path:
-        draw_clustree(
-            dg=dg,
-            path=output_path,
-            orientation=orientation,
-            rt_layout=layout_reingold_tilford,
+        return model.render(
             images=images,
+            output_path=output_path,
+            orientation=orientation,
+            layout_reingold_tilford=layout_reingold_tilford,
+            layout=layout,
+            border_size=border_size,
             figsize=figsize,
+            arrows=arrows,
             node_size=node_size,
             node_size_edge=node_size_edge,
             dpi=dpi,
-            border_size=border_size,
-            arrows=arrows,
-            node_color_sm=config.node_color_sm,
-            edge_color_sm=config.edge_color_sm,
-            node_color_title=config.node_color_legend_title,
-            edge_color_title=config.edge_color_legend_title,
+            image_workers=image_workers,
+            atlas=atlas,
+            graph_type=graph_type,
+            **style,
         )
-    return dg
-
-
-def construct_clustree(cf: ClustreeConfig) -> DiGraph:
-    dg = DiGraph()
-    dg.add_nodes_from([(k, v) for k, v in cf.node_cf.items()])
-    dg.add_edges_from([(v["start"], v["end"], v) for v in cf.edge_cf.values()])
-    return dg
+    return model.graph(graph_type=graph_type, **style)
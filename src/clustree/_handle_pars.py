@@ -1,35 +1,224 @@
 import re
+from collections.abc import Iterator
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, List, Optional, Union
 
+import numpy as np
 import pandas as pd
 
-from clustree._clustree_typing import DATA_INPUT_TYPE
+from clustree._clustree_typing import DATA_INPUT_TYPE, TABLE_TYPE
 
 
-def get_and_check_cluster_cols(
-    cols: List[str], prefix: str, user_kk: Optional[int]
-) -> int:
-    pattern = f"{prefix}[0-9]+"
-    if user_kk:
-        cols = [
-            x
-            for x in cols
-            if re.match(pattern, x) and int(x.removeprefix(prefix)) <= user_kk
-        ]
-    else:
-        cols = [x for x in cols if re.match(pattern, x)]
-    cols_as_int = [int(ele.removeprefix(prefix)) for ele in cols]
+def get_resolution_cols(
+    cols: List[str], prefix: str, user_kk: Optional[int] = None
+) -> List[str]:
+    """
+
+    Parameters
+    ----------
+    cols : List[str]
+        Column names of data.
+    prefix : str
+        String indicating columns containing clustering information. A column \
+        holds cluster membership if it is prefix followed by a resolution, i.e. an \
+        integer or decimal number, e.g. 'K2' for prefix 'K' or 'leiden_0.4' for \
+        prefix 'leiden_'.
+    user_kk : int, optional
+        If supplied, only the first user_kk resolutions are kept.
 
-    if max(cols_as_int) != len(cols_as_int):
+    Returns
+    -------
+        Cluster membership columns, ordered by resolution. Resolutions need not be \
+        consecutive integers, and resolution K need not have K clusters.
+    """
+    pattern = re.compile(re.escape(prefix) + r"(\d+(?:\.\d+)?)")
+    matches = [(pattern.fullmatch(col), col) for col in cols]
+    res_cols = sorted(
+        (float(match.group(1)), col) for match, col in matches if match is not None
+    )
+    if not res_cols:
         raise ValueError(
-            f"cols with prefix '{prefix}' should be consecutive integers: \
-         '{prefix}1', '{prefix}2', ..., '{prefix}N'"
+            f"no cols with prefix '{prefix}' followed by a resolution, e.g. "
+            f"'{prefix}1' or '{prefix}0.5'"
         )
-    return max(cols_as_int)
+    if user_kk:
+        res_cols = res_cols[:user_kk]
+    return [col for _, col in res_cols]
+
+
+def get_resolutions(membership_cols: List[str], prefix: str) -> List[str]:
+    """Resolution of each membership column as written in its name, e.g. '0.4' \
+    for 'leiden_0.4', used to name node images."""
+    return [col.removeprefix(prefix) for col in membership_cols]
+
+
+def get_membership_cols(prefix: str, kk: int) -> List[str]:
+    return [f"{prefix}{str(k_upper)}" for k_upper in range(1, kk + 1)]
+
 
+def _import_pyarrow():
+    try:
+        import pyarrow as pa
+    except ImportError as e:  # pragma: no cover
+        raise ImportError(
+            "reading Parquet, Feather or Arrow data requires pyarrow, install it "
+            "with 'pip install clustree[arrow]'"
+        ) from e
+    return pa
 
-def handle_data(data: DATA_INPUT_TYPE) -> pd.DataFrame:
+
+def _is_arrow(data: Any) -> bool:
+    return type(data).__module__.startswith("pyarrow")
+
+
+def _file_format(path: Union[str, Path]) -> str:
+    suffix = Path(path).suffix.lower()
+    if suffix in (".parquet", ".pq"):
+        return "parquet"
+    if suffix in (".feather", ".arrow", ".ipc"):
+        return "feather"
+    if suffix == ".npy":
+        return "npy"
+    return "csv"
+
+
+def get_columns(data: DATA_INPUT_TYPE, prefix: str) -> List[str]:
+    """Column names of data. Arrays of shape (n, kk) are taken to hold cluster \
+    membership for K in 1, ..., kk, i.e. columns prefix1, ..., prefix{kk}."""
     if isinstance(data, (str, Path)):
-        return pd.read_csv(data)
+        file_format = _file_format(data)
+        if file_format == "csv":
+            return list(pd.read_csv(data, nrows=0).columns)
+        if file_format == "npy":
+            data = np.load(data, mmap_mode="r")
+        else:
+            pa = _import_pyarrow()
+            if file_format == "parquet":
+                import pyarrow.parquet as pq
+
+                return pq.read_schema(data).names
+            with pa.memory_map(str(data)) as source:
+                return pa.ipc.open_file(source).schema.names
+    if isinstance(data, np.ndarray):
+        return get_membership_cols(prefix=prefix, kk=data.shape[1])
+    if _is_arrow(data):
+        return data.schema.names
+    return list(data.columns)
+
+
+def _iter_row_chunks(data: Any, chunksize: int) -> Iterator[Any]:
+    for start in range(0, len(data), chunksize):
+        stop = start + chunksize
+        yield data[start:stop]
+
+
+def handle_data(
+    data: DATA_INPUT_TYPE,
+    membership_cols: Optional[List[str]] = None,
+    metadata_cols: Optional[List[str]] = None,
+    chunksize: Optional[int] = None,
+) -> Union[TABLE_TYPE, Iterator[TABLE_TYPE]]:
+    """
+
+    Parameters
+    ----------
+    data : Union[Path, str, pd.DataFrame, np.ndarray, pa.Table]
+        Path of csv, Parquet (.parquet), Feather (.feather, .arrow) or NumPy (.npy) \
+        file, or DataFrame, Arrow table or array (including np.memmap) of shape \
+        (n, kk).
+    membership_cols : List[str], optional
+        Columns containing cluster membership. If supplied, files are read with \
+        column projection: only membership_cols and those metadata_cols present are \
+        read, and csv cluster membership is stored as int32.
+    metadata_cols : List[str], optional
+        Further columns to read alongside membership_cols, if present.
+    chunksize : int, optional
+        If supplied and data is a path, return an iterator over tables of at most \
+        chunksize rows, so that the full file is never held in memory.
+
+    Returns
+    -------
+        Table (DataFrame, Arrow table or array), or iterator over table chunks.
+
+    Notes
+    -------
+    Arrays are never copied: .npy files are memory-mapped, and Feather files are \
+    memory-mapped so that Arrow columns can be viewed as arrays without a copy.
+    """
+    usecols = None
+    if membership_cols is not None:
+        usecols = membership_cols + [
+            col for col in metadata_cols or [] if col not in membership_cols
+        ]
+
+    if isinstance(data, (str, Path)):
+        file_format = _file_format(data)
+        if file_format == "npy":
+            data = np.load(data, mmap_mode="r")
+            if chunksize:
+                return _iter_row_chunks(data=data, chunksize=chunksize)
+            return data
+        if file_format == "csv":
+            if usecols is None:
+                return pd.read_csv(data, chunksize=chunksize)
+            return pd.read_csv(
+                data,
+                usecols=lambda col: col in usecols,
+                dtype={col: np.int32 for col in membership_cols},
+                chunksize=chunksize,
+            )
+
+        _import_pyarrow()
+        columns = get_columns(data=data, prefix="")
+        if usecols is not None:
+            columns = [col for col in usecols if col in columns]
+        if file_format == "parquet":
+            import pyarrow.parquet as pq
+
+            if chunksize:
+                return pq.ParquetFile(data).iter_batches(
+                    batch_size=chunksize, columns=columns
+                )
+            return pq.read_table(data, columns=columns)
+        import pyarrow.feather as feather
+
+        table = feather.read_table(data, columns=columns, memory_map=True)
+        if chunksize:
+            return iter(table.to_batches(max_chunksize=chunksize))
+        return table
+
+    if _is_arrow(data) and usecols is not None:
+        return data.select([col for col in usecols if col in data.schema.names])
     return data
+
+
+def get_column(data: TABLE_TYPE, col: str) -> Optional[np.ndarray]:
+    """Column of a DataFrame or Arrow table as an array, without copying where \
+    possible. None if col is not present."""
+    if isinstance(data, np.ndarray):
+        return None
+    if _is_arrow(data):
+        if col not in data.schema.names:
+            return None
+        column = data.column(col)
+        if hasattr(column, "num_chunks"):  # ChunkedArray from pa.Table
+            if column.num_chunks != 1:
+                return column.to_numpy()
+            column = column.chunk(0)
+        return column.to_numpy(zero_copy_only=False)
+    if col not in data.columns:
+        return None
+    return data[col].to_numpy()
+
+
+def get_membership(data: TABLE_TYPE, membership_cols: List[str]) -> list[np.ndarray]:
+    """Cluster membership as one array per resolution, viewing the underlying data \
+    rather than copying it into a single matrix."""
+    if isinstance(data, np.ndarray):
+        if data.ndim != 2 or data.shape[1] < len(membership_cols):
+            raise ValueError(
+                f"array input should have shape (n, kk) with kk >= "
+                f"{len(membership_cols)}, got {data.shape}"
+            )
+        return [data[:, col] for col in range(len(membership_cols))]
+    return [get_column(data=data, col=col) for col in membership_cols]
@@ -1,9 +1,36 @@
-from pairing_functions import szudzik
+import numpy as np
 
 
-def hash_node_id(k_upper: int, k_lower: int) -> int:
-    return szudzik.pair(k_upper, k_lower)
+def lookup_node_ids(
+    k_upper: np.ndarray,
+    k_lower: np.ndarray,
+    node_res: np.ndarray,
+    node_k: np.ndarray,
+) -> np.ndarray:
+    """
 
+    Parameters
+    ----------
+    k_upper, k_lower : ndarray
+        Resolution (1, ..., kk) and cluster number of the nodes to look up.
+    node_res, node_k : ndarray
+        Resolution and cluster number of all nodes in the node table, ordered by \
+        (res, k).
 
-def hash_edge_id(k_upper: int, k_start: int, k_end: int) -> int:
-    return szudzik.pair(k_upper, k_start, k_end)
+    Returns
+    -------
+        Node ids, i.e. position of each node in the node table. Only nodes \
+        present in the table have an id, so a resolution may have any number of \
+        clusters with any cluster numbers.
+    """
+    k_upper = np.asarray(k_upper, dtype=np.int64)
+    k_lower = np.asarray(k_lower, dtype=np.int64)
+    width = int(max(node_k.max(initial=0), k_lower.max(initial=0))) + 1
+    table_key = node_res * width + node_k
+    key = k_upper * width + k_lower
+    node_ids = np.searchsorted(table_key, key)
+    found = (node_ids < len(table_key)) & (k_lower >= 0)
+    found[found] = table_key[node_ids[found]] == key[found]
+    if not found.all():
+        raise KeyError((int(k_upper[~found][0]), int(k_lower[~found][0])))
+    return node_ids
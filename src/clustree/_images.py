@@ -0,0 +1,328 @@
+import os
+import struct
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Hashable, NamedTuple, Optional
+
+import numpy as np
+
+DEFAULT_IMAGE_CACHE_BYTES = 512 << 20
+
+
+class ImageCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    n_images: int
+    nbytes: int
+    max_bytes: Optional[int]
+
+
+class ImageCache:
+    """
+    Least recently used cache of decoded node images, bounded by the total number \
+    of bytes of the images held. Safe to share between threads.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        Least recently used images are evicted once the cache holds more than \
+        max_bytes. If None, the cache is unbounded.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = DEFAULT_IMAGE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._images: OrderedDict[Hashable, np.ndarray] = OrderedDict()
+        self._nbytes = 0
+        self._hits = self._misses = self._evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[np.ndarray]:
+        with self._lock:
+            img = self._images.get(key)
+            if img is None:
+                self._misses += 1
+                return None
+            self._images.move_to_end(key)
+            self._hits += 1
+            return img
+
+    def put(self, key: Hashable, img: np.ndarray) -> None:
+        img.flags.writeable = False  # shared between draws
+        with self._lock:
+            old = self._images.pop(key, None)
+            if old is not None:
+                self._nbytes -= old.nbytes
+            self._images[key] = img
+            self._nbytes += img.nbytes
+            self._evict()
+
+    def _evict(self) -> None:
+        if self.max_bytes is None:
+            return
+        while self._nbytes > self.max_bytes and self._images:
+            _, img = self._images.popitem(last=False)
+            self._nbytes -= img.nbytes
+            self._evictions += 1
+
+    def resize(self, max_bytes: Optional[int]) -> None:
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._images.clear()
+            self._nbytes = 0
+            self._hits = self._misses = self._evictions = 0
+
+    def info(self) -> ImageCacheInfo:
+        with self._lock:
+            return ImageCacheInfo(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                n_images=len(self._images),
+                nbytes=self._nbytes,
+                max_bytes=self.max_bytes,
+            )
+
+    def __len__(self) -> int:
+        return len(self._images)
+
+
+IMAGE_CACHE = ImageCache()
+
+
+def image_cache_info() -> ImageCacheInfo:
+    """Hit, miss and eviction counts and size of the node image cache shared by \
+    all draws in this process."""
+    return IMAGE_CACHE.info()
+
+
+def clear_image_cache() -> None:
+    """Empty the node image cache and reset its statistics."""
+    IMAGE_CACHE.clear()
+
+
+def set_image_cache_size(max_bytes: Optional[int]) -> None:
+    """Bound the node image cache to max_bytes, or leave it unbounded if None. \
+    Defaults to 512 MiB."""
+    IMAGE_CACHE.resize(max_bytes=max_bytes)
+
+
+# cv2 imread flag of each reduction, by name so that cv2 loads on first decode
+_REDUCED_FLAGS = {
+    1: "IMREAD_COLOR",
+    2: "IMREAD_REDUCED_COLOR_2",
+    4: "IMREAD_REDUCED_COLOR_4",
+    8: "IMREAD_REDUCED_COLOR_8",
+}
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# JPEG start of frame markers, which hold image size
+_JPEG_SOF = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def image_shape(img_path: str) -> Optional[tuple[int, int]]:
+    """(height, width) of a PNG or JPEG image read from its header, without \
+    decoding. None for other formats."""
+    with open(img_path, "rb") as f:
+        header = f.read(24)
+        if header[:8] == _PNG_SIGNATURE:
+            width, height = struct.unpack(">II", header[16:24])
+            return height, width
+        if header[:2] != b"\xff\xd8":
+            return None
+        f.seek(2)
+        while True:
+            marker = f.read(4)
+            if len(marker) < 4 or marker[0] != 0xFF:
+                return None
+            length = struct.unpack(">H", marker[2:])[0]
+            if marker[1] in _JPEG_SOF:
+                height, width = struct.unpack(">xHH", f.read(5))
+                return height, width
+            f.seek(length - 2, os.SEEK_CUR)
+
+
+def decode_image(img_path: str, max_side: Optional[int] = None) -> np.ndarray:
+    """
+    Read image as RGB, downscaled so that its longest side is at most max_side \
+    pixels.
+
+    Parameters
+    ----------
+    img_path : str
+        Path of image.
+    max_side : int, optional
+        Longest side of the image returned, in pixels. Images already smaller are \
+        not enlarged. If None, the image is read at full resolution.
+
+    Returns
+    -------
+        Image as array of shape (height, width, 3).
+
+    Notes
+    -------
+    If the image size can be read from its header, it is decoded at the largest \
+    reduction (1/2, 1/4 or 1/8) that still leaves it at least max_side pixels, \
+    which JPEG decoders do without decoding full resolution. Any remaining \
+    reduction uses area interpolation.
+    """
+    import cv2
+
+    flag = cv2.IMREAD_COLOR
+    shape = image_shape(img_path) if max_side else None
+    if shape:
+        reduction = max(
+            (r for r in _REDUCED_FLAGS if max(shape) // r >= max_side), default=1
+        )
+        flag = getattr(cv2, _REDUCED_FLAGS[reduction])
+    img = cv2.imread(img_path, flag)
+    if img is None:
+        raise FileNotFoundError(f"cannot read node image {img_path}")
+    if max_side and max(img.shape[:2]) > max_side:
+        scale = max_side / max(img.shape[:2])
+        size = tuple(max(1, round(n * scale)) for n in img.shape[1::-1])
+        img = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+
+def load_node_image(
+    img_path: str,
+    border_size_prop: float,
+    border_color: tuple[float, float, float, float],
+    target_size: Optional[int] = None,
+    image_cache: Optional[ImageCache] = IMAGE_CACHE,
+) -> np.ndarray:
+    """
+    Read image as RGB and add border.
+
+    Parameters
+    ----------
+    img_path : str
+        Path of image.
+    border_size_prop : float
+        Border width as proportion of image height.
+    border_color : tuple[float, float, float, float]
+        RGBA color of border.
+    target_size : int, optional
+        Longest side in pixels of the bordered image. The image is downscaled \
+        before the border is added, so that the border is not computed at full \
+        resolution. If None, the image is read at full resolution.
+    image_cache : ImageCache, optional
+        Images are looked up in / stored in image_cache, keyed by path, \
+        modification time, target size, border size and border color, so an image \
+        is decoded again only if its file changes. If None, the image is always \
+        decoded.
+
+    Returns
+    -------
+        Bordered image as array of shape (height, width, 3).
+    """
+    key = None
+    if image_cache is not None:
+        key = (
+            img_path,
+            os.stat(img_path).st_mtime_ns,
+            target_size,
+            border_size_prop,
+            tuple(border_color),
+        )
+        img = image_cache.get(key)
+        if img is not None:
+            return img
+
+    max_side = None
+    if target_size:
+        max_side = max(1, int(target_size / (1 + 2 * border_size_prop)))
+    img = decode_image(img_path=img_path, max_side=max_side)
+    if border_size_prop != float(0):
+        import cv2
+
+        border_size = int(img.shape[0] * border_size_prop)
+        img = cv2.copyMakeBorder(
+            img,
+            border_size,
+            border_size,
+            border_size,
+            border_size,
+            cv2.BORDER_CONSTANT,
+            value=tuple(val * 255 for val in border_color),
+        )
+    if image_cache is not None:
+        image_cache.put(key, img)
+    return img
+
+
+def prefetch_node_images(
+    requests: list[dict[str, Any]],
+    image_cache: Optional[ImageCache] = IMAGE_CACHE,
+    max_workers: Optional[int] = None,
+) -> list[np.ndarray]:
+    """
+    Load several node images concurrently.
+
+    Parameters
+    ----------
+    requests : list[dict[str, Any]]
+        Keyword arguments of load_node_image (other than image_cache), one dict \
+        per image.
+    image_cache : ImageCache, optional
+        See load_node_image.
+    max_workers : int, optional
+        Number of threads. cv2 releases the GIL while decoding and resizing, so \
+        images are decoded in parallel. If 1, images are loaded sequentially. \
+        Defaults to None, the default of concurrent.futures.ThreadPoolExecutor.
+
+    Returns
+    -------
+        Bordered images, in the order of requests.
+    """
+
+    def load(kwargs: dict[str, Any]) -> np.ndarray:
+        return load_node_image(**kwargs, image_cache=image_cache)
+
+    if max_workers == 1 or len(requests) <= 1:
+        return [load(kwargs) for kwargs in requests]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(load, requests))
+
+
+def compose_atlas(
+    images: list[np.ndarray], boxes: np.ndarray, shape: tuple[int, int]
+) -> np.ndarray:
+    """
+    Compose images into one RGBA canvas.
+
+    Parameters
+    ----------
+    images : list[ndarray]
+        RGB images.
+    boxes : ndarray
+        Array of shape (n_images, 4) holding (top, bottom, left, right) pixel \
+        bounds of each image in the canvas. Images are resized to fill their box, \
+        and later images are drawn over earlier ones.
+    shape : tuple[int, int]
+        (height, width) of the canvas.
+
+    Returns
+    -------
+        Canvas of shape (height, width, 4), transparent outside the boxes.
+    """
+    import cv2
+
+    canvas = np.zeros((*shape, 4), dtype=np.uint8)
+    for img, (top, bottom, left, right) in zip(images, boxes):
+        height, width = bottom - top, right - left
+        if height <= 0 or width <= 0:
+            continue
+        if img.shape[:2] != (height, width):
+            interpolation = cv2.INTER_AREA
+            if height > img.shape[0] or width > img.shape[1]:
+                interpolation = cv2.INTER_LINEAR
+            img = cv2.resize(img, (width, height), interpolation=interpolation)
+        canvas[top:bottom, left:right, :3] = img
+        canvas[top:bottom, left:right, 3] = 255
+    return canvas
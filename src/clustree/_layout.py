@@ -0,0 +1,269 @@
+from typing import Optional
+
+import numpy as np
+
+
+def dominant_parent(
+    n: int, start: np.ndarray, end: np.ndarray, samples: np.ndarray
+) -> np.ndarray:
+    """Parent of each of n nodes: the start of its incoming edge with most samples, \
+    ties broken by lowest start. -1 for nodes without incoming edges."""
+    start = np.asarray(start, dtype=np.int64)
+    end = np.asarray(end, dtype=np.int64)
+    parent = np.full(n, -1, dtype=np.int64)
+    if len(end):
+        order = np.lexsort((start, -np.asarray(samples), end))
+        first = np.unique(end[order], return_index=True)[1]
+        parent[end[order[first]]] = start[order[first]]
+    return parent
+
+
+def _pad(contour: np.ndarray, gap: int) -> np.ndarray:
+    """Contour preceded by gap empty (NaN) levels."""
+    return np.concatenate([np.full(gap, np.nan), contour])
+
+
+def _overlay(under: np.ndarray, over: np.ndarray, take_over: bool) -> np.ndarray:
+    """Combine contours level by level. Where both are defined, over is kept if \
+    take_over, otherwise under is kept."""
+    out = np.full(max(len(under), len(over)), np.nan)
+    out[: len(under)] = under
+    stop = len(over)
+    if take_over:
+        mask = ~np.isnan(over)
+    else:
+        mask = np.isnan(out[:stop])
+    out[:stop][mask] = over[mask]
+    return out
+
+
+def tidy_tree_layout(
+    res: np.ndarray,
+    start: np.ndarray,
+    end: np.ndarray,
+    samples: np.ndarray,
+    sep: float = 1.0,
+) -> np.ndarray:
+    """
+    Tidy tree layout of a clustree, in the manner of Reingold and Tilford.
+
+    Parameters
+    ----------
+    res : ndarray
+        Cluster resolution of each node, used as its depth.
+    start, end : ndarray
+        Row in res of the start and end node of each edge.
+    samples : ndarray
+        #samples of each edge.
+    sep : float
+        Minimum horizontal distance between nodes of the same resolution.
+
+    Returns
+    -------
+        Array of shape (n_nodes, 2) holding (x, res) for each node.
+
+    Notes
+    -------
+    A clustree is a DAG rather than a tree, so each node is placed under its \
+    dominant parent, the node at the previous resolution that contributes most \
+    samples. Nodes without incoming edges hang from a virtual root above the first \
+    resolution. Subtrees are laid out bottom up: each subtree keeps its left and \
+    right contour, i.e. the leftmost and rightmost x at each depth, as arrays. \
+    Sibling subtrees are placed as close as their contours allow, and a parent is \
+    centred above its first and last child. Contours have at most one entry per \
+    resolution and are discarded once merged into their parent, so time and memory \
+    are linear in the number of nodes for a fixed number of resolutions, with no \
+    graph object built.
+    """
+    res = np.asarray(res, dtype=np.int64)
+    n = len(res)
+    if n == 0:
+        return np.zeros((0, 2))
+    root = n
+    depth = np.append(res, res.min() - 1)
+    parent = dominant_parent(n=n, start=start, end=end, samples=samples)
+    parent = np.where(parent < 0, root, parent)
+
+    # children of each node, ordered by node id
+    order = np.argsort(parent, kind="stable")
+    bounds = np.searchsorted(parent[order], np.arange(n + 2))
+
+    offset = np.zeros(n + 1)  # x relative to parent
+    left: list[Optional[np.ndarray]] = [None] * (n + 1)
+    right: list[Optional[np.ndarray]] = [None] * (n + 1)
+    for node in np.argsort(-depth, kind="stable"):  # children before parents
+        first, stop = bounds[node], bounds[node + 1]
+        children = order[first:stop]
+        if len(children) == 0:
+            left[node] = right[node] = np.zeros(1)
+            continue
+
+        shifts = np.zeros(len(children))
+        acc_left = acc_right = None
+        for i, child in enumerate(children):
+            gap = int(depth[child] - depth[node]) - 1
+            child_left = _pad(left[child], gap)
+            child_right = _pad(right[child], gap)
+            left[child] = right[child] = None
+            if acc_left is None:
+                acc_left, acc_right = child_left, child_right
+                continue
+            m = min(len(acc_right), len(child_left))
+            diff = acc_right[:m] - child_left[:m]
+            shift = shifts[i - 1] + sep
+            if not np.isnan(diff).all():
+                shift = max(shift, np.nanmax(diff) + sep)
+            shifts[i] = shift
+            acc_left = _overlay(acc_left, child_left + shift, take_over=False)
+            acc_right = _overlay(acc_right, child_right + shift, take_over=True)
+
+        mid = (shifts[0] + shifts[-1]) / 2
+        offset[children] = shifts - mid
+        left[node] = np.concatenate([[0.0], acc_left - mid])
+        right[node] = np.concatenate([[0.0], acc_right - mid])
+
+    # absolute x, top down
+    x = np.zeros(n + 1)
+    parent = np.append(parent, root)
+    for level in np.unique(res):
+        nodes = np.flatnonzero(res == level)
+        x[nodes] = x[parent[nodes]] + offset[nodes]
+    return np.column_stack([x[:n], res.astype(float)])
+
+
+def weighted_crossings(
+    weights: np.ndarray, upper: np.ndarray, lower: np.ndarray
+) -> float:
+    """
+    Weighted number of edge crossings between two adjacent layers.
+
+    Parameters
+    ----------
+    weights : ndarray
+        Contingency matrix of shape (n_upper, n_lower) giving #samples of each edge.
+    upper, lower : ndarray
+        Position of each node within the upper and lower layer.
+
+    Returns
+    -------
+        Sum of w * w' over pairs of edges that cross.
+    """
+    m = weights[np.argsort(upper)][:, np.argsort(lower)]
+    # weight of edges from a later upper node to an earlier lower node
+    suffix = np.cumsum(m[::-1], axis=0)[::-1]
+    later = np.zeros_like(m)
+    later[:-1] = suffix[1:]
+    earlier = np.cumsum(later, axis=1) - later
+    return float((m * earlier).sum())
+
+
+def _barycenter_positions(
+    weights: np.ndarray, neighbour: np.ndarray, current: np.ndarray
+) -> np.ndarray:
+    """Positions of a layer sorted by weighted barycenter of neighbour positions. \
+    weights has shape (n_layer, n_neighbour). Nodes without neighbours, and ties, \
+    keep their current order."""
+    total = weights.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        barycenter = np.where(total > 0, weights @ neighbour / total, current)
+    out = np.empty(len(current))
+    out[np.lexsort((current, barycenter))] = np.arange(len(current))
+    return out
+
+
+def layered_layout(
+    res: np.ndarray,
+    start: np.ndarray,
+    end: np.ndarray,
+    samples: np.ndarray,
+    max_sweeps: int = 8,
+) -> np.ndarray:
+    """
+    Layered (Sugiyama style) layout of a clustree, one layer per resolution.
+
+    Parameters
+    ----------
+    res : ndarray
+        Cluster resolution of each node, used as its layer.
+    start, end : ndarray
+        Row in res of the start and end node of each edge.
+    samples : ndarray
+        #samples of each edge.
+    max_sweeps : int
+        Maximum number of down and up sweeps.
+
+    Returns
+    -------
+        Array of shape (n_nodes, 2) holding (x, res) for each node, where x is the \
+        position of the node within its layer, centred on 0.
+
+    Notes
+    -------
+    Nodes start in order of cluster number. Each sweep reorders every layer by the \
+    barycenter of its neighbours in the previous layer, top down, then in the next \
+    layer, bottom up, weighting each edge by #samples. Edges between adjacent \
+    layers are held as one contingency matrix per pair of layers, so each \
+    barycenter is a matrix-vector product. Sweeps stop once the weighted number of \
+    crossings stops decreasing, and the best order found is kept.
+    """
+    res = np.asarray(res, dtype=np.int64)
+    start = np.asarray(start, dtype=np.int64)
+    end = np.asarray(end, dtype=np.int64)
+    samples = np.asarray(samples, dtype=float)
+    n = len(res)
+    if n == 0:
+        return np.zeros((0, 2))
+
+    # layer of each node, and its index within the layer, in order of node id
+    levels, layer = np.unique(res, return_inverse=True)
+    order = np.argsort(layer, kind="stable")
+    counts = np.bincount(layer, minlength=len(levels))
+    first = np.cumsum(counts) - counts
+    local = np.empty(n, dtype=np.int64)
+    local[order] = np.arange(n) - np.repeat(first, counts)
+
+    # contingency matrix between each pair of adjacent layers
+    adjacent = layer[end] == layer[start] + 1
+    edge_layer = layer[end][adjacent]
+    edge_order = np.argsort(edge_layer, kind="stable")
+    bounds = np.searchsorted(edge_layer[edge_order], np.arange(len(levels) + 1))
+    edge_start = start[adjacent][edge_order]
+    edge_end = end[adjacent][edge_order]
+    edge_samples = samples[adjacent][edge_order]
+    weights = []
+    for i in range(1, len(levels)):
+        w = np.zeros((counts[i - 1], counts[i]))
+        lo, hi = bounds[i], bounds[i + 1]
+        np.add.at(
+            w,
+            (local[edge_start[lo:hi]], local[edge_end[lo:hi]]),
+            edge_samples[lo:hi],
+        )
+        weights.append(w)
+
+    def total_crossings(positions: list[np.ndarray]) -> float:
+        return sum(
+            weighted_crossings(w, positions[i], positions[i + 1])
+            for i, w in enumerate(weights)
+        )
+
+    positions = [np.arange(count, dtype=float) for count in counts]
+    best, best_crossings = list(positions), total_crossings(positions)
+    for _ in range(max_sweeps):
+        if best_crossings == 0:
+            break
+        for i in range(1, len(levels)):
+            positions[i] = _barycenter_positions(
+                weights[i - 1].T, positions[i - 1], positions[i]
+            )
+        for i in range(len(levels) - 2, -1, -1):
+            positions[i] = _barycenter_positions(
+                weights[i], positions[i + 1], positions[i]
+            )
+        crossings = total_crossings(positions)
+        if crossings >= best_crossings:
+            break
+        best, best_crossings = list(positions), crossings
+
+    x = np.concatenate(best)[np.argsort(order)] - ((counts - 1) / 2)[layer]
+    return np.column_stack([x, res.astype(float)])
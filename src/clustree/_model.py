@@ -0,0 +1,526 @@
+import os
+import warnings
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Optional, Union
+
+import numpy as np
+
+from clustree._cache import ClustreeCache
+from clustree._clustree_graph import ClustreeGraph
+from clustree._clustree_typing import (
+    CMAP_TYPE,
+    COLOR_AGG_TYPE,
+    DATA_INPUT_TYPE,
+    EDGE_COLOR_TYPE,
+    GRAPH_TYPE,
+    GRAPH_TYPES,
+    IMAGE_INPUT_TYPE,
+    LAYOUT_INPUT_TYPE,
+    MIN_CLUSTER_NUMBER_TYPE,
+    NODE_COLOR_TYPE,
+    NORM_TYPE,
+    ORIENTATION_INPUT_TYPE,
+    OUTPUT_PATH_TYPE,
+)
+from clustree._config import ClustreeConfig
+from clustree._config_helpers import get_aggr_key
+from clustree._handle_pars import (
+    get_column,
+    get_columns,
+    get_membership,
+    get_resolution_cols,
+    handle_data,
+)
+from clustree._profile import Profiler, profile_phase
+
+if TYPE_CHECKING:
+    from networkx import DiGraph
+
+COUNT_ONLY_CONFIG = {
+    "init": True,
+    "sample_info": True,
+    "node_color": False,
+    "edge_color": False,
+}
+
+
+def construct_clustree(cf: ClustreeConfig) -> "DiGraph":
+    return ClustreeGraph.from_config(cf=cf).to_networkx()
+
+
+def _cmap_key(cmap: CMAP_TYPE) -> Any:
+    if cmap is None or isinstance(cmap, str):
+        return cmap
+    return cmap.name, id(cmap)
+
+
+def warn_min_cluster_number() -> None:
+    warnings.warn(
+        "min_cluster_number is deprecated and has no effect, as nodes are created "
+        "for the cluster numbers observed in data",
+        DeprecationWarning,
+        stacklevel=3,
+    )
+
+
+class ClustreeModel:
+    """
+    Nodes and edges of a clustree, counted once from data and reused across renders.
+
+    Colors, layouts and node extents are cached, keyed by the style parameters \
+    they depend on, so that re-rendering with a different style only \
+    recomputes what that style invalidates. For example, changing edge_color \
+    recolors edges only, while changing orientation recomputes the layout but \
+    reuses colors. Decoded node images are held in a cache shared by all draws in \
+    the process, see clustree.image_cache_info.
+
+    Parameters
+    ----------
+    data : Union[Path, str, pd.DataFrame, np.ndarray, pa.Table]
+        See clustree.
+    prefix : str
+        String indicating columns containing clustering information.
+    kk : int, optional
+        Choose custom depth of clustree graph.
+    min_cluster_number : Literal[0, 1], optional
+        Deprecated, has no effect, see clustree.
+    chunksize : int, optional
+        See clustree.
+    metadata_cols : list[str], optional
+        Columns that may be used as node_color when data is a path or count_col is \
+        supplied. These are read alongside cluster membership, or, if chunksize or \
+        count_col is supplied, summarised by running statistics. If data is an \
+        in-memory table, any column may be used. metadata_cols are aggregated \
+        together, so switching node_color between them needs no pass over the data.
+    deduplicate : bool
+        See clustree.
+    count_col : str, optional
+        See clustree.
+    min_edge_samples, min_in_prop, max_in_edges_per_node : optional
+        See clustree. Edges are pruned once when counting, so changing these \
+        requires a new ClustreeModel.
+    cache_dir : Union[Path, str, ClustreeCache], optional
+        See clustree. A ClustreeCache may be supplied to set limits on its size or \
+        age.
+    profiler : Profiler, optional
+        See clustree. Phases of counting, coloring and rendering are recorded to \
+        profiler each time they run.
+    """
+
+    def __init__(
+        self,
+        data: DATA_INPUT_TYPE,
+        prefix: str,
+        kk: Optional[int] = None,
+        min_cluster_number: MIN_CLUSTER_NUMBER_TYPE = None,
+        chunksize: Optional[int] = None,
+        metadata_cols: Optional[list[str]] = None,
+        deduplicate: bool = False,
+        count_col: Optional[str] = None,
+        min_edge_samples: int = 0,
+        min_in_prop: float = 0.0,
+        max_in_edges_per_node: Optional[int] = None,
+        cache_dir: Optional[Union[str, Path, ClustreeCache]] = None,
+        profiler: Optional[Profiler] = None,
+    ):
+        columns = get_columns(data=data, prefix=prefix)
+        membership_cols = get_resolution_cols(cols=columns, prefix=prefix, user_kk=kk)
+        kk = len(membership_cols)
+        metadata_cols = [col for col in metadata_cols or [] if col in columns]
+        if count_col is not None and count_col not in columns:
+            raise ValueError(f"count_col '{count_col}' not found in data")
+        if min_cluster_number is not None:
+            warn_min_cluster_number()
+
+        self.prefix = prefix
+        self.kk = kk
+        self.membership_cols = membership_cols
+        self._columns = columns
+        self.profiler = profiler
+        self._read_args = dict(
+            data=data,
+            chunksize=chunksize,
+            metadata_cols=metadata_cols,
+            start_at_1=None,  # found from data by ClustreeConfig
+            deduplicate=deduplicate,
+            count_col=count_col,
+            min_edge_samples=min_edge_samples,
+            min_in_prop=min_in_prop,
+            max_in_edges_per_node=max_in_edges_per_node,
+        )
+        self._pos: dict[Any, dict] = {}
+
+        self._cache: Optional[ClustreeCache] = None
+        self._cache_key: Optional[str] = None
+        arrays = None
+        if cache_dir is not None:
+            self._cache = cache_dir
+            if not isinstance(cache_dir, ClustreeCache):
+                self._cache = ClustreeCache(path=cache_dir)
+            with profile_phase(profiler, "cache_load") as counters:
+                membership = None
+                if not isinstance(data, (str, Path)):  # files hashed without parsing
+                    # metadata is hashed too, as aggregates of it are cached
+                    other_cols = [col for col in columns if col not in membership_cols]
+                    table = handle_data(
+                        data=data,
+                        membership_cols=membership_cols,
+                        metadata_cols=other_cols,
+                    )
+                    membership = get_membership(
+                        data=table, membership_cols=membership_cols
+                    )
+                    for col in other_cols:
+                        membership.append(get_column(data=table, col=col))
+                self._cache_key = self._cache.key(
+                    data=data,
+                    membership=membership,
+                    columns=columns,
+                    prefix=prefix,
+                    kk=kk,
+                    membership_cols=membership_cols,
+                    count_col=count_col,
+                    min_edge_samples=min_edge_samples,
+                    min_in_prop=min_in_prop,
+                    max_in_edges_per_node=max_in_edges_per_node,
+                )
+                arrays = self._cache.load(key=self._cache_key)
+                counters["hit"] = int(arrays is not None)
+
+        self._from_cache = arrays is not None
+        self._updated = False  # rows added by update
+        if arrays is None:
+            self.config = self._read_config()
+            self._save_cache()
+        else:
+            self.config = ClustreeConfig.from_arrays(
+                arrays=arrays, kk=kk, prefix=prefix, membership_cols=membership_cols
+            )
+            for name, xy in arrays.items():
+                if name.startswith("layout/"):
+                    _, orientation, layout = name.split("/")
+                    self._pos[(orientation, layout)] = dict(
+                        enumerate(map(tuple, xy.tolist()))
+                    )
+
+        self._node_colors: dict[Any, tuple] = {}
+        self._edge_colors: dict[Any, tuple] = {}
+        self._node_style: Any = None
+        self._edge_style: Any = None
+        self._graph: Optional[ClustreeGraph] = None
+        self._extent: dict[Any, dict] = {}
+
+    def _read_config(self) -> ClustreeConfig:
+        """Read and count data."""
+        args = self._read_args
+        with profile_phase(self.profiler, "read") as counters:
+            data = handle_data(
+                data=args["data"],
+                membership_cols=self.membership_cols,
+                metadata_cols=args["metadata_cols"],
+                chunksize=args["chunksize"],
+            )
+            if self.profiler is not None and isinstance(args["data"], (str, Path)):
+                counters["input_bytes"] = os.path.getsize(args["data"])
+        with profile_phase(self.profiler, "count") as counters:
+            cf = ClustreeConfig(
+                prefix=self.prefix,
+                kk=self.kk,
+                data=data,
+                start_at_1=args["start_at_1"],
+                metadata_cols=args["metadata_cols"],
+                membership_cols=self.membership_cols,
+                deduplicate=args["deduplicate"],
+                count_col=args["count_col"],
+                min_edge_samples=args["min_edge_samples"],
+                min_in_prop=args["min_in_prop"],
+                max_in_edges_per_node=args["max_in_edges_per_node"],
+                _setup_cf=COUNT_ONLY_CONFIG,
+            )
+            counters["nodes"] = len(cf.nodes)
+            counters["edges"] = len(cf.edges)
+            if cf.n_pruned_edges:
+                counters["pruned_edges"] = cf.n_pruned_edges
+            if cf.n_paths is not None:
+                counters["paths"] = cf.n_paths
+        return cf
+
+    def update(self, data: DATA_INPUT_TYPE) -> None:
+        """
+        Add rows of cluster membership, e.g. newly scored samples, without \
+        recounting the rows already counted. See ClustreeConfig.update.
+
+        Colors, layouts and extents cached for the previous counts are discarded. \
+        Afterwards, the model is no longer saved to cache_dir, as its entries are \
+        keyed by the data first counted, and metadata_cols are the only columns \
+        that may be used as node_color.
+
+        Parameters
+        ----------
+        data : Union[Path, str, pd.DataFrame, np.ndarray, pa.Table]
+            New rows, with the membership columns and metadata_cols of the model \
+            (and count_col, if supplied).
+        """
+        cf = self.config
+        if self._from_cache and (self._read_args["metadata_cols"] or cf.prunes_edges):
+            # loaded without metadata, or without counts of edges that are or may
+            # become pruned, so count data once
+            self.config = self._read_config()
+        self._from_cache = False
+        with profile_phase(self.profiler, "update") as counters:
+            self.config.update(data=data)
+            counters["nodes"] = len(self.config.nodes)
+            counters["edges"] = len(self.config.edges)
+        self._updated = True
+        self._cache = None
+        self._node_colors.clear()
+        self._edge_colors.clear()
+        self._node_style = None
+        self._edge_style = None
+        self._graph = None
+        self._pos.clear()
+        self._extent.clear()
+
+    def _save_cache(self) -> None:
+        if self._cache is None:
+            return
+        with profile_phase(self.profiler, "cache_save"):
+            arrays = self.config.to_arrays()
+            ids = self.config.nodes.ids
+            for (orientation, layout), pos in self._pos.items():
+                arrays[f"layout/{orientation}/{layout}"] = np.array(
+                    [pos[i] for i in ids], dtype=float
+                )
+            self._cache.save(key=self._cache_key, arrays=arrays)
+
+    def _set_node_style(
+        self,
+        node_color: NODE_COLOR_TYPE,
+        node_color_aggr: COLOR_AGG_TYPE,
+        node_cmap: CMAP_TYPE,
+        node_norm: NORM_TYPE = "linear",
+    ) -> None:
+        cf = self.config
+        key = (node_color, node_color_aggr, _cmap_key(node_cmap), node_norm)
+        if key == self._node_style:
+            return
+        if key not in self._node_colors:
+            aggr_key = (node_color, get_aggr_key(aggr=node_color_aggr))
+            n_aggregates = len(cf.aggregates)
+            needs_data = (
+                isinstance(node_color, str)
+                and node_color in self._columns
+                and aggr_key not in cf.aggregates
+            )
+            if needs_data and self._updated and node_color not in cf.node_stats:
+                raise ValueError(
+                    f"column '{node_color}' was not among metadata_cols when rows "
+                    "were added by update"
+                )
+            if needs_data and cf.data is None and not cf.node_stats:
+                # loaded from cache without this aggregate, so read data again
+                self.config = self._read_config()
+                self.config.aggregates.update(cf.aggregates)
+                cf = self.config
+                self._edge_style = None
+            with profile_phase(self.profiler, "node_color") as counters:
+                cf.set_node_color(
+                    node_color=node_color,
+                    aggr=node_color_aggr,
+                    cmap=node_cmap,
+                    data=cf.data,
+                    prefix=self.prefix,
+                    stats=cf.node_stats,
+                    norm=node_norm,
+                )
+                counters["nodes"] = len(cf.nodes)
+            self._node_colors[key] = (
+                cf.nodes.node_color,
+                cf.node_color_sm,
+                cf.node_color_legend_title,
+            )
+            if len(cf.aggregates) > n_aggregates:
+                self._save_cache()
+        (
+            cf.nodes.node_color,
+            cf.node_color_sm,
+            cf.node_color_legend_title,
+        ) = self._node_colors[key]
+        self._node_style = key
+        self._graph = None
+
+    def _set_edge_style(
+        self,
+        edge_color: EDGE_COLOR_TYPE,
+        edge_cmap: CMAP_TYPE,
+        edge_norm: NORM_TYPE = "linear",
+    ):
+        cf = self.config
+        key = (edge_color, _cmap_key(edge_cmap), edge_norm)
+        if key == self._edge_style:
+            return
+        if key not in self._edge_colors:
+            with profile_phase(self.profiler, "edge_color") as counters:
+                cf.set_edge_color(
+                    edge_color=edge_color,
+                    cmap=edge_cmap,
+                    prefix=self.prefix,
+                    norm=edge_norm,
+                )
+                counters["edges"] = len(cf.edges)
+            self._edge_colors[key] = (
+                cf.edges.edge_color,
+                cf.edge_color_sm,
+                cf.edge_color_legend_title,
+            )
+        (
+            cf.edges.edge_color,
+            cf.edge_color_sm,
+            cf.edge_color_legend_title,
+        ) = self._edge_colors[key]
+        self._edge_style = key
+        self._graph = None
+
+    def graph(
+        self,
+        node_color: NODE_COLOR_TYPE = "prefix",
+        node_color_aggr: COLOR_AGG_TYPE = None,
+        node_cmap: CMAP_TYPE = "inferno",
+        node_norm: NORM_TYPE = "linear",
+        edge_color: EDGE_COLOR_TYPE = "samples",
+        edge_cmap: CMAP_TYPE = "viridis",
+        edge_norm: NORM_TYPE = "linear",
+        graph_type: GRAPH_TYPE = "networkx",
+    ) -> Union["DiGraph", ClustreeGraph]:
+        """Clustree graph with node and edge colors for the given style. See \
+        clustree for a description of parameters."""
+        if graph_type not in GRAPH_TYPES:
+            raise ValueError(
+                f"unknown graph_type '{graph_type}', use one of {GRAPH_TYPES}"
+            )
+        self._set_node_style(
+            node_color=node_color,
+            node_color_aggr=node_color_aggr,
+            node_cmap=node_cmap,
+            node_norm=node_norm,
+        )
+        self._set_edge_style(
+            edge_color=edge_color, edge_cmap=edge_cmap, edge_norm=edge_norm
+        )
+        as_networkx = graph_type == "networkx"
+        if self._graph is None or (as_networkx and not self._graph.has_networkx()):
+            with profile_phase(self.profiler, "construct") as counters:
+                if self._graph is None:
+                    self._graph = ClustreeGraph.from_config(cf=self.config)
+                if as_networkx:
+                    self._graph.to_networkx()
+                counters["nodes"] = self._graph.number_of_nodes()
+                counters["edges"] = self._graph.number_of_edges()
+        return self._graph.to_networkx() if as_networkx else self._graph
+
+    def render(
+        self,
+        images: IMAGE_INPUT_TYPE,
+        output_path: OUTPUT_PATH_TYPE = None,
+        node_color: NODE_COLOR_TYPE = "prefix",
+        node_color_aggr: COLOR_AGG_TYPE = None,
+        node_cmap: CMAP_TYPE = "inferno",
+        node_norm: NORM_TYPE = "linear",
+        edge_color: EDGE_COLOR_TYPE = "samples",
+        edge_cmap: CMAP_TYPE = "viridis",
+        edge_norm: NORM_TYPE = "linear",
+        orientation: ORIENTATION_INPUT_TYPE = "vertical",
+        layout_reingold_tilford: bool = None,
+        layout: Optional[LAYOUT_INPUT_TYPE] = None,
+        border_size: float = 0.05,
+        figsize: tuple[float, float] = None,
+        arrows: bool = None,
+        node_size: float = 300,
+        node_size_edge: Optional[float] = None,
+        dpi: float = 500,
+        image_workers: Optional[int] = None,
+        atlas: bool = False,
+        graph_type: GRAPH_TYPE = "networkx",
+    ) -> Union["DiGraph", ClustreeGraph]:
+        """Draw the clustree and return the graph. See clustree for a description of \
+        parameters."""
+        # drawing dependencies (matplotlib.pyplot, cv2) load on first draw
+        from clustree._draw import draw_clustree, get_nodes_extent, get_pos
+
+        kk = self.kk
+        border_size = float(border_size)
+        images = str(images)
+        if images[-1] != "/":
+            images = images + "/"
+        if not figsize:
+            if kk < 6:
+                figsize = (3, 3)
+            else:
+                w = min([kk, 20]) / 2
+                figsize = (w, w)
+        figsize = tuple(figsize)
+        if arrows is None:
+            arrows = False
+            if kk <= 10:
+                arrows = True
+        if not node_size_edge:
+            node_size_edge = 3 * node_size
+        if layout is None:
+            layout = "multipartite"
+            if layout_reingold_tilford or layout_reingold_tilford is None:
+                layout = "tidy"
+
+        out = self.graph(
+            node_color=node_color,
+            node_color_aggr=node_color_aggr,
+            node_cmap=node_cmap,
+            node_norm=node_norm,
+            edge_color=edge_color,
+            edge_cmap=edge_cmap,
+            edge_norm=edge_norm,
+            graph_type=graph_type,
+        )
+        dg = self._graph  # layout and drawing read its arrays
+
+        layout_key = (orientation, layout)
+        if layout_key not in self._pos:
+            with profile_phase(self.profiler, "layout") as counters:
+                self._pos[layout_key] = get_pos(
+                    dg=dg, orientation=orientation, layout=layout
+                )
+                counters["nodes"] = len(dg)
+            self._save_cache()
+        pos = self._pos[layout_key]
+
+        extent_key = (layout_key, figsize, node_size)
+        if extent_key not in self._extent:
+            with profile_phase(self.profiler, "extent") as counters:
+                self._extent[extent_key] = get_nodes_extent(
+                    dg=dg, pos=pos, figsize=figsize, node_size=node_size
+                )
+                counters["nodes"] = len(dg)
+
+        cf = self.config
+        draw_clustree(
+            dg=dg,
+            path=output_path,
+            orientation=orientation,
+            layout=layout,
+            images=images,
+            figsize=figsize,
+            node_size=node_size,
+            node_size_edge=node_size_edge,
+            dpi=dpi,
+            border_size=border_size,
+            arrows=arrows,
+            node_color_sm=cf.node_color_sm,
+            edge_color_sm=cf.edge_color_sm,
+            node_color_title=cf.node_color_legend_title,
+            edge_color_title=cf.edge_color_legend_title,
+            pos=pos,
+            extent=self._extent[extent_key],
+            image_workers=image_workers,
+            atlas=atlas,
+            profiler=self.profiler,
+        )
+        return out
@@ -0,0 +1,127 @@
+import time
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from typing import Any, NamedTuple, Optional
+
+
+class PhaseRecord(NamedTuple):
+    name: str
+    seconds: float
+    peak_bytes: Optional[int]
+    counters: dict[str, int]
+
+
+class Profiler:
+    """
+    Opt-in record of the wall time, peak traced memory and counters of each phase \
+    of building and drawing a clustree. Pass one as clustree(..., profiler=...) or \
+    ClustreeModel(..., profiler=...), then read report() or summary().
+
+    Phases are, in order: read (reading data, or opening it if chunksize is \
+    supplied), count (counting nodes and edges), cache_load and cache_save, \
+    node_color, edge_color, construct (building the graph returned, by \
+    graph_type), layout, extent, draw_edges, images (loading node images), \
+    draw_nodes, legend and savefig, plus update (adding rows with \
+    ClustreeModel.update). A phase is recorded each time it runs, and phases \
+    whose result is cached by ClustreeModel are not run again.
+
+    Counters include nodes, edges, paths (rows counted after deduplication, if \
+    deduplicate), input_bytes (size of the input file on disk, not the bytes read \
+    from it, which are fewer if only some columns of a Parquet or Feather file \
+    are read), images, images_decoded (images not found in the image cache), \
+    image_bytes (size of the loaded images in memory) and bytes_written (size of \
+    the output file).
+
+    Parameters
+    ----------
+    trace_memory : bool
+        If True, trace memory allocations with tracemalloc during each phase and \
+        record their peak above the memory traced at the start of the phase. \
+        Tracing slows down Python code, so is off by default.
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.records: list[PhaseRecord] = []
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[dict[str, int]]:
+        """Record the phase run within the context. Yields a dict of counters to \
+        be filled in by the phase."""
+        counters: dict[str, int] = {}
+        started_tracing = False
+        if self.trace_memory:
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+            else:
+                tracemalloc.start()
+                started_tracing = True
+            baseline = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield counters
+        finally:
+            seconds = time.perf_counter() - start
+            peak = None
+            if self.trace_memory:
+                peak = tracemalloc.get_traced_memory()[1] - baseline
+                if started_tracing:
+                    tracemalloc.stop()
+            self.records.append(
+                PhaseRecord(
+                    name=name, seconds=seconds, peak_bytes=peak, counters=counters
+                )
+            )
+
+    def report(self) -> list[dict[str, Any]]:
+        """Records of all phases run, in order, as JSON serialisable dicts."""
+        return [
+            {
+                "name": record.name,
+                "seconds": record.seconds,
+                "peak_bytes": record.peak_bytes,
+                **record.counters,
+            }
+            for record in self.records
+        ]
+
+    def summary(self) -> str:
+        """Table of phases, one line per phase name, with total wall time and \
+        largest peak memory over all runs of that phase, and counters of its last \
+        run."""
+        totals: dict[str, list] = {}
+        for record in self.records:
+            seconds, peak, runs, _ = totals.get(record.name, (0.0, None, 0, None))
+            if record.peak_bytes is not None:
+                peak = max(peak or 0, record.peak_bytes)
+            totals[record.name] = [
+                seconds + record.seconds,
+                peak,
+                runs + 1,
+                record.counters,
+            ]
+        lines = []
+        for name, (seconds, peak, runs, counters) in totals.items():
+            line = f"{name:<12} {seconds:9.4f}s"
+            if peak is not None:
+                line += f" {peak / 2**20:9.1f}MiB"
+            if runs > 1:
+                line += f"  x{runs}"
+            if counters:
+                line += "  " + " ".join(f"{k}={v}" for k, v in counters.items())
+            lines.append(line)
+        return "\n".join(lines)
+
+    def clear(self) -> None:
+        self.records.clear()
+
+
+def profile_phase(
+    profiler: Optional[Profiler], name: str
+) -> AbstractContextManager[dict[str, int]]:
+    """Context recording phase name to profiler, or doing nothing if profiler is \
+    None."""
+    if profiler is None:
+        return nullcontext({})
+    return profiler.phase(name)
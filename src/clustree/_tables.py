@@ -0,0 +1,102 @@
+from collections.abc import Iterator, Mapping
+from typing import Any, Optional
+
+import numpy as np
+
+
+class _Table:
+    """
+    Columnar storage shared by NodeTable and EdgeTable. Each column is a NumPy array \
+    with one entry (or one row, for RGBA colors) per node / edge. Node and edge ids \
+    are dense, so the id of a node / edge is its row in the table. Columns that \
+    have not been computed yet are None.
+    """
+
+    columns: tuple[str, ...] = ()
+
+    def __init__(self, n: int):
+        self._n = n
+
+    def __len__(self) -> int:
+        return self._n
+
+    @property
+    def ids(self) -> np.ndarray:
+        return np.arange(self._n)
+
+    def rows(self, ids: np.ndarray) -> np.ndarray:
+        """Row index of each id in ids. Raises KeyError if any id is not present."""
+        ids = np.asarray(ids, dtype=np.int64)
+        invalid = (ids < 0) | (ids >= self._n)
+        if invalid.any():
+            raise KeyError(int(ids[invalid][0]))
+        return ids
+
+    def row_dict(self, row: int) -> dict[str, Any]:
+        out = {}
+        for name in self.columns:
+            col: Optional[np.ndarray] = getattr(self, name)
+            if col is None:
+                continue
+            val = col[row]
+            out[name] = tuple(val.tolist()) if col.ndim == 2 else val.item()
+        return out
+
+
+class NodeTable(_Table):
+    columns = ("k", "res", "samples", "node_color")
+
+    def __init__(self, res: np.ndarray, k: np.ndarray):
+        super().__init__(n=len(res))
+        self.res = np.asarray(res, dtype=np.int64)
+        self.k = np.asarray(k, dtype=np.int64)
+        self.samples: Optional[np.ndarray] = None
+        self.node_color: Optional[np.ndarray] = None  # (n_nodes, 4) RGBA
+
+
+class EdgeTable(_Table):
+    columns = ("res", "start", "end", "samples", "in_prop", "edge_color")
+
+    def __init__(
+        self,
+        res: np.ndarray,
+        start: np.ndarray,
+        end: np.ndarray,
+        samples: np.ndarray,
+        in_prop: np.ndarray,
+    ):
+        super().__init__(n=len(res))
+        self.res = np.asarray(res, dtype=np.int64)
+        self.start = np.asarray(start, dtype=np.int64)  # node id
+        self.end = np.asarray(end, dtype=np.int64)  # node id
+        self.samples = np.asarray(samples, dtype=np.int64)
+        self.in_prop = np.asarray(in_prop, dtype=np.float64)
+        self.edge_color: Optional[np.ndarray] = None  # (n_edges, 4) RGBA
+
+
+def empty_node_table() -> NodeTable:
+    return NodeTable(res=[], k=[])
+
+
+def empty_edge_table() -> EdgeTable:
+    return EdgeTable(res=[], start=[], end=[], samples=[], in_prop=[])
+
+
+class TableView(Mapping):
+    """
+    Read-only dict-like view of a NodeTable or EdgeTable, mapping node / edge id to a \
+    dict of attributes, e.g. {'k': 1, 'res': 2, 'samples': 70, 'node_color': (...)}.
+    """
+
+    def __init__(self, table: _Table):
+        self._table = table
+
+    def __getitem__(self, key: int) -> dict[str, Any]:
+        row = self._table.rows(np.array([key]))[0]
+        return self._table.row_dict(row)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(len(self._table)))
+
+    def __len__(self) -> int:
+        return len(self._table)
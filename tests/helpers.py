@@ -1,10 +1,19 @@
+from typing import Literal
+
 import cv2
 import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
 
 INPUT_DIR = "tests/data/input/"
 
 OUTPUT_DIR = "tests/data/output/"
 
+SPLIT_TYPE = Literal["tree", "noisy", "random"]
+SPLITS = ("tree", "noisy", "random")
+PREFIX = "K"
+METADATA_COL = "meta"
+
 
 def add_title_to_fig(path: str, title: str) -> None:
     to_edit = cv2.imread(path + ".png")
@@ -13,3 +22,57 @@ def add_title_to_fig(path: str, title: str) -> None:
     fig.suptitle(title, fontsize=6)
     ax.axis("off")
     plt.savefig(path, dpi=200, bbox_inches="tight")
+
+
+def hierarchical_membership(
+    n: int,
+    kk: int,
+    split: SPLIT_TYPE = "tree",
+    noise: float = 0.1,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """
+    Synthetic cluster membership of n samples at resolutions 1, ..., kk.
+
+    Parameters
+    ----------
+    n : int
+        Number of samples.
+    kk : int
+        Number of resolutions. Resolution K has at most K clusters, numbered from 1.
+    split : Literal["tree", "noisy", "random"]
+        How clusters at resolution K follow from resolution K - 1. 'tree' splits \
+        one cluster, chosen with probability proportional to its size, in two, so \
+        the clustree is a tree with K - 1 edges per resolution. 'noisy' also \
+        reassigns a proportion noise of samples to a random cluster, adding edges \
+        between unrelated clusters. 'random' clusters each resolution \
+        independently, so nearly all K * (K - 1) edges are present.
+    noise : float
+        Proportion of samples reassigned per resolution if split is 'noisy'.
+    seed : int
+        Seed of the random generator.
+
+    Returns
+    -------
+        DataFrame with columns K1, ..., Kkk of cluster membership and a float \
+        column 'meta' of metadata.
+    """
+    if split not in SPLITS:
+        raise ValueError(f"unknown split '{split}', use one of {SPLITS}")
+    rng = np.random.default_rng(seed)
+    labels = np.zeros(n, dtype=np.int64)
+    cols = {f"{PREFIX}1": labels + 1}
+    for k_upper in range(2, kk + 1):
+        if split == "random":
+            labels = rng.integers(0, k_upper, n)
+        else:
+            sizes = np.bincount(labels, minlength=k_upper - 1)
+            parent = rng.choice(k_upper - 1, p=sizes / n)
+            moved = (labels == parent) & (rng.random(n) < 0.5)
+            labels = np.where(moved, k_upper - 1, labels)
+            if split == "noisy":
+                noisy = rng.random(n) < noise
+                labels = np.where(noisy, rng.integers(0, k_upper, n), labels)
+        cols[f"{PREFIX}{k_upper}"] = labels + 1
+    cols[METADATA_COL] = rng.normal(size=n)
+    return pd.DataFrame(cols)
@@ -0,0 +1,286 @@
+"""
+Benchmark of each phase of drawing a clustree, on synthetic clusterings.
+
+Run with pytest (see test_benchmark.py) or directly, e.g.
+
+    python -m tests.integration.stress.benchmark --n 10000 100000 --kk 10 30 \
+        --split tree noisy random --output benchmark.json
+
+Each phase is timed as the best of several repeats, then run once more under \
+tracemalloc for its peak traced memory. Results are written as JSON, one record per \
+scenario and phase, for regression tracking.
+"""
+
+import argparse
+import io
+import itertools
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, NamedTuple, Optional
+
+import cv2
+import matplotlib
+import matplotlib.pyplot as plt
+import networkx
+import numpy as np
+import pandas as pd
+
+from clustree._config import ClustreeConfig
+from clustree._draw import (
+    _load_node_images,
+    add_legend,
+    draw_custom_nodes,
+    draw_edges,
+    get_nodes_extent,
+    get_nodes_pixels,
+    get_pos,
+)
+from clustree._handle_pars import get_membership_cols, handle_data
+from clustree._images import ImageCache
+from clustree._model import construct_clustree
+from tests.helpers import (
+    METADATA_COL,
+    PREFIX,
+    SPLIT_TYPE,
+    SPLITS,
+    hierarchical_membership,
+)
+
+
+class Scenario(NamedTuple):
+    n: int
+    kk: int
+    split: SPLIT_TYPE
+
+
+class PhaseResult(NamedTuple):
+    phase: str
+    seconds: float
+    peak_bytes: int
+
+
+def synthetic_images(path: str, kk: int, side: int = 64, seed: int = 0) -> int:
+    """Write one smooth random PNG image of side x side pixels per node of a \
+    clustree of depth kk, named 'K_k.png' with k numbered from 1, to path. Returns \
+    the number of images."""
+    rng = np.random.default_rng(seed)
+    n_images = 0
+    for k_upper in range(1, kk + 1):
+        for k in range(1, k_upper + 1):
+            # smooth noise, so images compress like real plots rather than noise
+            small = rng.integers(0, 255, (8, 8, 3), dtype=np.uint8)
+            img = cv2.resize(small, (side, side), interpolation=cv2.INTER_CUBIC)
+            cv2.imwrite(str(Path(path) / f"{k_upper}_{k}.png"), img)
+            n_images += 1
+    return n_images
+
+
+def measure(
+    phase: str,
+    func: Callable[[], Any],
+    repeats: int = 3,
+    cleanup: Optional[Callable[[Any], None]] = None,
+) -> tuple[Any, PhaseResult]:
+    """Best wall time of repeats calls of func, and peak memory traced during one \
+    further call. Returns the result of the last call, passing all others to \
+    cleanup."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        out = func()
+        times.append(time.perf_counter() - start)
+        if cleanup is not None:
+            cleanup(out)
+    tracemalloc.start()
+    try:
+        out = func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return out, PhaseResult(phase=phase, seconds=min(times), peak_bytes=peak)
+
+
+def run_scenario(
+    scenario: Scenario,
+    work_dir: str,
+    figsize: tuple[float, float] = (10, 10),
+    node_size: float = 300,
+    dpi: float = 100,
+    border_size: float = 0.05,
+    repeats: int = 3,
+) -> dict[str, Any]:
+    """
+    Run each phase of drawing the clustree of a synthetic clustering.
+
+    Phases are: ingestion (reading a csv of membership and metadata), config \
+    (ClustreeConfig, i.e. counting, node and edge colors), construct_clustree, \
+    get_pos (tidy layout), extent (get_nodes_extent), images (decoding node images \
+    at their output size), draw (edges, node images from a warm image cache and \
+    legend) and savefig.
+
+    Returns
+    -------
+        Dict holding the scenario, #nodes, #edges, #images and one PhaseResult (as \
+        dict) per phase.
+    """
+    n, kk, split = scenario
+    data = hierarchical_membership(n=n, kk=kk, split=split)
+    csv_path = os.path.join(work_dir, f"{n}_{kk}_{split}.csv")
+    data.to_csv(csv_path, index=False)
+    image_dir = os.path.join(work_dir, f"images_{kk}")
+    if not os.path.isdir(image_dir):
+        os.mkdir(image_dir)
+        synthetic_images(path=image_dir, kk=kk)
+    image_dir += "/"
+    membership_cols = get_membership_cols(prefix=PREFIX, kk=kk)
+    results = []
+
+    def run(phase, func, **kwargs):
+        out, result = measure(phase=phase, func=func, repeats=repeats, **kwargs)
+        results.append(result)
+        return out
+
+    data = run(
+        "ingestion",
+        lambda: handle_data(
+            data=csv_path,
+            membership_cols=membership_cols,
+            metadata_cols=[METADATA_COL],
+        ),
+    )
+    cf = run(
+        "config",
+        lambda: ClustreeConfig(
+            kk=kk,
+            data=data,
+            prefix=PREFIX,
+            node_color=METADATA_COL,
+            node_color_aggr="mean",
+            node_cmap="inferno",
+            edge_cmap="viridis",
+            start_at_1=True,
+            metadata_cols=[METADATA_COL],
+        ),
+    )
+    dg = run("construct_clustree", lambda: construct_clustree(cf=cf))
+    pos = run("get_pos", lambda: get_pos(dg=dg, orientation="vertical", layout="tidy"))
+    extent = run(
+        "extent",
+        lambda: get_nodes_extent(dg=dg, pos=pos, figsize=figsize, node_size=node_size),
+    )
+
+    fig, ax = plt.subplots(figsize=figsize)
+    draw_edges(dg=dg, pos=pos, ax=ax, node_size=3 * node_size, arrows=True)
+    target_size = get_nodes_pixels(extent=extent, ax=ax, dpi=dpi)
+    plt.close(fig)
+
+    def load_images(image_cache: Optional[ImageCache] = None):
+        return _load_node_images(
+            dg=dg,
+            path=image_dir,
+            border_size_prop=border_size,
+            target_size=target_size,
+            image_cache=image_cache,
+            image_workers=None,
+        )
+
+    _, images = run("images", load_images)
+    image_cache = ImageCache(max_bytes=None)
+    load_images(image_cache=image_cache)
+
+    def draw():
+        fig, ax = plt.subplots(figsize=figsize)
+        draw_edges(dg=dg, pos=pos, ax=ax, node_size=3 * node_size, arrows=True)
+        draw_custom_nodes(
+            dg=dg,
+            extent=extent,
+            path=image_dir,
+            ax=ax,
+            border_size_prop=border_size,
+            dpi=dpi,
+            image_cache=image_cache,
+        )
+        add_legend(
+            fig=fig,
+            ax=ax,
+            node_color_sm=cf.node_color_sm,
+            edge_color_sm=cf.edge_color_sm,
+            node_color_title=cf.node_color_legend_title,
+            edge_color_title=cf.edge_color_legend_title,
+        )
+        return fig
+
+    fig = run("draw", draw, cleanup=plt.close)
+    run("savefig", lambda: fig.savefig(io.BytesIO(), dpi=dpi, bbox_inches="tight"))
+    plt.close(fig)
+
+    return {
+        **scenario._asdict(),
+        "nodes": dg.number_of_nodes(),
+        "edges": dg.number_of_edges(),
+        "images": len(images),
+        "phases": [result._asdict() for result in results],
+    }
+
+
+def environment() -> dict[str, Any]:
+    """Versions and hardware the benchmark ran on."""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "matplotlib": matplotlib.__version__,
+        "networkx": networkx.__version__,
+        "opencv": cv2.__version__,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def write_report(path: str, scenarios: list[dict[str, Any]]) -> None:
+    """Write benchmark results, with the environment they were measured in, as \
+    JSON."""
+    with open(path, "w") as f:
+        json.dump({"environment": environment(), "scenarios": scenarios}, f, indent=2)
+
+
+def format_scenario(result: dict[str, Any]) -> str:
+    """One line summary of the results of a scenario."""
+    phases = ", ".join(
+        f"{p['phase']} {p['seconds']:.3f}s/{p['peak_bytes'] / 2**20:.1f}MiB"
+        for p in result["phases"]
+    )
+    return (
+        f"n={result['n']} kk={result['kk']} split={result['split']} "
+        f"nodes={result['nodes']} edges={result['edges']}: {phases}"
+    )
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--n", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--kk", type=int, nargs="+", default=[10, 20])
+    parser.add_argument("--split", nargs="+", choices=SPLITS, default=list(SPLITS))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", default="benchmark.json")
+    args = parser.parse_args(argv)
+
+    scenarios = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for n, kk, split in itertools.product(args.n, args.kk, args.split):
+            scenario = Scenario(n=n, kk=kk, split=split)
+            scenarios.append(
+                run_scenario(scenario=scenario, work_dir=work_dir, repeats=args.repeats)
+            )
+            print(format_scenario(scenarios[-1]))
+    write_report(path=args.output, scenarios=scenarios)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import time
+
+import numpy as np
+import pytest
+
+from clustree._config import ClustreeConfig
+from tests.helpers import METADATA_COL, hierarchical_membership
+
+COUNT_ONLY = {
+    "init": True,
+    "sample_info": True,
+    "node_color": False,
+    "edge_color": False,
+}
+
+
+@pytest.mark.parametrize("kk", [10, 30])
+def test_aggregate_metadata_scaling(kk):
+    n = 1_000_000
+    data = hierarchical_membership(n=n, kk=kk, split="noisy")
+    data["meta2"] = np.random.default_rng(1).normal(size=n)
+    metadata_cols = [METADATA_COL, "meta2"]
+    aggregates = ["mean", "median", "sum", "min", "max", "std", "count"]
+    cf = ClustreeConfig(
+        kk=kk,
+        data=data,
+        prefix="K",
+        metadata_cols=metadata_cols,
+        _setup_cf=COUNT_ONLY,
+    )
+
+    # reference: one groupby per resolution, column and aggregate
+    start = time.perf_counter()
+    for col in metadata_cols:
+        for aggr in aggregates:
+            for k_upper in range(1, kk + 1):
+                data.groupby(f"K{k_upper}")[col].agg(aggr)
+    grouped = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cf.aggregate_metadata(cols=[], aggregates=aggregates, data=data)
+    single_pass = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for col in metadata_cols:
+        for aggr in aggregates:
+            cf.set_node_color(
+                node_color=col, cmap="Blues", aggr=aggr, data=data, prefix="K"
+            )
+    switching = time.perf_counter() - start
+
+    print(
+        f"\nn={n} kk={kk}: {len(metadata_cols)} columns x {len(aggregates)} "
+        f"aggregates, groupby {grouped:.3f}s, single pass {single_pass:.3f}s, "
+        f"then {switching:.3f}s to color by each"
+    )
+    assert len(cf.aggregates) == len(metadata_cols) * len(aggregates)
+    assert single_pass < grouped
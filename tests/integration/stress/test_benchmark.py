@@ -0,0 +1,51 @@
+import os
+import tempfile
+
+import pytest
+
+from tests.helpers import OUTPUT_DIR, SPLITS, hierarchical_membership
+from tests.integration.stress.benchmark import (
+    Scenario,
+    format_scenario,
+    run_scenario,
+    write_report,
+)
+
+REPORT_PATH = os.environ.get(
+    "CLUSTREE_BENCHMARK_REPORT", os.path.join(OUTPUT_DIR, "benchmark.json")
+)
+SCENARIOS = [
+    Scenario(n=n, kk=kk, split=split)
+    for n in [10_000, 1_000_000]
+    for kk in [10, 30]
+    for split in SPLITS
+]
+
+
+@pytest.fixture(scope="module")
+def report():
+    scenarios = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        yield work_dir, scenarios
+    write_report(path=REPORT_PATH, scenarios=scenarios)
+    print(f"\nbenchmark report written to {REPORT_PATH}")
+
+
+@pytest.mark.parametrize("split", SPLITS)
+def test_hierarchical_membership(split):
+    kk = 8
+    data = hierarchical_membership(n=1000, kk=kk, split=split)
+    for k_upper in range(1, kk + 1):
+        assert data[f"K{k_upper}"].between(1, k_upper).all()
+    if split == "tree":  # each cluster has a single parent
+        for k_upper in range(2, kk + 1):
+            parents = data.groupby(f"K{k_upper}")[f"K{k_upper - 1}"].nunique()
+            assert (parents == 1).all()
+
+
+@pytest.mark.parametrize("scenario", SCENARIOS, ids=lambda s: "-".join(map(str, s)))
+def test_benchmark(report, scenario):
+    work_dir, scenarios = report
+    result = run_scenario(scenario=scenario, work_dir=work_dir)
+    scenarios.append(result)
+    print(f"\n{format_scenario(result)}")
@@ -0,0 +1,41 @@
+import time
+
+import numpy as np
+
+from clustree._clustree_graph import ClustreeGraph
+from clustree._config import ClustreeConfig
+from clustree._draw import get_pos
+from clustree._handle_pars import get_resolution_cols
+from clustree._model import COUNT_ONLY_CONFIG
+from tests.integration.stress.test_sparse_nodes import resolution_sweep
+
+
+def test_clustree_graph_conversions():
+    data = resolution_sweep(n=1_000_000, resolutions=np.linspace(0.1, 8.0, 30))
+    membership_cols = get_resolution_cols(cols=list(data.columns), prefix="leiden_")
+    cf = ClustreeConfig(
+        kk=len(membership_cols),
+        data=data,
+        prefix="leiden_",
+        membership_cols=membership_cols,
+        _setup_cf=COUNT_ONLY_CONFIG,
+    )
+
+    timings = {}
+    start = time.perf_counter()
+    g = ClustreeGraph.from_config(cf=cf)
+    timings["clustree"] = time.perf_counter() - start
+    for name, convert in [
+        ("networkx", g.to_networkx),
+        ("igraph", g.to_igraph),
+        ("tidy layout", lambda: get_pos(g, "vertical", "tidy")),
+    ]:
+        start = time.perf_counter()
+        convert()
+        timings[name] = time.perf_counter() - start
+
+    print(
+        f"\n{len(g)} nodes, {g.number_of_edges()} edges: "
+        + ", ".join(f"{name} {seconds:.3f}s" for name, seconds in timings.items())
+    )
+    assert timings["clustree"] < timings["networkx"]
@@ -0,0 +1,64 @@
+import time
+
+import numpy as np
+import pytest
+
+from clustree._count import count_transitions, unique_paths
+from tests.helpers import SPLITS, hierarchical_membership
+
+
+def count_transitions_masked(data: np.ndarray) -> None:
+    # reference: one boolean mask and np.unique per (K, k), as prior to vectorizing
+    for col in range(data.shape[1]):
+        vals = np.unique(data[:, col])
+        if col > 0:
+            for k_end in vals:
+                np.unique(data[data[:, col] == k_end, col - 1], return_counts=True)
+
+
+@pytest.mark.parametrize("n", [10_000, 100_000, 1_000_000])
+def test_count_transitions_scaling(n):
+    kk = 30
+    data = hierarchical_membership(n=n, kk=kk, split="noisy", noise=0.3)
+    data = data[[f"K{k_upper}" for k_upper in range(1, kk + 1)]].to_numpy()
+
+    start = time.perf_counter()
+    count_transitions(data=data)
+    vectorized = time.perf_counter() - start
+
+    start = time.perf_counter()
+    count_transitions_masked(data=data)
+    masked = time.perf_counter() - start
+
+    print(
+        f"\nn={n} kk={kk}: bincount {vectorized:.3f}s, masked {masked:.3f}s "
+        f"({masked / vectorized:.1f}x)"
+    )
+    assert vectorized < masked
+
+
+@pytest.mark.parametrize("split", SPLITS)
+def test_unique_paths_scaling(split):
+    n, kk = 1_000_000, 30
+    data = hierarchical_membership(n=n, kk=kk, split=split)
+    columns = [data[f"K{k_upper}"].to_numpy() for k_upper in range(1, kk + 1)]
+
+    start = time.perf_counter()
+    count_transitions(data=columns)
+    direct = time.perf_counter() - start
+
+    start = time.perf_counter()
+    paths, counts = unique_paths(data=columns)
+    deduplicated = time.perf_counter() - start
+    start = time.perf_counter()
+    count_transitions(data=paths, weights=counts)
+    weighted = time.perf_counter() - start
+
+    print(
+        f"\nn={n} kk={kk} split={split}: {len(counts)} unique paths, count rows "
+        f"{direct:.3f}s, deduplicate {deduplicated:.3f}s + count paths "
+        f"{weighted:.4f}s"
+    )
+    if split == "tree":
+        assert len(counts) == kk
+        assert weighted < direct
@@ -0,0 +1,60 @@
+import time
+
+import matplotlib.pyplot as plt
+import pytest
+from networkx import draw_networkx_edges, get_edge_attributes
+
+from clustree._config import ClustreeConfig
+from clustree._draw import draw_edges, get_pos
+from clustree._model import COUNT_ONLY_CONFIG, construct_clustree
+from tests.helpers import hierarchical_membership
+
+
+def colored_graph(kk: int):
+    cf = ClustreeConfig(
+        kk=kk,
+        data=hierarchical_membership(n=100_000, kk=kk, split="noisy", noise=0.3),
+        prefix="K",
+        _setup_cf=COUNT_ONLY_CONFIG,
+    )
+    cf.set_edge_color(edge_color="samples", cmap="viridis", prefix="K")
+    return construct_clustree(cf=cf)
+
+
+def draw_time(draw) -> float:
+    fig, ax = plt.subplots(figsize=(10, 10))
+    start = time.perf_counter()
+    draw(ax)
+    fig.savefig("/dev/null", format="png", dpi=100)
+    elapsed = time.perf_counter() - start
+    plt.close(fig)
+    return elapsed
+
+
+@pytest.mark.parametrize("kk", [20, 40])
+def test_edges_native_vs_networkx(kk):
+    dg = colored_graph(kk=kk)
+    pos = get_pos(dg=dg, orientation="vertical", layout="tidy")
+
+    def networkx_edges(ax):
+        draw_networkx_edges(
+            G=dg,
+            pos=pos,
+            node_shape="s",
+            node_size=900,
+            arrows=True,
+            ax=ax,
+            edge_color=get_edge_attributes(dg, "edge_color").values(),
+            alpha=list(get_edge_attributes(dg, "in_prop").values()),
+        )
+
+    def native_edges(ax):
+        draw_edges(dg=dg, pos=pos, ax=ax, node_size=900, arrows=True)
+
+    networkx_time = draw_time(networkx_edges)
+    native_time = draw_time(native_edges)
+    print(
+        f"\nkk={kk} edges={dg.number_of_edges()}: networkx {networkx_time:.3f}s, "
+        f"native {native_time:.3f}s ({networkx_time / native_time:.1f}x)"
+    )
+    assert native_time < networkx_time
@@ -0,0 +1,49 @@
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+from clustree._images import prefetch_node_images
+
+N_IMAGES = 500
+
+
+@pytest.fixture(scope="module")
+def image_dir():
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for i in range(N_IMAGES):
+            # smooth noise, so images compress like real plots rather than noise
+            small = rng.integers(0, 255, (32, 32, 3), dtype=np.uint8)
+            img = cv2.resize(small, (1024, 1024), interpolation=cv2.INTER_CUBIC)
+            cv2.imwrite(str(Path(temp_dir) / f"{i}.png"), img)
+        yield temp_dir
+
+
+@pytest.mark.parametrize("target_size", [None, 64])
+def test_prefetch_parallel_vs_sequential(image_dir, target_size):
+    requests = [
+        dict(
+            img_path=str(Path(image_dir) / f"{i}.png"),
+            border_size_prop=0.05,
+            border_color=(0.0, 0.0, 1.0, 1.0),
+            target_size=target_size,
+        )
+        for i in range(N_IMAGES)
+    ]
+    times = {}
+    for workers in [1, None]:
+        start = time.perf_counter()
+        prefetch_node_images(requests=requests, image_cache=None, max_workers=workers)
+        times[workers] = time.perf_counter() - start
+    print(
+        f"\n{N_IMAGES} images, target_size={target_size}, {os.cpu_count()} cpus: "
+        f"sequential {times[1]:.2f}s, parallel {times[None]:.2f}s "
+        f"({times[1] / times[None]:.1f}x)"
+    )
+    if (os.cpu_count() or 1) > 1:
+        assert times[None] < times[1]
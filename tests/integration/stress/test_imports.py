@@ -0,0 +1,66 @@
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import clustree
+from tests.helpers import INPUT_DIR
+from tests.unit.test_imports import loaded_modules
+
+REPEATS = 5
+
+HEAVY_MODULES = [
+    "cv2",
+    "igraph",
+    "matplotlib",
+    "matplotlib.cm",
+    "matplotlib.colors",
+    "matplotlib.pyplot",
+    "networkx",
+    "pyarrow",
+    "scipy",
+    "scipy.sparse",
+]
+
+# color mapping of nodes and edges, and the networkx graph that is returned
+COUNTING_MODULES = {"matplotlib", "matplotlib.cm", "matplotlib.colors", "networkx"}
+
+
+def import_time(code: str) -> float:
+    """Best wall time of running code in a fresh interpreter, minus interpreter \
+    startup."""
+    env = dict(os.environ, PYTHONPATH=str(Path(clustree.__file__).parents[1]))
+
+    def best(script: str) -> float:
+        times = []
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "-c", script], env=env, check=True)
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    return best(code) - best("pass")
+
+
+def test_import_time():
+    compute = import_time("import clustree")
+    drawing = import_time("import clustree, clustree._draw")
+    print(
+        f"\nimport clustree {compute:.3f}s, "
+        f"with drawing dependencies {drawing:.3f}s"
+    )
+    assert compute < drawing
+
+
+def test_counting_heavy_modules():
+    read = f"import pandas as pd\ndata = pd.read_csv('{INPUT_DIR}iris.csv')\n"
+    count = (
+        "from clustree import clustree\n"
+        f"clustree(data=data, prefix='K', images='{INPUT_DIR}', draw=False)"
+    )
+    # modules loaded by reading the data, e.g. pyarrow by pandas, are not counted
+    before = loaded_modules(read)
+    after = loaded_modules(read + count)
+    heavy = {module for module in HEAVY_MODULES if module in after - before}
+    assert heavy == COUNTING_MODULES
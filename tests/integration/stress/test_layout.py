@@ -0,0 +1,82 @@
+import time
+import tracemalloc
+
+import pytest
+
+from clustree._clustree_graph import ClustreeGraph
+from clustree._config import ClustreeConfig
+from clustree._draw import get_pos
+from clustree._layout import layered_layout
+from clustree._model import COUNT_ONLY_CONFIG
+from tests.helpers import hierarchical_membership
+
+
+def clustree_graph(kk: int) -> ClustreeGraph:
+    cf = ClustreeConfig(
+        kk=kk,
+        data=hierarchical_membership(n=100_000, kk=kk, split="noisy", noise=0.3),
+        prefix="K",
+        _setup_cf=COUNT_ONLY_CONFIG,
+    )
+    return ClustreeGraph.from_config(cf=cf)
+
+
+def measure(graph: ClustreeGraph, layout: str) -> tuple[float, int]:
+    # timed without tracemalloc, which slows allocation, then run again for peak
+    start = time.perf_counter()
+    get_pos(dg=graph, orientation="vertical", layout=layout)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    try:
+        get_pos(dg=graph, orientation="vertical", layout=layout)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return elapsed, peak
+
+
+@pytest.mark.parametrize("kk", [6, 10, 12, 20])
+def test_tidy_vs_igraph(kk):
+    graph = clustree_graph(kk=kk)
+    tidy_time, tidy_peak = measure(graph=graph, layout="tidy")
+    try:
+        igraph_time, igraph_peak = measure(graph=graph, layout="igraph")
+        igraph = f"{igraph_time:.3f}s {igraph_peak / 2**20:.1f}MiB"
+    except MemoryError:  # igraph's Reingold-Tilford does not scale past kk ~ 12
+        igraph = "out of memory"
+    print(
+        f"\nkk={kk} nodes={len(graph)} edges={graph.number_of_edges()}: "
+        f"tidy {tidy_time:.3f}s {tidy_peak / 2**20:.1f}MiB, igraph {igraph}"
+    )
+
+
+@pytest.mark.parametrize("kk", [100])
+def test_tidy_large(kk):
+    graph = clustree_graph(kk=kk)
+    tidy_time, tidy_peak = measure(graph=graph, layout="tidy")
+    print(
+        f"\nkk={kk} nodes={len(graph)}: "
+        f"tidy {tidy_time:.3f}s {tidy_peak / 2**20:.1f}MiB"
+    )
+    assert tidy_time < 5
+
+
+@pytest.mark.parametrize("kk", [50])
+def test_layered_large(kk):
+    cf = ClustreeConfig(
+        kk=kk,
+        data=hierarchical_membership(n=1_000_000, kk=kk, split="noisy", noise=0.3),
+        prefix="K",
+        _setup_cf=COUNT_ONLY_CONFIG,
+    )
+    args = dict(
+        res=cf.nodes.res,
+        start=cf.edges.start,
+        end=cf.edges.end,
+        samples=cf.edges.samples,
+    )
+    start = time.perf_counter()
+    layered_layout(**args)
+    elapsed = time.perf_counter() - start
+    print(f"\nkk={kk} nodes={len(cf.nodes)} edges={len(cf.edges)}: {elapsed:.3f}s")
+    assert elapsed < 1
@@ -0,0 +1,40 @@
+import time
+
+import numpy as np
+import pytest
+
+from clustree._config import ClustreeConfig
+from clustree._handle_pars import get_resolution_cols
+from clustree._model import construct_clustree
+from tests.integration.stress.test_sparse_nodes import resolution_sweep
+
+
+@pytest.mark.parametrize(
+    "pruning",
+    [{}, dict(min_in_prop=0.01), dict(max_in_edges_per_node=3)],
+)
+def test_prune_edges_scaling(pruning):
+    n = 1_000_000
+    data = resolution_sweep(n=n, resolutions=np.linspace(0.1, 8.0, 30))
+    membership_cols = get_resolution_cols(cols=list(data.columns), prefix="leiden_")
+
+    start = time.perf_counter()
+    cf = ClustreeConfig(
+        kk=len(membership_cols),
+        data=data,
+        prefix="leiden_",
+        membership_cols=membership_cols,
+        **pruning,
+    )
+    counted = time.perf_counter() - start
+    start = time.perf_counter()
+    dg = construct_clustree(cf=cf)
+    constructed = time.perf_counter() - start
+
+    print(
+        f"\n{pruning}: {len(cf.edges)} edges kept, {cf.n_pruned_edges} pruned, "
+        f"config {counted:.3f}s, construct {constructed:.3f}s"
+    )
+    assert dg.number_of_edges() == len(cf.edges)
+    if "max_in_edges_per_node" in pruning:
+        assert max(d for _, d in dg.in_degree()) <= pruning["max_in_edges_per_node"]
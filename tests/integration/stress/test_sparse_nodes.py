@@ -0,0 +1,56 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from clustree._config import ClustreeConfig
+from clustree._handle_pars import get_resolution_cols
+from clustree._model import construct_clustree
+
+
+def resolution_sweep(n: int, resolutions: np.ndarray, seed: int = 0) -> pd.DataFrame:
+    """Membership resembling a Leiden resolution sweep: resolution r has about \
+    100 * r clusters, numbered from 0 in order of size. Clusters are intervals of \
+    one random score, so clusters of adjacent resolutions mostly nest, and 0.2% of \
+    samples are reassigned at random per resolution."""
+    rng = np.random.default_rng(seed)
+    x = rng.random(n)
+    cols = {}
+    for res in resolutions:
+        n_clusters = max(1, int(100 * res))
+        labels = np.floor(x**2 * n_clusters).astype(np.int64)
+        noisy = rng.random(n) < 0.002
+        labels[noisy] = rng.integers(0, n_clusters, noisy.sum())
+        cols[f"leiden_{res:.1f}"] = labels
+    return pd.DataFrame(cols)
+
+
+@pytest.mark.parametrize("n_res", [10, 30])
+def test_sparse_nodes_scaling(n_res):
+    n = 1_000_000
+    resolutions = np.linspace(0.1, 8.0, n_res)
+    data = resolution_sweep(n=n, resolutions=resolutions)
+    membership_cols = get_resolution_cols(cols=list(data.columns), prefix="leiden_")
+
+    start = time.perf_counter()
+    cf = ClustreeConfig(
+        kk=len(membership_cols),
+        data=data,
+        prefix="leiden_",
+        membership_cols=membership_cols,
+    )
+    counted = time.perf_counter() - start
+    start = time.perf_counter()
+    dg = construct_clustree(cf=cf)
+    constructed = time.perf_counter() - start
+
+    max_clusters = int(data.nunique().max())
+    print(
+        f"\nn={n} resolutions={n_res} max clusters={max_clusters}: "
+        f"{len(cf.nodes)} nodes, {len(cf.edges)} edges, config {counted:.3f}s, "
+        f"construct {constructed:.3f}s"
+    )
+    assert len(cf.nodes) == data.nunique().sum()
+    assert (cf.nodes.samples > 0).all()
+    assert len(dg) == len(cf.nodes)
@@ -0,0 +1,40 @@
+import time
+
+import numpy as np
+
+from clustree._config import ClustreeConfig
+from clustree._handle_pars import get_resolution_cols
+from tests.integration.stress.test_sparse_nodes import resolution_sweep
+
+
+def test_update_scaling():
+    n_new = 10_000
+    data = resolution_sweep(n=1_000_000 + n_new, resolutions=np.linspace(0.1, 8.0, 30))
+    data["score"] = np.random.default_rng(0).random(len(data))
+    membership_cols = get_resolution_cols(cols=list(data.columns), prefix="leiden_")
+    old, new = data.iloc[:-n_new], data.iloc[-n_new:]
+    kwargs = dict(
+        kk=len(membership_cols),
+        prefix="leiden_",
+        membership_cols=membership_cols,
+        node_color="score",
+        node_color_aggr="mean",
+    )
+
+    cf = ClustreeConfig(data=old, **kwargs)
+    start = time.perf_counter()
+    cf.update(data=new)  # first update also summarises old metadata
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    cf.update(data=new)
+    updated = time.perf_counter() - start
+    start = time.perf_counter()
+    full = ClustreeConfig(data=data, **kwargs)
+    recounted = time.perf_counter() - start
+
+    print(
+        f"\n{len(old)} rows + {n_new}: first update {first:.3f}s, "
+        f"update {updated:.3f}s, recount {recounted:.3f}s"
+    )
+    assert (cf.nodes.samples >= full.nodes.samples).all()
+    assert updated < recounted
@@ -151,3 +151,18 @@ def test_graph_orientation_vertical_no_rt(iris_data):
         orientation="vertical",
     )
     add_title_to_fig(path=output, title=title)
+
+
+def test_graph_orientation_vertical_layered(iris_data):
+    output = OUTPUT_DIR + "test_orientation_vertical_layered"
+    title = "Vertical, layered"
+    clustree(
+        data=iris_data,
+        prefix="K",
+        images=INPUT_DIR,
+        output_path=output,
+        arrows=False,
+        layout="layered",
+        orientation="vertical",
+    )
+    add_title_to_fig(path=output, title=title)
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from clustree._aggregate import AGGREGATES, aggregate_nodes, local_node_index
+
+
+def test_local_node_index():
+    local, present = local_node_index(
+        column=np.array([17, 0, 5, 17, 3]), k=np.array([0, 5, 17])
+    )
+    assert local.dtype == np.uint16
+    assert local[present].tolist() == [2, 0, 1, 2]
+    assert present.tolist() == [True, True, True, True, False]
+
+
+def test_aggregate_nodes(iris_data):
+    data = iris_data.copy()
+    data.loc[::7, "sepal_width"] = np.nan
+    data.loc[data["K3"] == 3, "sepal_width"] = np.nan  # node without values
+    cols = ["K1", "K2", "K3"]
+    membership = [data[col].to_numpy() for col in cols]
+    res = np.array([1, 2, 2, 3, 3, 3])
+    k = np.array([1, 1, 2, 1, 2, 3])
+    act = aggregate_nodes(
+        membership=membership,
+        columns={col: data[col].to_numpy() for col in ["sepal_length", "sepal_width"]},
+        node_res=res,
+        node_k=k,
+    )
+    assert len(act) == 2 * len(AGGREGATES)
+    for (col, aggr), values in act.items():
+        exp = np.concatenate(
+            [
+                data.groupby(cluster_col)[col].agg(aggr).to_numpy(dtype=float)
+                for cluster_col in cols
+            ]
+        )
+        if aggr in ("sum", "count"):
+            assert np.allclose(values, exp)
+        else:
+            assert np.allclose(values, exp, equal_nan=True)
+    assert np.isnan(act[("sepal_width", "mean")][5])
+
+
+def test_aggregate_nodes_subset():
+    membership = [np.array([0, 0, 0]), np.array([0, 1, 1])]
+    act = aggregate_nodes(
+        membership=membership,
+        columns={"x": np.array([1.0, 2.0, 4.0])},
+        node_res=np.array([1, 2, 2]),
+        node_k=np.array([0, 0, 1]),
+        aggregates=["mean"],
+    )
+    assert set(act) == {("x", "count"), ("x", "sum"), ("x", "mean"), ("x", "std")}
+    assert act[("x", "mean")].tolist() == pytest.approx([7 / 3, 1, 3])
+    assert np.isnan(act[("x", "std")][1])
+    with pytest.raises(ValueError):
+        aggregate_nodes(
+            membership=membership,
+            columns={},
+            node_res=np.array([1, 2, 2]),
+            node_k=np.array([0, 0, 1]),
+            aggregates=["mode"],
+        )
+    with pytest.raises(KeyError):
+        aggregate_nodes(
+            membership=membership,
+            columns={},
+            node_res=np.array([1, 2]),
+            node_k=np.array([0, 0]),
+        )
@@ -0,0 +1,153 @@
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from clustree import ClustreeCache, ClustreeModel
+from clustree._cache import digest_membership
+from tests.helpers import INPUT_DIR
+
+
+def test_digest_membership():
+    data = np.array([[1, 1], [1, 2], [1, 2]])
+    columns = [data[:, 0], data[:, 1]]
+    assert digest_membership(columns) == digest_membership(
+        [np.array([1, 1, 1]), np.array([1, 2, 2])]
+    )
+    assert digest_membership(columns) != digest_membership(
+        [np.array([1, 1, 1]), np.array([1, 2, 1])]
+    )
+
+
+def test_cache_key(iris_data):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = ClustreeCache(path=temp_dir)
+        membership = [iris_data["K1"].to_numpy(), iris_data["K2"].to_numpy()]
+        key = cache.key(data=iris_data, membership=membership, prefix="K", kk=2)
+        assert key == cache.key(data=iris_data, membership=membership, prefix="K", kk=2)
+        assert key != cache.key(data=iris_data, membership=membership, prefix="K", kk=3)
+        path = Path(INPUT_DIR) / "iris.csv"
+        assert cache.key(data=path, membership=None, kk=2) == cache.key(
+            data=str(path), membership=None, kk=2
+        )
+
+
+def test_cache_evict_size():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = ClustreeCache(path=temp_dir, max_bytes=None)
+        for i, key in enumerate(["a", "b", "c"]):
+            cache.save(key=key, arrays={"x": np.zeros(1000)})
+            os.utime(cache._entry(key), (i, i))
+        size = cache._entry("a").stat().st_size
+        assert cache.load(key="a") is not None  # a is now most recently used
+
+        cache.max_bytes = 2 * size
+        assert cache.evict() == [cache._entry("b")]
+        assert cache.load(key="b") is None
+        assert cache.load(key="c") is not None
+
+
+def test_cache_evict_age():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = ClustreeCache(path=temp_dir, max_age=60)
+        cache.save(key="old", arrays={"x": np.zeros(1)})
+        old = time.time() - 120
+        os.utime(cache._entry("old"), (old, old))
+        cache.save(key="new", arrays={"x": np.zeros(1)})
+        assert cache.load(key="old") is None
+        assert cache.load(key="new") is not None
+
+
+def test_model_cache(iris_data):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        model = ClustreeModel(data=iris_data, prefix="K", cache_dir=temp_dir)
+        exp = model.graph(node_color="sepal_length", node_color_aggr="mean")
+        model.render(images=INPUT_DIR)
+        assert len(list(Path(temp_dir).glob("*.npz"))) == 1
+
+        cached = ClustreeModel(data=iris_data, prefix="K", cache_dir=temp_dir)
+        assert cached.config.data is None  # loaded without counting
+        assert cached._pos == model._pos
+        act = cached.graph(node_color="sepal_length", node_color_aggr="mean")
+        assert cached.config.data is None
+        assert dict(act.nodes.data()) == dict(exp.nodes.data())
+        assert list(act.edges.data()) == list(exp.edges.data())
+
+        # other aggregates are cached along with the mean
+        exp = model.graph(node_color="sepal_length", node_color_aggr="max")
+        act = cached.graph(node_color="sepal_length", node_color_aggr="max")
+        assert cached.config.data is None
+        assert dict(act.nodes.data()) == dict(exp.nodes.data())
+
+        # column not in the cache, data is read again
+        exp = model.graph(node_color="sepal_width", node_color_aggr="max")
+        act = cached.graph(node_color="sepal_width", node_color_aggr="max")
+        assert cached.config.data is not None
+        assert dict(act.nodes.data()) == dict(exp.nodes.data())
+        assert list(act.edges.data()) == list(exp.edges.data())
+
+
+def test_model_cache_min_cluster_number(iris_data):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        model = ClustreeModel(data=iris_data, prefix="K", cache_dir=temp_dir)
+        with pytest.warns(DeprecationWarning, match="min_cluster_number"):
+            cached = ClustreeModel(
+                data=iris_data, prefix="K", cache_dir=temp_dir, min_cluster_number=0
+            )
+        # deprecated, not part of the cache key
+        assert cached.config.data is None
+        assert cached._pos == model._pos
+
+
+def test_model_cache_path():
+    path = Path(INPUT_DIR) / "iris.csv"
+    with tempfile.TemporaryDirectory() as temp_dir:
+        model = ClustreeModel(data=path, prefix="K", cache_dir=temp_dir)
+        cached = ClustreeModel(data=path, prefix="K", cache_dir=temp_dir)
+        assert cached.config.start_at_1 == model.config.start_at_1
+        np.testing.assert_array_equal(
+            cached.config.nodes.samples, model.config.nodes.samples
+        )
+        np.testing.assert_array_equal(
+            cached.config.edges.in_prop, model.config.edges.in_prop
+        )
+
+
+def test_model_cache_metadata(iris_data):
+    style = dict(node_color="sepal_length", node_color_aggr="mean")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        model = ClustreeModel(data=iris_data, prefix="K", cache_dir=temp_dir)
+        exp = dict(model.graph(**style).nodes.data("node_color"))
+
+        # same membership, different metadata: aggregates must not be reused
+        scaled = iris_data.assign(sepal_length=iris_data["sepal_length"] * 100)
+        cached = ClustreeModel(data=scaled, prefix="K", cache_dir=temp_dir)
+        assert not cached._from_cache
+        cached.graph(**style)
+        means = cached.config.aggregates[("sepal_length", "mean")]
+        assert np.allclose(
+            means, model.config.aggregates[("sepal_length", "mean")] * 100
+        )
+        assert dict(model.graph(**style).nodes.data("node_color")) == exp
+
+
+def test_cache_file_digest(monkeypatch):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / "data.csv"
+        path.write_text("K1,K2\n1,1\n1,2\n")
+        cache = ClustreeCache(path=Path(temp_dir) / "cache")
+        key = cache.key(data=path, membership=None, kk=2)
+
+        def fail(path):
+            raise AssertionError("unchanged file hashed again")
+
+        monkeypatch.setattr("clustree._cache.digest_file", fail)
+        assert cache.key(data=str(path), membership=None, kk=2) == key
+
+        monkeypatch.undo()
+        path.write_text("K1,K2\n1,1\n1,1\n")
+        os.utime(path, ns=(0, 0))
+        assert cache.key(data=path, membership=None, kk=2) != key
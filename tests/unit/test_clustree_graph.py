@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from clustree import ClustreeGraph, ClustreeModel
+from clustree._config import ClustreeConfig
+from clustree._draw import get_pos
+from clustree._graph import clustree
+from tests.helpers import INPUT_DIR
+
+
+def test_to_networkx(iris_data):
+    cf = ClustreeConfig(kk=3, prefix="K", data=iris_data)
+    g = ClustreeGraph.from_config(cf=cf)
+    assert len(g) == g.number_of_nodes() == 6
+    assert g.number_of_edges() == 6
+
+    dg = g.to_networkx()
+    assert g.to_networkx() is dg
+    assert dg.graph["resolutions"] == ["1", "2", "3"]
+    assert dict(dg.nodes.data()) == dict(cf.node_cf.items())
+    assert {(u, v): attr for u, v, attr in dg.edges.data()} == {
+        (attr["start"], attr["end"]): attr for attr in cf.edge_cf.values()
+    }
+
+    back = ClustreeGraph.from_networkx(dg)
+    for name in ("res", "k", "samples", "node_color"):
+        np.testing.assert_array_equal(getattr(back.nodes, name), getattr(g.nodes, name))
+    for name in ("res", "start", "end", "samples", "in_prop", "edge_color"):
+        np.testing.assert_array_equal(getattr(back.edges, name), getattr(g.edges, name))
+
+
+def test_from_config_snapshot(iris_data):
+    cf = ClustreeConfig(kk=3, prefix="K", data=iris_data)
+    g = ClustreeGraph.from_config(cf=cf)
+    colors = g.nodes.node_color
+    cf.set_node_color(
+        node_color="C1", aggr=None, cmap="Blues", data=cf.data, prefix="K"
+    )
+    assert g.nodes.node_color is colors
+    assert cf.nodes.node_color is not colors
+
+
+def test_to_igraph(iris_data):
+    g = clustree(
+        data=iris_data, prefix="K", images=INPUT_DIR, draw=False, graph_type="clustree"
+    )
+    ig_graph = g.to_igraph()
+    assert ig_graph.is_directed()
+    assert ig_graph.vcount() == 6
+    assert ig_graph.get_edgelist() == list(
+        zip(g.edges.start.tolist(), g.edges.end.tolist())
+    )
+    assert ig_graph.vs["k"] == g.nodes.k.tolist()
+    assert ig_graph.es["samples"] == g.edges.samples.tolist()
+
+
+def test_to_scipy(iris_data):
+    pytest.importorskip("scipy")
+    g = clustree(
+        data=iris_data, prefix="K", images=INPUT_DIR, draw=False, graph_type="clustree"
+    )
+    adjacency = g.to_scipy()
+    assert adjacency.shape == (6, 6)
+    assert adjacency[0, 1] == 70
+    assert adjacency.sum() == g.edges.samples.sum()
+    assert g.to_scipy(weight=None).sum() == 6
+    with pytest.raises(ValueError, match="unknown weight"):
+        g.to_scipy(weight="edge_color")
+
+
+@pytest.mark.parametrize("layout", ["tidy", "layered", "igraph", "multipartite"])
+def test_get_pos_graph_types(iris_data, layout):
+    model = ClustreeModel(data=iris_data, prefix="K")
+    g = model.graph(graph_type="clustree")
+    assert isinstance(g, ClustreeGraph)
+    dg = model.graph()
+    assert g.to_networkx() is dg
+    exp = get_pos(dg=dg, orientation="vertical", layout=layout)
+    assert get_pos(dg=g, orientation="vertical", layout=layout) == exp
+    with pytest.raises(ValueError, match="unknown graph_type"):
+        model.graph(graph_type="igraph")
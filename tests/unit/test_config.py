@@ -1,32 +1,53 @@
 import matplotlib as mpl
+import numpy as np
+import pandas as pd
 import pytest
 
 from clustree._config import CONTROL_LIST
 from clustree._config import ClustreeConfig as cfg
 from clustree._config import data_to_color
-from clustree._hash import hash_edge_id, hash_node_id
+from clustree._config_helpers import prune_edges
+from clustree._hash import lookup_node_ids
 
 DEFAULT_CONFIG = {k: False for k in CONTROL_LIST}
 
 
+def node_id(cf: cfg, k_upper: int, k_lower: int) -> int:
+    return int(
+        lookup_node_ids(
+            k_upper=[k_upper],
+            k_lower=[k_lower],
+            node_res=cf.nodes.res,
+            node_k=cf.nodes.k,
+        )[0]
+    )
+
+
+def edge_id(cf: cfg, k_upper: int, k_start: int, k_end: int) -> int:
+    start = node_id(cf, k_upper=k_upper - 1, k_lower=k_start)
+    end = node_id(cf, k_upper=k_upper, k_lower=k_end)
+    (edge_ids,) = np.nonzero((cf.edges.start == start) & (cf.edges.end == end))
+    return int(edge_ids[0])
+
+
 def test_init_cf(iris_data):
     setup_cf = DEFAULT_CONFIG
     setup_cf["init"] = True
     cf = cfg(kk=3, prefix="K", data=iris_data, _setup_cf=setup_cf)
-    assert cf.node_cf[hash_node_id(1, 1)]["k"] == 1
-    assert cf.node_cf[hash_node_id(1, 1)]["res"] == 1
+    assert cf.node_cf[node_id(cf, 1, 1)]["k"] == 1
+    assert cf.node_cf[node_id(cf, 1, 1)]["res"] == 1
 
-    assert cf.node_cf[hash_node_id(2, 1)]["k"] == 1
-    assert cf.node_cf[hash_node_id(2, 2)]["k"] == 2
-    assert cf.node_cf[hash_node_id(2, 1)]["res"] == 2
-    assert cf.node_cf[hash_node_id(2, 2)]["res"] == 2
+    assert cf.node_cf[node_id(cf, 2, 1)]["k"] == 1
+    assert cf.node_cf[node_id(cf, 2, 2)]["k"] == 2
+    assert cf.node_cf[node_id(cf, 2, 1)]["res"] == 2
+    assert cf.node_cf[node_id(cf, 2, 2)]["res"] == 2
 
-    assert cf.node_cf[hash_node_id(3, 1)]["k"] == 1
-    assert cf.node_cf[hash_node_id(3, 2)]["k"] == 2
-    assert cf.node_cf[hash_node_id(3, 3)]["k"] == 3
-    assert cf.node_cf[hash_node_id(3, 1)]["res"] == 3
-    assert cf.node_cf[hash_node_id(3, 2)]["res"] == 3
-    assert cf.node_cf[hash_node_id(3, 3)]["res"] == 3
+    assert cf.node_cf[node_id(cf, 3, 1)]["k"] == 1
+    assert cf.node_cf[node_id(cf, 3, 2)]["k"] == 2
+    assert cf.node_cf[node_id(cf, 3, 3)]["k"] == 3
+    assert cf.node_cf[node_id(cf, 3, 1)]["res"] == 3
+    assert cf.node_cf[node_id(cf, 3, 2)]["res"] == 3
+    assert cf.node_cf[node_id(cf, 3, 3)]["res"] == 3
 
 
 def test_set_sample_information_node(iris_data):
@@ -35,14 +56,14 @@ def test_set_sample_information_node(iris_data):
     cf = cfg(kk=3, prefix="K", data=iris_data, _setup_cf=setup_cf)
     assert len(cf.node_cf) == 6
 
-    assert cf.node_cf[hash_node_id(1, 1)]["samples"] == 150
+    assert cf.node_cf[node_id(cf, 1, 1)]["samples"] == 150
 
-    assert cf.node_cf[hash_node_id(2, 1)]["samples"] == 70
-    assert cf.node_cf[hash_node_id(2, 2)]["samples"] == 80
+    assert cf.node_cf[node_id(cf, 2, 1)]["samples"] == 70
+    assert cf.node_cf[node_id(cf, 2, 2)]["samples"] == 80
 
-    assert cf.node_cf[hash_node_id(3, 1)]["samples"] == 45
-    assert cf.node_cf[hash_node_id(3, 2)]["samples"] == 45
-    assert cf.node_cf[hash_node_id(3, 3)]["samples"] == 60
+    assert cf.node_cf[node_id(cf, 3, 1)]["samples"] == 45
+    assert cf.node_cf[node_id(cf, 3, 2)]["samples"] == 45
+    assert cf.node_cf[node_id(cf, 3, 3)]["samples"] == 60
 
 
 def test_set_sample_information_edge(iris_data):
@@ -52,67 +73,109 @@ def test_set_sample_information_edge(iris_data):
     assert len(cf.edge_cf) == 6
 
     # samples and in_prop
-    assert cf.edge_cf[hash_edge_id(k_upper=2, k_end=1, k_start=1)]["samples"] == 70
-    assert cf.edge_cf[hash_edge_id(k_upper=2, k_end=2, k_start=1)]["samples"] == 80
+    assert cf.edge_cf[edge_id(cf, k_upper=2, k_end=1, k_start=1)]["samples"] == 70
+    assert cf.edge_cf[edge_id(cf, k_upper=2, k_end=2, k_start=1)]["samples"] == 80
 
-    assert cf.edge_cf[hash_edge_id(k_upper=2, k_end=1, k_start=1)]["in_prop"] == 1
-    assert cf.edge_cf[hash_edge_id(k_upper=2, k_end=2, k_start=1)]["in_prop"] == 1
+    assert cf.edge_cf[edge_id(cf, k_upper=2, k_end=1, k_start=1)]["in_prop"] == 1
+    assert cf.edge_cf[edge_id(cf, k_upper=2, k_end=2, k_start=1)]["in_prop"] == 1
 
-    assert cf.edge_cf[hash_edge_id(k_upper=3, k_end=1, k_start=1)]["samples"] == 45
-    assert cf.edge_cf[hash_edge_id(k_upper=3, k_end=2, k_start=1)]["samples"] == 25
-    assert cf.edge_cf[hash_edge_id(k_upper=3, k_end=2, k_start=2)]["samples"] == 20
-    assert cf.edge_cf[hash_edge_id(k_upper=3, k_end=3, k_start=2)]["samples"] == 60
+    assert cf.edge_cf[edge_id(cf, k_upper=3, k_end=1, k_start=1)]["samples"] == 45
+    assert cf.edge_cf[edge_id(cf, k_upper=3, k_end=2, k_start=1)]["samples"] == 25
+    assert cf.edge_cf[edge_id(cf, k_upper=3, k_end=2, k_start=2)]["samples"] == 20
+    assert cf.edge_cf[edge_id(cf, k_upper=3, k_end=3, k_start=2)]["samples"] == 60
 
-    assert cf.edge_cf[hash_edge_id(k_upper=3, k_end=1, k_start=1)]["in_prop"] == 1
-    assert cf.edge_cf[hash_edge_id(k_upper=3, k_end=2, k_start=1)]["in_prop"] == 5 / 9
-    assert cf.edge_cf[hash_edge_id(k_upper=3, k_end=2, k_start=2)]["in_prop"] == 4 / 9
-    assert cf.edge_cf[hash_edge_id(k_upper=3, k_end=3, k_start=2)]["in_prop"] == 1
+    assert cf.edge_cf[edge_id(cf, k_upper=3, k_end=1, k_start=1)]["in_prop"] == 1
+    assert cf.edge_cf[edge_id(cf, k_upper=3, k_end=2, k_start=1)]["in_prop"] == 5 / 9
+    assert cf.edge_cf[edge_id(cf, k_upper=3, k_end=2, k_start=2)]["in_prop"] == 4 / 9
+    assert cf.edge_cf[edge_id(cf, k_upper=3, k_end=3, k_start=2)]["in_prop"] == 1
 
     # start and end
-    assert cf.edge_cf[hash_edge_id(k_upper=2, k_end=2, k_start=1)][
-        "start"
-    ] == hash_node_id(1, 1)
-    assert cf.edge_cf[hash_edge_id(k_upper=2, k_end=1, k_start=1)][
-        "end"
-    ] == hash_node_id(2, 1)
-    assert cf.edge_cf[hash_edge_id(k_upper=3, k_end=1, k_start=1)][
-        "end"
-    ] == hash_node_id(3, 1)
-    assert cf.edge_cf[hash_edge_id(k_upper=3, k_end=2, k_start=1)][
-        "end"
-    ] == hash_node_id(3, 2)
-    assert cf.edge_cf[hash_edge_id(k_upper=3, k_end=2, k_start=2)][
-        "end"
-    ] == hash_node_id(3, 2)
-    assert cf.edge_cf[hash_edge_id(k_upper=3, k_end=3, k_start=2)][
-        "end"
-    ] == hash_node_id(3, 3)
-
-    assert cf.edge_cf[hash_edge_id(k_upper=3, k_end=1, k_start=1)][
-        "start"
-    ] == hash_node_id(2, 1)
-    assert cf.edge_cf[hash_edge_id(k_upper=3, k_end=2, k_start=1)][
-        "start"
-    ] == hash_node_id(2, 1)
-    assert cf.edge_cf[hash_edge_id(k_upper=3, k_end=2, k_start=2)][
-        "start"
-    ] == hash_node_id(2, 2)
-    assert cf.edge_cf[hash_edge_id(k_upper=3, k_end=3, k_start=2)][
-        "start"
-    ] == hash_node_id(2, 2)
-
-    assert cf.edge_cf[hash_edge_id(k_upper=2, k_end=1, k_start=1)]["in_prop"] == 1
-    assert cf.edge_cf[hash_edge_id(k_upper=2, k_end=2, k_start=1)]["in_prop"] == 1
-
-    assert cf.edge_cf[hash_edge_id(k_upper=3, k_end=1, k_start=1)]["samples"] == 45
-    assert cf.edge_cf[hash_edge_id(k_upper=3, k_end=2, k_start=1)]["samples"] == 25
-    assert cf.edge_cf[hash_edge_id(k_upper=3, k_end=2, k_start=2)]["samples"] == 20
-    assert cf.edge_cf[hash_edge_id(k_upper=3, k_end=3, k_start=2)]["samples"] == 60
-
-    assert cf.edge_cf[hash_edge_id(k_upper=3, k_end=1, k_start=1)]["in_prop"] == 1
-    assert cf.edge_cf[hash_edge_id(k_upper=3, k_end=2, k_start=1)]["in_prop"] == 5 / 9
-    assert cf.edge_cf[hash_edge_id(k_upper=3, k_end=2, k_start=2)]["in_prop"] == 4 / 9
-    assert cf.edge_cf[hash_edge_id(k_upper=3, k_end=3, k_start=2)]["in_prop"] == 1
+    assert cf.edge_cf[edge_id(cf, k_upper=2, k_end=2, k_start=1)]["start"] == node_id(
+        cf, 1, 1
+    )
+    assert cf.edge_cf[edge_id(cf, k_upper=2, k_end=1, k_start=1)]["end"] == node_id(
+        cf, 2, 1
+    )
+    assert cf.edge_cf[edge_id(cf, k_upper=3, k_end=1, k_start=1)]["end"] == node_id(
+        cf, 3, 1
+    )
+    assert cf.edge_cf[edge_id(cf, k_upper=3, k_end=2, k_start=1)]["end"] == node_id(
+        cf, 3, 2
+    )
+    assert cf.edge_cf[edge_id(cf, k_upper=3, k_end=2, k_start=2)]["end"] == node_id(
+        cf, 3, 2
+    )
+    assert cf.edge_cf[edge_id(cf, k_upper=3, k_end=3, k_start=2)]["end"] == node_id(
+        cf, 3, 3
+    )
+
+    assert cf.edge_cf[edge_id(cf, k_upper=3, k_end=1, k_start=1)]["start"] == node_id(
+        cf, 2, 1
+    )
+    assert cf.edge_cf[edge_id(cf, k_upper=3, k_end=2, k_start=1)]["start"] == node_id(
+        cf, 2, 1
+    )
+    assert cf.edge_cf[edge_id(cf, k_upper=3, k_end=2, k_start=2)]["start"] == node_id(
+        cf, 2, 2
+    )
+    assert cf.edge_cf[edge_id(cf, k_upper=3, k_end=3, k_start=2)]["start"] == node_id(
+        cf, 2, 2
+    )
+
+    assert cf.edge_cf[edge_id(cf, k_upper=2, k_end=1, k_start=1)]["in_prop"] == 1
+    assert cf.edge_cf[edge_id(cf, k_upper=2, k_end=2, k_start=1)]["in_prop"] == 1
+
+    assert cf.edge_cf[edge_id(cf, k_upper=3, k_end=1, k_start=1)]["samples"] == 45
+    assert cf.edge_cf[edge_id(cf, k_upper=3, k_end=2, k_start=1)]["samples"] == 25
+    assert cf.edge_cf[edge_id(cf, k_upper=3, k_end=2, k_start=2)]["samples"] == 20
+    assert cf.edge_cf[edge_id(cf, k_upper=3, k_end=3, k_start=2)]["samples"] == 60
+
+    assert cf.edge_cf[edge_id(cf, k_upper=3, k_end=1, k_start=1)]["in_prop"] == 1
+    assert cf.edge_cf[edge_id(cf, k_upper=3, k_end=2, k_start=1)]["in_prop"] == 5 / 9
+    assert cf.edge_cf[edge_id(cf, k_upper=3, k_end=2, k_start=2)]["in_prop"] == 4 / 9
+    assert cf.edge_cf[edge_id(cf, k_upper=3, k_end=3, k_start=2)]["in_prop"] == 1
+
+
+def test_sparse_nodes():
+    # resolutions named by parameter, cluster numbers neither consecutive nor
+    # bounded by the number of resolutions
+    data = pd.DataFrame(
+        {
+            "leiden_0.2": [0, 0, 0, 0, 0, 0],
+            "leiden_0.4": [0, 0, 5, 5, 17, 17],
+            "leiden_1.0": [3, 3, 3, 40, 40, 2],
+            "meta": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+        }
+    )
+    membership_cols = ["leiden_0.2", "leiden_0.4", "leiden_1.0"]
+    cf = cfg(
+        kk=3,
+        prefix="leiden_",
+        data=data,
+        membership_cols=membership_cols,
+        node_color="meta",
+        node_color_aggr="sum",
+    )
+    assert cf.resolutions == ["0.2", "0.4", "1.0"]
+    assert cf.nodes.res.tolist() == [1, 2, 2, 2, 3, 3, 3]
+    assert cf.nodes.k.tolist() == [0, 0, 5, 17, 2, 3, 40]
+    assert cf.nodes.samples.tolist() == [6, 2, 2, 2, 1, 3, 2]
+    assert cf.aggregates[("meta", "sum")].tolist() == [21, 3, 7, 11, 6, 6, 9]
+
+    ends = cf.nodes.k[cf.edges.end].tolist()
+    starts = cf.nodes.k[cf.edges.start].tolist()
+    assert list(zip(cf.edges.res.tolist(), starts, ends)) == [
+        (2, 0, 0),
+        (2, 0, 5),
+        (2, 0, 17),
+        (3, 17, 2),
+        (3, 0, 3),
+        (3, 5, 3),
+        (3, 5, 40),
+        (3, 17, 40),
+    ]
+    assert cf.edges.samples.tolist() == [2, 2, 2, 1, 2, 1, 1, 1]
+    assert np.allclose(cf.edges.in_prop, [1, 1, 1, 1, 2 / 3, 1 / 3, 0.5, 0.5])
 
 
 def test_set_node_color_prefix(iris_data):
@@ -143,17 +206,14 @@ def test_set_node_color_samples(iris_data):
 
     # produce expected
     kk = 3
-    node_id = [
-        hash_node_id(k_upper=k_upper, k_lower=k_lower)
+    node_ids = [
+        node_id(cf, k_upper=k_upper, k_lower=k_lower)
         for k_upper in range(1, kk + 1)
         for k_lower in range(1, k_upper + 1)
     ]
     samples = [150, 70, 80, 45, 45, 60]
-    exp_color = data_to_color(
-        data={k: v for k, v in zip(node_id, samples)},
-        cmap=mpl.cm.Blues,
-        return_sm=False,
-    )
+    rgba = data_to_color(data=samples, cmap=mpl.cm.Blues, return_sm=False)
+    exp_color = {k: tuple(v) for k, v in zip(node_ids, rgba.tolist())}
 
     # actual
     act_color = {k: v["node_color"] for k, v in cf.node_cf.items()}
@@ -165,20 +225,6 @@ def test_set_node_color_agg(iris_data):
     setup_cf = DEFAULT_CONFIG
     setup_cf.update({"sample_info": True, "node_color": True})
 
-    # produce expected
-    kk = 3
-    node_id = [
-        hash_node_id(k_upper=k_upper, k_lower=k_lower)
-        for k_upper in range(1, kk + 1)
-        for k_lower in range(1, k_upper + 1)
-    ]
-    agg_res = [876.5, 369.8, 506.7, 225.5, 265.2, 385.8]
-    exp_color = data_to_color(
-        data={k: v for k, v in zip(node_id, agg_res)},
-        cmap=mpl.cm.Blues,
-        return_sm=False,
-    )
-
     # actual: with agg as callable
     cf = cfg(
         kk=3,
@@ -189,6 +235,17 @@ def test_set_node_color_agg(iris_data):
         node_color_aggr=sum,
         node_cmap=mpl.cm.Blues,
     )
+
+    # produce expected
+    kk = 3
+    node_ids = [
+        node_id(cf, k_upper=k_upper, k_lower=k_lower)
+        for k_upper in range(1, kk + 1)
+        for k_lower in range(1, k_upper + 1)
+    ]
+    agg_res = [876.5, 369.8, 506.7, 225.5, 265.2, 385.8]
+    rgba = data_to_color(data=agg_res, cmap=mpl.cm.Blues, return_sm=False)
+    exp_color = {k: tuple(v) for k, v in zip(node_ids, rgba.tolist())}
     act_color = {k: v["node_color"] for k, v in cf.node_cf.items()}
     assert all([isinstance(v["node_color"], tuple) for k, v in cf.node_cf.items()])
     assert exp_color == act_color
@@ -208,6 +265,38 @@ def test_set_node_color_agg(iris_data):
     assert exp_color == act_color
 
 
+def test_aggregate_metadata(iris_data, monkeypatch):
+    cf = cfg(
+        kk=3,
+        prefix="K",
+        data=iris_data,
+        node_color="sepal_length",
+        node_color_aggr="median",
+        metadata_cols=["sepal_width"],
+    )
+    assert ("sepal_width", "max") in cf.aggregates
+    assert ("sepal_width", "mean") in cf.aggregates
+
+    # all metadata columns and aggregates are cached by one pass
+    calls = []
+    monkeypatch.setattr(
+        "clustree._config.aggregate_nodes",
+        lambda **kwargs: calls.append(kwargs) or {},
+    )
+    for node_color in ["sepal_width", "sepal_length"]:
+        for aggr in ["median", "mean", "std", "min", "max", "sum"]:
+            cf.set_node_color(
+                node_color=node_color,
+                cmap="Blues",
+                aggr=aggr,
+                data=cf.data,
+                prefix="K",
+            )
+    assert calls == []
+    exp = iris_data.groupby("K2")["sepal_width"].median().to_list()
+    assert cf.aggregates[("sepal_width", "median")][1:3].tolist() == exp
+
+
 def test_set_node_color_no_agg_chosen(iris_data):
     setup_cf = DEFAULT_CONFIG
     setup_cf.update({"sample_info": True, "node_color": True})
@@ -257,7 +346,7 @@ def test_set_edge_color_prefix(iris_data):
         _setup_cf=setup_cf,
         edge_color="K",
     )
-    exp = [f"C{res}" for res in [2, 2, 3, 3, 3, 3]]
+    exp = [mpl.colors.to_rgba(f"C{res}") for res in [2, 2, 3, 3, 3, 3]]
     assert [cf.edge_cf[k]["edge_color"] for k in cf.edge_cf] == exp
 
 
@@ -272,22 +361,19 @@ def test_set_edge_color_samples(iris_data):
         edge_color="samples",
     )
     act_color = [v["edge_color"] for k, v in cf.edge_cf.items()]
-    edge_id = [
-        hash_edge_id(k_upper=2, k_end=1, k_start=1),
-        hash_edge_id(k_upper=2, k_end=2, k_start=1),
-        hash_edge_id(k_upper=3, k_end=1, k_start=1),
-        hash_edge_id(k_upper=3, k_end=2, k_start=1),
-        hash_edge_id(k_upper=3, k_end=2, k_start=2),
-        hash_edge_id(k_upper=3, k_end=3, k_start=2),
+    edge_ids = [
+        edge_id(cf, k_upper=2, k_end=1, k_start=1),
+        edge_id(cf, k_upper=2, k_end=2, k_start=1),
+        edge_id(cf, k_upper=3, k_end=1, k_start=1),
+        edge_id(cf, k_upper=3, k_end=2, k_start=1),
+        edge_id(cf, k_upper=3, k_end=2, k_start=2),
+        edge_id(cf, k_upper=3, k_end=3, k_start=2),
     ]
 
     samples = [70, 80, 45, 25, 20, 60]
 
-    exp_color = data_to_color(
-        data={k: v for k, v in zip(edge_id, samples)},
-        cmap=mpl.cm.Reds,
-        return_sm=False,
-    )
+    rgba = data_to_color(data=samples, cmap=mpl.cm.Reds, return_sm=False)
+    exp_color = {k: tuple(v) for k, v in zip(edge_ids, rgba.tolist())}
 
     # actual
     act_color = {k: v["edge_color"] for k, v in cf.edge_cf.items()}
@@ -306,5 +392,161 @@ def test_set_edge_color_fixed(iris_data):
         edge_color="C1",
     )
     act_color = [v["edge_color"] for k, v in cf.edge_cf.items()]
-    assert all([isinstance(v["edge_color"], str) for k, v in cf.edge_cf.items()])
-    assert act_color == ["C1" for _ in range(6)]
+    assert all([isinstance(v["edge_color"], tuple) for k, v in cf.edge_cf.items()])
+    assert act_color == [mpl.colors.to_rgba("C1") for _ in range(6)]
+
+
+def test_data_to_color_norm():
+    data = np.array([1.0, 10.0, 100.0, 1000.0, np.nan])
+    cmap = mpl.cm.Blues
+    log = data_to_color(data=data, cmap=cmap, return_sm=False, norm="log")
+    exp = cmap(np.array([0, 1 / 3, 2 / 3, 1]))
+    np.testing.assert_allclose(log[:4], exp)
+
+    # skewed values are spread evenly over the colormap by rank
+    skewed = np.array([1.0, 2.0, 3.0, 1000.0])
+    quantile = data_to_color(data=skewed, cmap=cmap, return_sm=False, norm="quantile")
+    np.testing.assert_allclose(quantile, exp)
+
+    with pytest.raises(ValueError, match="positive"):
+        data_to_color(data=[0, 1], norm="log")
+    with pytest.raises(ValueError, match="unknown norm"):
+        data_to_color(data=[0, 1], norm="sqrt")
+
+
+def test_set_edge_color_norm(iris_data):
+    setup_cf = DEFAULT_CONFIG
+    setup_cf.update({"sample_info": True, "edge_color": True})
+    cf = cfg(
+        kk=3,
+        prefix="K",
+        data=iris_data,
+        _setup_cf=setup_cf,
+        edge_color="samples",
+        edge_cmap="Reds",
+        edge_norm="quantile",
+    )
+    exp = data_to_color(
+        data=cf.edges.samples, cmap="Reds", return_sm=False, norm="quantile"
+    )
+    np.testing.assert_allclose(cf.edges.edge_color, exp)
+
+
+def test_prune_edges():
+    # edges into clusters 0 and 1, ordered by (k_end, k_start)
+    k_end = np.array([0, 0, 0, 1, 1])
+    samples = np.array([5, 50, 45, 1, 99])
+    in_prop = samples / np.array([100, 100, 100, 100, 100])
+    assert prune_edges(k_end=k_end, samples=samples, in_prop=in_prop).all()
+
+    keep = prune_edges(k_end=k_end, samples=samples, in_prop=in_prop, min_in_prop=0.05)
+    assert keep.tolist() == [True, True, True, False, True]
+    keep = prune_edges(
+        k_end=k_end, samples=samples, in_prop=in_prop, max_in_edges_per_node=1
+    )
+    assert keep.tolist() == [False, True, False, False, True]
+    keep = prune_edges(
+        k_end=k_end,
+        samples=samples,
+        in_prop=in_prop,
+        min_edge_samples=46,
+        max_in_edges_per_node=2,
+    )
+    assert keep.tolist() == [False, True, False, False, True]
+    with pytest.raises(ValueError, match="at least 1"):
+        prune_edges(
+            k_end=k_end, samples=samples, in_prop=in_prop, max_in_edges_per_node=0
+        )
+
+
+def test_set_sample_information_pruned(iris_data):
+    setup_cf = DEFAULT_CONFIG
+    setup_cf.update({"sample_info": True})
+    full = cfg(kk=3, prefix="K", data=iris_data, _setup_cf=setup_cf)
+    # edge samples [70, 80, 45, 25, 20, 60], node 4 has edges of 25 and 20
+    for pruning, keep in [
+        (dict(max_in_edges_per_node=1), [0, 1, 2, 3, 5]),
+        (dict(min_edge_samples=50), [0, 1, 5]),
+        (dict(min_in_prop=0.5), [0, 1, 2, 3, 5]),
+    ]:
+        cf = cfg(kk=3, prefix="K", data=iris_data, _setup_cf=setup_cf, **pruning)
+        assert cf.n_pruned_edges == len(full.edges) - len(keep)
+        assert cf.edges.samples.tolist() == full.edges.samples[keep].tolist()
+        assert cf.edges.in_prop.tolist() == full.edges.in_prop[keep].tolist()
+        assert cf.edges.start.tolist() == full.edges.start[keep].tolist()
+        assert cf.nodes.samples.tolist() == full.nodes.samples.tolist()
+
+
+@pytest.mark.parametrize(
+    "pruning", [{}, dict(max_in_edges_per_node=1), dict(min_edge_samples=30)]
+)
+def test_update(iris_data, pruning):
+    data = iris_data.sort_values(["K3", "K2"], ignore_index=True)
+    old, new = data.iloc[:90], data.iloc[90:]  # new rows add clusters
+    style = dict(node_color="sepal_length", node_color_aggr="mean", **pruning)
+    full = cfg(kk=3, prefix="K", data=data, **style)
+    cf = cfg(kk=3, prefix="K", data=old, **style)
+    assert len(cf.nodes) < len(full.nodes)
+    cf.update(data=new)
+
+    for name in ("res", "k", "samples"):
+        assert getattr(cf.nodes, name).tolist() == getattr(full.nodes, name).tolist()
+    for name in ("res", "start", "end", "samples", "in_prop"):
+        assert getattr(cf.edges, name).tolist() == getattr(full.edges, name).tolist()
+    assert cf.data is None
+    full.aggregate_metadata(
+        cols=["sepal_length"],
+        aggregates=["sum", "mean", "std", "min", "max", "count"],
+        data=full.data,
+    )
+    for aggr in ("sum", "mean", "std", "min", "max", "count"):
+        np.testing.assert_allclose(
+            cf.aggregates[("sepal_length", aggr)],
+            full.aggregates[("sepal_length", aggr)],
+        )
+
+
+def test_update_nan(iris_data):
+    data = iris_data.copy()
+    data.loc[::4, "sepal_length"] = np.nan
+    old, new = data.iloc[:100], data.iloc[100:]
+    style = dict(node_color="sepal_length", node_color_aggr="mean")
+    full = cfg(kk=3, prefix="K", data=data, **style)
+    cf = cfg(kk=3, prefix="K", data=old, **style)
+    cf.update(data=new)
+
+    aggregates = ["sum", "mean", "std", "min", "max", "count"]
+    full.aggregate_metadata(cols=["sepal_length"], aggregates=aggregates, data=data)
+    for aggr in aggregates:
+        act = cf.aggregates[("sepal_length", aggr)]
+        assert not np.isnan(act).any()
+        np.testing.assert_allclose(act, full.aggregates[("sepal_length", aggr)])
+
+
+def test_update_from_arrays(iris_data):
+    old, new = iris_data.iloc[:100], iris_data.iloc[100:]
+    full = cfg(kk=3, prefix="K", data=iris_data)
+    cf = cfg.from_arrays(
+        arrays=cfg(kk=3, prefix="K", data=old).to_arrays(), kk=3, prefix="K"
+    )
+    cf.update(data=new)
+    assert cf.nodes.samples.tolist() == full.nodes.samples.tolist()
+    assert cf.edges.samples.tolist() == full.edges.samples.tolist()
+
+    pruned = cfg(kk=3, prefix="K", data=old, max_in_edges_per_node=1)
+    cf = cfg.from_arrays(arrays=pruned.to_arrays(), kk=3, prefix="K")
+    assert cf.max_in_edges_per_node == 1 and cf.prunes_edges
+    with pytest.raises(ValueError, match="pruned"):
+        cf.update(data=new)
+
+
+def test_update_missing_metadata(iris_data):
+    cf = cfg(
+        kk=3,
+        prefix="K",
+        data=iris_data.iloc[:100],
+        node_color="sepal_length",
+        node_color_aggr="mean",
+    )
+    with pytest.raises(ValueError, match="sepal_length"):
+        cf.update(data=iris_data.iloc[100:][["K1", "K2", "K3"]])
@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from clustree import _count
+from clustree._count import (
+    EdgeCounts,
+    RunningStats,
+    TransitionCounts,
+    count_transitions,
+    unique_paths,
+)
+
+
+def edge_dict(edges: EdgeCounts) -> dict[tuple[int, int], float]:
+    return dict(
+        zip(zip(edges.k_start.tolist(), edges.k_end.tolist()), edges.samples.tolist())
+    )
+
+
+def test_count_transitions_nodes(iris_data):
+    node_counts, _ = count_transitions(data=iris_data[["K1", "K2", "K3"]].to_numpy())
+    assert node_counts[0].tolist() == [0, 150]
+    assert node_counts[1].tolist() == [0, 70, 80]
+    assert node_counts[2].tolist() == [0, 45, 45, 60]
+
+
+def test_count_transitions_edges(iris_data):
+    _, edge_counts = count_transitions(data=iris_data[["K1", "K2", "K3"]].to_numpy())
+    assert len(edge_counts) == 2
+    assert edge_dict(edge_counts[0]) == {(1, 1): 70, (1, 2): 80}
+    assert edge_dict(edge_counts[1]) == {(1, 1): 45, (1, 2): 25, (2, 2): 20, (2, 3): 60}
+    # ordered by (k_end, k_start)
+    assert edge_counts[1].k_end.tolist() == [1, 2, 2, 3]
+    assert edge_counts[1].k_start.tolist() == [1, 1, 2, 2]
+
+
+def test_count_transitions_sparse_labels():
+    # dense contingency matrices would hold 10**12 entries
+    n = 10**6
+    data = [np.array([0, 0, n - 1, n - 1]), np.array([n - 1, 5, 5, 5])]
+    node_counts, edge_counts = count_transitions(data=data)
+    assert node_counts[1][[5, n - 1]].tolist() == [3, 1]
+    assert edge_dict(edge_counts[0]) == {(0, 5): 1, (n - 1, 5): 2, (0, n - 1): 1}
+
+    # more pairs of observed clusters than rows, so codes are counted by np.unique
+    labels = np.arange(10)
+    _, edge_counts = count_transitions(data=[labels * n, labels[::-1] * n])
+    assert edge_dict(edge_counts[0]) == {(k * n, (9 - k) * n): 1 for k in range(10)}
+
+
+def test_count_transitions_weights():
+    data = np.array([[0, 0], [0, 1], [0, 1]])
+    node_counts, edge_counts = count_transitions(
+        data=data, weights=np.array([2.0, 1.0, 3.0])
+    )
+    assert node_counts[1].tolist() == [2.0, 4.0]
+    assert edge_dict(edge_counts[0]) == {(0, 0): 2.0, (0, 1): 4.0}
+
+
+def test_count_transitions_integer_weights():
+    data = np.array([[0, 0], [0, 1], [0, 1]])
+    node_counts, edge_counts = count_transitions(data=data, weights=np.array([2, 1, 3]))
+    assert node_counts[1].dtype == np.int64
+    assert edge_counts[0].samples.dtype == np.int64
+    assert edge_dict(edge_counts[0]) == {(0, 0): 2, (0, 1): 4}
+
+
+@pytest.mark.parametrize("collide", [False, True])
+def test_unique_paths(iris_data, monkeypatch, collide):
+    if collide:  # hash of each row is its last column, so distinct paths collide
+        monkeypatch.setattr(_count, "_PATH_HASH_MULTIPLIER", np.uint64(0))
+    data = iris_data[["K1", "K2", "K3"]].to_numpy()
+    paths, counts = unique_paths(data=data)
+    rows = sorted(zip(*[path.tolist() for path in paths], counts.tolist()))
+    assert rows == [(1, 1, 1, 45), (1, 1, 2, 25), (1, 2, 2, 20), (1, 2, 3, 60)]
+
+    exp_nodes, exp_edges = count_transitions(data=data)
+    act_nodes, act_edges = count_transitions(data=paths, weights=counts)
+    for act, exp in zip(act_nodes, exp_nodes):
+        assert np.array_equal(act, exp)
+    for act, exp in zip(act_edges, exp_edges):
+        assert edge_dict(act) == edge_dict(exp)
+
+    weights = np.arange(len(data))
+    paths, counts = unique_paths(data=data, weights=weights)
+    assert counts.sum() == weights.sum()
+
+
+def test_count_transitions_negative():
+    with pytest.raises(ValueError):
+        count_transitions(data=np.array([[0, -1]]))
+
+
+def test_transition_counts_chunks(iris_data):
+    data = iris_data[["K1", "K2", "K3"]].to_numpy()
+    exp_nodes, exp_edges = count_transitions(data=data)
+
+    counts = TransitionCounts()
+    for chunk in np.array_split(data, 4):
+        counts.update(data=chunk)
+    assert counts.min_cluster_number == 1
+    for act, exp in zip(counts.node_counts, exp_nodes):
+        assert np.array_equal(act, exp)
+    for act, exp in zip(counts.edge_counts, exp_edges):
+        assert np.array_equal(act.k_end, exp.k_end)
+        assert edge_dict(act) == edge_dict(exp)
+
+
+def test_running_stats(iris_data):
+    data = iris_data[["K1", "K2", "K3"]].to_numpy()
+    values = iris_data["sepal_length"].to_numpy()
+    stats = RunningStats(column="sepal_length")
+    for chunk, val in zip(np.array_split(data, 4), np.array_split(values, 4)):
+        stats.update(data=chunk, values=val)
+
+    exp = iris_data.groupby("K3")["sepal_length"].agg(
+        ["sum", "mean", "std", "min", "max"]
+    )
+    for aggr in ["sum", "mean", "std", "min", "max"]:
+        act = stats.aggregate(aggr=aggr)[2]
+        # cluster 0 has no values, so its sum is 0 as for pandas' groupby
+        assert act[0] == 0 if aggr == "sum" else np.isnan(act[0])
+        assert np.allclose(act[1:], exp[aggr].to_numpy())
+    with pytest.raises(ValueError):
+        stats.aggregate(aggr="median")
+
+
+def test_running_stats_weights():
+    stats = RunningStats(column="x")
+    stats.update(
+        data=np.array([[0], [0], [1]]),
+        values=np.array([1.0, 4.0, 2.0]),
+        weights=np.array([3, 1, 2]),
+    )
+    assert stats.aggregate(aggr="count")[0].tolist() == [4, 2]
+    assert stats.aggregate(aggr="sum")[0].tolist() == [7, 4]
+    assert stats.aggregate(aggr="mean")[0].tolist() == [1.75, 2]
+    assert stats.aggregate(aggr="std")[0][0] == pytest.approx(
+        np.std([1, 1, 1, 4], ddof=1)
+    )
+    assert stats.aggregate(aggr="std")[0][1] == 0  # one row of weight 2
+
+
+@pytest.mark.parametrize("weighted", [False, True])
+def test_running_stats_nan(iris_data, weighted):
+    data = iris_data[["K1", "K2", "K3"]].to_numpy()
+    values = iris_data["sepal_length"].to_numpy().copy()
+    values[::3] = np.nan
+    values[data[:, 2] == 3] = np.nan  # no values at all in node (3, 3)
+    weights = np.arange(1, len(data) + 1) if weighted else None
+    stats = RunningStats(column="sepal_length")
+    for rows in np.array_split(np.arange(len(data)), 4):
+        stats.update(
+            data=data[rows],
+            values=values[rows],
+            weights=None if weights is None else weights[rows],
+        )
+
+    frame = pd.DataFrame({"K3": data[:, 2], "value": values})
+    if weighted:  # each row repeated weights times
+        frame = frame.loc[frame.index.repeat(weights)]
+    exp = frame.groupby("K3")["value"].agg(
+        ["sum", "mean", "std", "min", "max", "count"]
+    )
+    for aggr in RunningStats.AGGREGATES:
+        act = stats.aggregate(aggr=aggr)[2][1:]
+        np.testing.assert_allclose(act, exp[aggr].to_numpy(dtype=float))
@@ -0,0 +1,94 @@
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+from matplotlib.collections import LineCollection, PolyCollection
+
+from clustree._draw import draw_edges, get_nodes_extent, get_nodes_pixels, get_pos
+from clustree._edges import HEAD_LENGTH, marker_clearance, shrink_segments
+from clustree._graph import clustree
+from tests.helpers import INPUT_DIR
+
+
+def rendered_extent(dg, pos, figsize, node_size) -> np.ndarray:
+    """Extents of scatter markers found by drawing, in data coordinates."""
+    fig, ax = plt.subplots(figsize=figsize)
+    draw_edges(dg=dg, pos=pos, ax=ax, node_size=node_size, arrows=True)
+    xy = np.array([pos[v] for v in dg])
+    ax.scatter(xy[:, 0], xy[:, 1], s=node_size, marker="s")
+    fig.canvas.draw()
+    half = np.sqrt(node_size) / 72 * fig.dpi / 2
+    centre = ax.transData.transform(xy)
+    to_data = ax.transData.inverted()
+    lower_left = to_data.transform(centre - half)
+    upper_right = to_data.transform(centre + half)
+    plt.close(fig)
+    return np.column_stack(
+        [lower_left[:, 0], upper_right[:, 0], lower_left[:, 1], upper_right[:, 1]]
+    )
+
+
+@pytest.mark.parametrize("orientation", ["vertical", "horizontal"])
+@pytest.mark.parametrize("figsize, node_size", [((3, 3), 300), ((6, 4), 100)])
+def test_get_nodes_extent(iris_data, orientation, figsize, node_size):
+    dg = clustree(data=iris_data, prefix="K", images=INPUT_DIR, draw=False)
+    pos = get_pos(dg=dg, orientation=orientation, layout="tidy")
+    extent = get_nodes_extent(dg=dg, pos=pos, figsize=figsize, node_size=node_size)
+    exp = rendered_extent(dg=dg, pos=pos, figsize=figsize, node_size=node_size)
+    np.testing.assert_allclose(np.array([extent[v] for v in dg]), exp)
+
+
+def test_get_nodes_pixels():
+    fig, ax = plt.subplots(figsize=(4, 2), dpi=100)
+    ax.set_xlim(0, 1)
+    ax.set_ylim(0, 1)
+    pixels = get_nodes_pixels(
+        extent={0: (0.4, 0.5, 0.4, 0.5), 1: (0, 0.2, 0, 0.1)}, ax=ax, dpi=200
+    )
+    plt.close(fig)
+    width = 4 * (0.9 - 0.125) * 200
+    assert pixels == {0: int(np.ceil(0.1 * width)), 1: int(np.ceil(0.2 * width))}
+
+
+def test_shrink_segments():
+    start = np.array([[0.0, 0.0], [0.0, 0.0]])
+    end = np.array([[10.0, 0.0], [0.0, 1.0]])
+    new_start, new_end, direction = shrink_segments(
+        start=start, end=end, shrink_start=2, shrink_end=2
+    )
+    np.testing.assert_allclose(new_start, [[2, 0], [0, 0.5]])
+    np.testing.assert_allclose(new_end, [[8, 0], [0, 0.5]])  # too short, collapsed
+    np.testing.assert_allclose(direction, [[1, 0], [0, 1]])
+
+
+@pytest.mark.parametrize("arrows", [True, False])
+def test_draw_edges(iris_data, arrows):
+    dg = clustree(data=iris_data, prefix="K", images=INPUT_DIR, draw=False)
+    pos = get_pos(dg=dg, orientation="vertical", layout="tidy")
+    fig, ax = plt.subplots(figsize=(3, 3), dpi=100)
+    draw_edges(dg=dg, pos=pos, ax=ax, node_size=900, arrows=arrows)
+    fig.canvas.draw()
+
+    lines = [c for c in ax.collections if isinstance(c, LineCollection)]
+    heads = [c for c in ax.collections if isinstance(c, PolyCollection)]
+    assert len(lines) == 1
+    assert len(heads) == int(arrows)
+    exp_colors = [
+        (*attr["edge_color"][:3], attr["in_prop"]) for *_, attr in dg.edges.data()
+    ]
+    np.testing.assert_allclose(lines[0].get_colors(), exp_colors)
+
+    segments = np.array(lines[0].get_segments())
+    assert len(segments) == dg.number_of_edges()
+    start, end = np.array([[pos[u], pos[v]] for u, v in dg.edges]).transpose(1, 0, 2)
+    to_display = ax.transData.transform
+    drawn = np.hypot(*(to_display(segments[:, 1]) - to_display(segments[:, 0])).T)
+    full = np.hypot(*(to_display(end) - to_display(start)).T)
+    if arrows:
+        pixels = fig.dpi / 72
+        shrink = (2 * marker_clearance(900) + HEAD_LENGTH) * pixels
+        np.testing.assert_allclose(drawn, full - shrink)
+        assert len(heads[0].get_paths()) == dg.number_of_edges()
+        np.testing.assert_allclose(heads[0].get_facecolors(), exp_colors)
+    else:
+        np.testing.assert_allclose(drawn, full)
+    plt.close(fig)
@@ -2,10 +2,29 @@ import os
 import tempfile
 from pathlib import Path
 
+import cv2
+import networkx as nx
+import numpy as np
+import pandas as pd
+import pytest
+
 from clustree._graph import clustree
-from clustree._hash import hash_node_id
+from clustree._hash import lookup_node_ids
 from tests.helpers import INPUT_DIR
 
+# edges of the iris clustree as (k_upper, k_start, k_end), clusters numbered from 1
+EDGES = [(2, 1, 1), (2, 1, 2), (3, 1, 1), (3, 1, 2), (3, 2, 2), (3, 2, 3)]
+
+
+def edge_set(dg: nx.DiGraph, edges: list[tuple[int, int, int]]) -> set:
+    """Node ids of edges (k_upper, k_start, k_end), looked up by (res, k)."""
+    node_res = np.array([dg.nodes[v]["res"] for v in range(len(dg))])
+    node_k = np.array([dg.nodes[v]["k"] for v in range(len(dg))])
+    k_upper, k_start, k_end = np.array(edges).T
+    start = lookup_node_ids(k_upper - 1, k_start, node_res=node_res, node_k=node_k)
+    end = lookup_node_ids(k_upper, k_end, node_res=node_res, node_k=node_k)
+    return set(zip(start.tolist(), end.tolist()))
+
 
 def test_clustree(iris_data):
     dg = clustree(
@@ -14,62 +33,41 @@ def test_clustree(iris_data):
 
     assert dg.number_of_edges() == 6
     assert dg.number_of_nodes() == 6
-    assert set(dg.edges) == {
-        (hash_node_id(1, 1), hash_node_id(2, 1)),
-        (hash_node_id(1, 1), hash_node_id(2, 2)),
-        (hash_node_id(2, 1), hash_node_id(3, 1)),
-        (hash_node_id(2, 1), hash_node_id(3, 2)),
-        (hash_node_id(2, 2), hash_node_id(3, 2)),
-        (hash_node_id(2, 2), hash_node_id(3, 3)),
-    }
+    assert set(dg.edges) == edge_set(dg, EDGES)
 
 
 def test_clustree_start_at_0(iris_data_0):
-    min_k_lower = 0
-    assert min_k_lower == 0
-    dg = clustree(
-        data=iris_data_0,
-        prefix="K",
-        images=INPUT_DIR,
-        draw=False,
-        output_path=None,
-        min_cluster_number=min_k_lower,
-    )
+    # min_cluster_number is deprecated, the result is the same without it
+    with pytest.warns(DeprecationWarning, match="min_cluster_number"):
+        dg = clustree(
+            data=iris_data_0,
+            prefix="K",
+            images=INPUT_DIR,
+            draw=False,
+            output_path=None,
+            min_cluster_number=0,
+        )
 
     assert dg.number_of_edges() == 6
     assert dg.number_of_nodes() == 6
-    assert set(dg.edges) == {
-        (hash_node_id(1, 0), hash_node_id(2, 0)),
-        (hash_node_id(1, 0), hash_node_id(2, 1)),
-        (hash_node_id(2, 0), hash_node_id(3, 0)),
-        (hash_node_id(2, 0), hash_node_id(3, 1)),
-        (hash_node_id(2, 1), hash_node_id(3, 1)),
-        (hash_node_id(2, 1), hash_node_id(3, 2)),
-    }
+    assert set(dg.edges) == edge_set(dg, [(r, s - 1, e - 1) for r, s, e in EDGES])
 
 
 def test_clustree_start_at_1(iris_data):
-    min_k_lower = 1
-    assert min_k_lower == 1
-    dg = clustree(
-        data=iris_data,
-        prefix="K",
-        images=INPUT_DIR,
-        draw=False,
-        output_path=None,
-        min_cluster_number=min_k_lower,
-    )
+    # min_cluster_number is deprecated, the result is the same without it
+    with pytest.warns(DeprecationWarning, match="min_cluster_number"):
+        dg = clustree(
+            data=iris_data,
+            prefix="K",
+            images=INPUT_DIR,
+            draw=False,
+            output_path=None,
+            min_cluster_number=1,
+        )
 
     assert dg.number_of_edges() == 6
     assert dg.number_of_nodes() == 6
-    assert set(dg.edges) == {
-        (hash_node_id(1, 1), hash_node_id(2, 1)),
-        (hash_node_id(1, 1), hash_node_id(2, 2)),
-        (hash_node_id(2, 1), hash_node_id(3, 1)),
-        (hash_node_id(2, 1), hash_node_id(3, 2)),
-        (hash_node_id(2, 2), hash_node_id(3, 2)),
-        (hash_node_id(2, 2), hash_node_id(3, 3)),
-    }
+    assert set(dg.edges) == edge_set(dg, EDGES)
 
 
 def test_clustree_start_none_data_0(iris_data_0):
@@ -82,14 +80,7 @@ def test_clustree_start_none_data_0(iris_data_0):
     )
     assert dg.number_of_edges() == 6
     assert dg.number_of_nodes() == 6
-    assert set(dg.edges) == {
-        (hash_node_id(1, 0), hash_node_id(2, 0)),
-        (hash_node_id(1, 0), hash_node_id(2, 1)),
-        (hash_node_id(2, 0), hash_node_id(3, 0)),
-        (hash_node_id(2, 0), hash_node_id(3, 1)),
-        (hash_node_id(2, 1), hash_node_id(3, 1)),
-        (hash_node_id(2, 1), hash_node_id(3, 2)),
-    }
+    assert set(dg.edges) == edge_set(dg, [(r, s - 1, e - 1) for r, s, e in EDGES])
 
 
 def test_clustree_start_none_data(iris_data):
@@ -102,14 +93,7 @@ def test_clustree_start_none_data(iris_data):
     )
     assert dg.number_of_edges() == 6
     assert dg.number_of_nodes() == 6
-    assert set(dg.edges) == {
-        (hash_node_id(1, 1), hash_node_id(2, 1)),
-        (hash_node_id(1, 1), hash_node_id(2, 2)),
-        (hash_node_id(2, 1), hash_node_id(3, 1)),
-        (hash_node_id(2, 1), hash_node_id(3, 2)),
-        (hash_node_id(2, 2), hash_node_id(3, 2)),
-        (hash_node_id(2, 2), hash_node_id(3, 3)),
-    }
+    assert set(dg.edges) == edge_set(dg, EDGES)
 
 
 def test_path_override_draw(iris_data):
@@ -126,3 +110,188 @@ def test_path_override_draw(iris_data):
             output_path=output_file,
         )
         assert os.path.isfile(output_file)
+
+
+def test_clustree_chunksize(iris_data):
+    exp = clustree(data=iris_data, prefix="K", images=INPUT_DIR, draw=False)
+    act = clustree(
+        data=INPUT_DIR + "iris.csv",
+        prefix="K",
+        images=INPUT_DIR,
+        draw=False,
+        chunksize=40,
+        node_color="sepal_length",
+        node_color_aggr="mean",
+    )
+    assert set(act.edges) == set(exp.edges)
+    assert [act.nodes[n]["samples"] for n in act] == [150, 70, 80, 45, 45, 60]
+    assert [act.edges[e]["samples"] for e in exp.edges] == [
+        exp.edges[e]["samples"] for e in exp.edges
+    ]
+
+
+def test_clustree_chunksize_nan(tmp_path, iris_data):
+    data = iris_data.copy()
+    data.loc[::5, "sepal_length"] = np.nan
+    path = tmp_path / "iris.csv"
+    data.to_csv(path, index=False)
+    style = dict(
+        prefix="K",
+        images=INPUT_DIR,
+        draw=False,
+        node_color="sepal_length",
+        node_color_aggr="mean",
+    )
+    exp = dict(clustree(data=data, **style).nodes.data("node_color"))
+    chunked = clustree(data=path, chunksize=40, **style)
+    assert dict(chunked.nodes.data("node_color")) == exp
+    counted = clustree(data=data.assign(n=1), count_col="n", **style)
+    assert dict(counted.nodes.data("node_color")) == exp
+
+
+def test_clustree_array(iris_data):
+    exp = clustree(data=iris_data, prefix="K", images=INPUT_DIR, draw=False)
+    act = clustree(
+        data=iris_data[["K1", "K2", "K3"]].to_numpy(),
+        prefix="K",
+        images=INPUT_DIR,
+        draw=False,
+    )
+    assert set(act.edges) == set(exp.edges)
+    assert dict(act.nodes.data("samples")) == dict(exp.nodes.data("samples"))
+
+
+def test_clustree_parquet(tmp_path, iris_data):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "iris.parquet"
+    iris_data.to_parquet(path)
+    exp = clustree(
+        data=iris_data,
+        prefix="K",
+        images=INPUT_DIR,
+        draw=False,
+        node_color="sepal_length",
+        node_color_aggr="median",
+    )
+    act = clustree(
+        data=path,
+        prefix="K",
+        images=INPUT_DIR,
+        draw=False,
+        node_color="sepal_length",
+        node_color_aggr="median",
+    )
+    assert set(act.edges) == set(exp.edges)
+    assert dict(act.nodes.data("node_color")) == dict(exp.nodes.data("node_color"))
+
+
+def test_graph_atlas(iris_data):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_file = Path(temp_dir) / "test_plot.png"
+        dg = clustree(
+            data=iris_data,
+            prefix="K",
+            images=INPUT_DIR,
+            output_path=output_file,
+            atlas=True,
+        )
+        assert os.path.isfile(output_file)
+        assert len(dg) == 6
+
+
+def test_clustree_resolution_cols(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 1_000
+    coarse = rng.integers(0, 200, n)
+    data = pd.DataFrame(
+        {
+            "leiden_1.0": coarse * 3 + rng.integers(0, 3, n),
+            "leiden_0.5": coarse,
+            "leiden_0.1": np.zeros(n, dtype=int),
+            "cell_type": rng.integers(0, 4, n),
+        }
+    )
+    for res in ["0.1", "0.5", "1.0"]:
+        for k in np.unique(data[f"leiden_{res}"]):
+            cv2.imwrite(str(tmp_path / f"{res}_{k}.png"), np.zeros((8, 8, 3)))
+    output_file = tmp_path / "test_plot.png"
+
+    dg = clustree(
+        data=data,
+        prefix="leiden_",
+        images=tmp_path,
+        output_path=output_file,
+        figsize=(10, 10),
+        dpi=50,
+    )
+    assert os.path.isfile(output_file)
+    assert dg.graph["resolutions"] == ["0.1", "0.5", "1.0"]
+    n_clusters = [data[col].nunique() for col in ["leiden_0.1", "leiden_0.5"]]
+    assert [res for _, res in dg.nodes.data("res")].count(2) == n_clusters[1]
+    assert len(dg) == n_clusters[0] + n_clusters[1] + data["leiden_1.0"].nunique()
+    assert all(samples > 0 for _, samples in dg.nodes.data("samples"))
+    # every cluster at resolution 1.0 has one parent at resolution 0.5
+    assert dg.number_of_edges() == len(dg) - 1
+
+
+def test_clustree_deduplicate(iris_data):
+    style = dict(node_color="sepal_length", node_color_aggr="mean")
+    exp = clustree(data=iris_data, prefix="K", images=INPUT_DIR, draw=False, **style)
+    act = clustree(
+        data=iris_data,
+        prefix="K",
+        images=INPUT_DIR,
+        draw=False,
+        deduplicate=True,
+        **style,
+    )
+    assert list(act.edges.data("samples")) == list(exp.edges.data("samples"))
+    assert dict(act.nodes.data("node_color")) == dict(exp.nodes.data("node_color"))
+
+
+def test_clustree_count_col(iris_data):
+    style = dict(node_color="sepal_length", node_color_aggr="mean")
+    exp = clustree(data=iris_data, prefix="K", images=INPUT_DIR, draw=False, **style)
+    # pre-aggregated: one row per path, with the mean sepal_length of its samples
+    paths = (
+        iris_data.groupby(["K1", "K2", "K3"])["sepal_length"]
+        .agg(["mean", "size"])
+        .reset_index()
+        .rename(columns={"mean": "sepal_length", "size": "n"})
+    )
+    act = clustree(
+        data=paths,
+        prefix="K",
+        images=INPUT_DIR,
+        draw=False,
+        count_col="n",
+        **style,
+    )
+    assert len(paths) == 4
+    assert list(act.edges.data("samples")) == list(exp.edges.data("samples"))
+    assert list(act.edges.data("in_prop")) == list(exp.edges.data("in_prop"))
+    assert np.allclose(
+        list(dict(act.nodes.data("node_color")).values()),
+        list(dict(exp.nodes.data("node_color")).values()),
+    )
+    with pytest.raises(ValueError):
+        clustree(data=paths, prefix="K", images=INPUT_DIR, draw=False, count_col="m")
+
+
+def test_clustree_prune_edges(iris_data):
+    dg = clustree(
+        data=iris_data,
+        prefix="K",
+        images=INPUT_DIR,
+        draw=False,
+        max_in_edges_per_node=1,
+    )
+    assert len(dg) == 6
+    assert all(dg.in_degree(node) <= 1 for node in dg)
+    assert sorted(samples for _, _, samples in dg.edges.data("samples")) == [
+        25,
+        45,
+        60,
+        70,
+        80,
+    ]
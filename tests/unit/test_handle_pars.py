@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from clustree._handle_pars import (
+    get_column,
+    get_columns,
+    get_membership,
+    get_membership_cols,
+    get_resolution_cols,
+    get_resolutions,
+    handle_data,
+)
+from tests.helpers import INPUT_DIR
+
+
+def test_get_columns(iris_data):
+    assert get_columns(data=INPUT_DIR + "iris.csv", prefix="K") == list(
+        iris_data.columns
+    )
+    assert get_columns(data=iris_data, prefix="K") == list(iris_data.columns)
+    assert get_columns(data=np.zeros((5, 3)), prefix="K") == ["K1", "K2", "K3"]
+
+
+def test_get_resolution_cols():
+    cols = ["K10", "sepal_length", "K2", "K1", "K2_old", "leiden_1.0"]
+    assert get_resolution_cols(cols=cols, prefix="K") == ["K1", "K2", "K10"]
+    assert get_resolution_cols(cols=cols, prefix="K", user_kk=2) == ["K1", "K2"]
+
+    cols = ["leiden_1.0", "leiden_0.4", "leiden_0.2", "leiden_10"]
+    membership_cols = get_resolution_cols(cols=cols, prefix="leiden_")
+    assert membership_cols == ["leiden_0.2", "leiden_0.4", "leiden_1.0", "leiden_10"]
+    assert get_resolutions(membership_cols=membership_cols, prefix="leiden_") == [
+        "0.2",
+        "0.4",
+        "1.0",
+        "10",
+    ]
+    with pytest.raises(ValueError):
+        get_resolution_cols(cols=cols, prefix="louvain_")
+
+
+def test_handle_data_projection():
+    data = handle_data(
+        data=INPUT_DIR + "iris.csv",
+        membership_cols=get_membership_cols(prefix="K", kk=3),
+        metadata_cols=["sepal_length"],
+    )
+    assert isinstance(data, pd.DataFrame)
+    assert set(data.columns) == {"K1", "K2", "K3", "sepal_length"}
+    assert (data[["K1", "K2", "K3"]].dtypes == np.int32).all()
+
+
+def test_handle_data_chunks():
+    chunks = list(
+        handle_data(
+            data=INPUT_DIR + "iris.csv",
+            membership_cols=get_membership_cols(prefix="K", kk=3),
+            chunksize=40,
+        )
+    )
+    assert [len(chunk) for chunk in chunks] == [40, 40, 40, 30]
+    assert list(chunks[0].columns) == ["K1", "K2", "K3"]
+
+
+def test_handle_data_npy(tmp_path, iris_data):
+    path = tmp_path / "membership.npy"
+    np.save(path, iris_data[["K1", "K2", "K3"]].to_numpy())
+    data = handle_data(data=path)
+    assert isinstance(data, np.memmap)
+    membership = get_membership(data=data, membership_cols=["K1", "K2", "K3"])
+    assert np.shares_memory(membership[1], data)
+    assert membership[2].tolist() == iris_data["K3"].tolist()
+    assert get_column(data=data, col="sepal_length") is None
+
+    chunks = list(handle_data(data=path, chunksize=100))
+    assert [len(chunk) for chunk in chunks] == [100, 50]
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".feather"])
+def test_handle_data_arrow_files(tmp_path, iris_data, suffix):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / f"iris{suffix}"
+    if suffix == ".parquet":
+        iris_data.to_parquet(path)
+    else:
+        iris_data.to_feather(path)
+    assert get_columns(data=path, prefix="K") == list(iris_data.columns)
+
+    table = handle_data(
+        data=path,
+        membership_cols=["K1", "K2", "K3"],
+        metadata_cols=["sepal_length", "not_a_column"],
+    )
+    assert set(table.schema.names) == {"K1", "K2", "K3", "sepal_length"}
+    assert get_column(data=table, col="K2").tolist() == iris_data["K2"].tolist()
+
+    chunks = list(
+        handle_data(data=path, membership_cols=["K1", "K2", "K3"], chunksize=40)
+    )
+    assert sum(chunk.num_rows for chunk in chunks) == 150
+    assert set(chunks[0].schema.names) == {"K1", "K2", "K3"}
+
+
+def test_get_column_arrow_zero_copy(iris_data):
+    pa = pytest.importorskip("pyarrow")
+    table = pa.Table.from_pandas(iris_data)
+    column = get_column(data=table, col="K3")
+    buffer = table.column("K3").chunk(0).buffers()[1]
+    assert column.ctypes.data == buffer.address
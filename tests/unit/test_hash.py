@@ -1,11 +1,18 @@
-from pairing_functions import szudzik
+import numpy as np
+import pytest
 
-from clustree._hash import hash_edge_id, hash_node_id
+from clustree._hash import lookup_node_ids
 
 
-def test_hash_node_id():
-    assert hash_node_id(k_lower=1, k_upper=4) == szudzik.pair(4, 1)
-
-
-def test_hash_edge_id():
-    assert hash_edge_id(k_upper=5, k_start=3, k_end=4) == szudzik.pair(5, 3, 4)
+def test_lookup_node_ids():
+    # resolution 2 observes clusters 0, 5 and 17 only
+    node_res = np.array([1, 2, 2, 2, 3])
+    node_k = np.array([0, 0, 5, 17, 3])
+    node_ids = lookup_node_ids(
+        k_upper=[3, 2, 2, 1], k_lower=[3, 17, 0, 0], node_res=node_res, node_k=node_k
+    )
+    assert node_ids.tolist() == [4, 3, 1, 0]
+    with pytest.raises(KeyError):
+        lookup_node_ids(k_upper=[2], k_lower=[1], node_res=node_res, node_k=node_k)
+    with pytest.raises(KeyError):
+        lookup_node_ids(k_upper=[3], k_lower=[30], node_res=node_res, node_k=node_k)
@@ -0,0 +1,122 @@
+import os
+import tempfile
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from clustree._images import (
+    ImageCache,
+    compose_atlas,
+    decode_image,
+    image_shape,
+    load_node_image,
+    prefetch_node_images,
+)
+
+BLUE = (0.0, 0.0, 1.0, 1.0)
+
+
+def test_image_cache_lru():
+    cache = ImageCache(max_bytes=250)
+    for key in ["a", "b"]:
+        cache.put(key, np.zeros(100, dtype=np.uint8))
+    assert cache.get("a") is not None  # b is now least recently used
+    cache.put("c", np.zeros(100, dtype=np.uint8))
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+    assert cache.info() == (2, 1, 1, 2, 200, 250)
+
+    cache.resize(max_bytes=100)
+    assert len(cache) == 1 and cache.get("c") is not None
+
+
+def test_load_node_image_cache():
+    cache = ImageCache()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = str(Path(temp_dir) / "1_1.png")
+        cv2.imwrite(path, np.full((20, 20, 3), 255, dtype=np.uint8))
+
+        img = load_node_image(
+            img_path=path, border_size_prop=0.1, border_color=BLUE, image_cache=cache
+        )
+        assert img.shape == (24, 24, 3)
+        assert img[0, 0].tolist() == [0, 0, 255]
+        assert not img.flags.writeable
+        again = load_node_image(
+            img_path=path, border_size_prop=0.1, border_color=BLUE, image_cache=cache
+        )
+        assert again is img
+        assert cache.info().hits == 1
+
+        # a modified file is decoded again
+        cv2.imwrite(path, np.zeros((10, 10, 3), dtype=np.uint8))
+        mtime = os.stat(path).st_mtime_ns + 10**9
+        os.utime(path, ns=(mtime, mtime))
+        img = load_node_image(
+            img_path=path, border_size_prop=0.1, border_color=BLUE, image_cache=cache
+        )
+        assert img.shape == (12, 12, 3)
+        assert cache.info().misses == 2
+
+
+def test_image_shape():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for ext in ["png", "jpg"]:
+            path = str(Path(temp_dir) / f"img.{ext}")
+            cv2.imwrite(path, np.zeros((30, 40, 3), dtype=np.uint8))
+            assert image_shape(path) == (30, 40)
+
+
+def test_load_node_image_downscale():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for ext in ["png", "jpg"]:
+            path = str(Path(temp_dir) / f"img.{ext}")
+            cv2.imwrite(path, np.full((800, 400, 3), 255, dtype=np.uint8))
+            assert decode_image(path, max_side=100).shape == (100, 50, 3)
+            assert decode_image(path, max_side=1000).shape == (800, 400, 3)
+
+            # border added after downscaling, bordered image fits target
+            img = load_node_image(
+                img_path=path,
+                border_size_prop=0.1,
+                border_color=BLUE,
+                target_size=120,
+                image_cache=None,
+            )
+            assert img.shape == (120, 70, 3)
+            assert img[0, 0].tolist() == [0, 0, 255]
+
+
+def test_prefetch_node_images():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        requests = []
+        for i in range(1, 6):
+            path = str(Path(temp_dir) / f"{i}.png")
+            cv2.imwrite(path, np.zeros((10 * i, 10, 3), dtype=np.uint8))
+            requests.append(dict(img_path=path, border_size_prop=0, border_color=BLUE))
+        cache = ImageCache()
+        images = prefetch_node_images(
+            requests=requests, image_cache=cache, max_workers=3
+        )
+        assert [img.shape[0] for img in images] == [10, 20, 30, 40, 50]
+        assert cache.info().misses == 5
+        sequential = prefetch_node_images(
+            requests=requests, image_cache=cache, max_workers=1
+        )
+        assert all(a is b for a, b in zip(images, sequential))
+
+
+def test_compose_atlas():
+    red = np.zeros((4, 4, 3), dtype=np.uint8)
+    red[..., 0] = 255
+    green = np.zeros((2, 2, 3), dtype=np.uint8)
+    green[..., 1] = 255
+    canvas = compose_atlas(
+        images=[red, green], boxes=np.array([[0, 4, 0, 4], [2, 6, 2, 6]]), shape=(6, 8)
+    )
+    assert canvas.shape == (6, 8, 4)
+    assert canvas[0, 0].tolist() == [255, 0, 0, 255]
+    assert canvas[3, 3].tolist() == [0, 255, 0, 255]  # later image on top
+    assert canvas[5, 5].tolist() == [0, 255, 0, 255]  # resized to fill its box
+    assert canvas[0, 7].tolist() == [0, 0, 0, 0]
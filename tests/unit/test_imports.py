@@ -0,0 +1,59 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import clustree
+from tests.helpers import INPUT_DIR
+
+DRAWING_MODULES = ["cv2", "matplotlib.pyplot"]
+
+
+def loaded_modules(code: str) -> set[str]:
+    """Modules loaded by running code in a fresh interpreter."""
+    script = f"import sys, json\n{code}\nprint(json.dumps(sorted(sys.modules)))"
+    env = dict(os.environ, PYTHONPATH=str(Path(clustree.__file__).parents[1]))
+    out = subprocess.run(
+        [sys.executable, "-c", script],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return set(json.loads(out.splitlines()[-1]))
+
+
+def test_import_loads_no_drawing_dependencies():
+    modules = loaded_modules("import clustree")
+    for module in DRAWING_MODULES + ["igraph", "matplotlib", "networkx"]:
+        assert module not in modules
+
+
+@pytest.mark.parametrize("draw", [False, True])
+def test_graph_loads_drawing_dependencies_on_draw(draw):
+    code = (
+        "import pandas as pd\n"
+        "from clustree import clustree\n"
+        f"data = pd.read_csv('{INPUT_DIR}iris.csv')\n"
+        f"clustree(data=data, prefix='K', images='{INPUT_DIR}', draw={draw})"
+    )
+    modules = loaded_modules(code)
+    for module in DRAWING_MODULES:
+        assert (module in modules) == draw
+    assert "igraph" not in modules  # only for layout='igraph' or to_igraph
+
+
+def test_clustree_graph_loads_no_networkx():
+    code = (
+        "import pandas as pd\n"
+        "from clustree import clustree\n"
+        f"data = pd.read_csv('{INPUT_DIR}iris.csv')\n"
+        f"clustree(data=data, prefix='K', images='{INPUT_DIR}', draw=False, "
+        "graph_type='clustree')"
+    )
+    modules = loaded_modules(code)
+    for module in DRAWING_MODULES + ["igraph", "networkx"]:
+        assert module not in modules
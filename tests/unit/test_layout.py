@@ -0,0 +1,127 @@
+import numpy as np
+
+from clustree._config import ClustreeConfig
+from clustree._draw import get_pos
+from clustree._graph import clustree
+from clustree._layout import (
+    dominant_parent,
+    layered_layout,
+    tidy_tree_layout,
+    weighted_crossings,
+)
+from clustree._model import COUNT_ONLY_CONFIG
+from tests.helpers import INPUT_DIR, hierarchical_membership
+
+
+def test_dominant_parent():
+    parent = dominant_parent(
+        n=5,
+        start=np.array([0, 0, 1, 2, 1]),
+        end=np.array([1, 2, 3, 3, 4]),
+        samples=np.array([3, 2, 1, 5, 2]),
+    )
+    assert parent.tolist() == [-1, 0, 0, 2, 1]
+
+
+def test_tidy_tree_layout():
+    # 0 -> (1, 2); 1 -> (3, 4); 2 -> 5; node 4 is shared, tie broken by lowest start
+    coords = tidy_tree_layout(
+        res=np.array([1, 2, 2, 3, 3, 3]),
+        start=np.array([0, 0, 1, 1, 2, 2]),
+        end=np.array([1, 2, 3, 4, 5, 4]),
+        samples=np.array([5, 5, 3, 1, 4, 1]),
+    )
+    assert coords[:, 1].tolist() == [1, 2, 2, 3, 3, 3]
+    assert coords[:, 0].tolist() == [0, -0.75, 0.75, -1.25, -0.25, 0.75]
+
+
+def test_tidy_tree_layout_orphans():
+    # nodes 4 and 5 have no incoming edges, placed apart from the tree
+    coords = tidy_tree_layout(
+        res=np.array([1, 2, 2, 3, 3, 3]),
+        start=np.array([0, 0, 1]),
+        end=np.array([1, 2, 3]),
+        samples=np.array([5, 5, 5]),
+    )
+    x = coords[coords[:, 1] == 3, 0]
+    assert np.all(np.diff(np.sort(x)) >= 1)
+
+
+def test_tidy_tree_layout_large():
+    kk = 100
+    cf = ClustreeConfig(
+        kk=kk,
+        data=hierarchical_membership(n=10_000, kk=kk, split="noisy", noise=0.3),
+        prefix="K",
+        _setup_cf=COUNT_ONLY_CONFIG,
+    )
+    coords = tidy_tree_layout(
+        res=cf.nodes.res,
+        start=cf.edges.start,
+        end=cf.edges.end,
+        samples=cf.edges.samples,
+    )
+    assert coords.shape == (len(cf.nodes), 2)
+    for k_upper in range(1, kk + 1):
+        x = np.sort(coords[coords[:, 1] == k_upper, 0])
+        assert np.all(np.diff(x) >= 1 - 1e-9)
+
+
+def test_get_pos_tidy(iris_data):
+    dg = clustree(data=iris_data, prefix="K", images=INPUT_DIR, draw=False)
+    pos = get_pos(dg=dg, orientation="vertical", layout="tidy")
+    assert set(pos) == set(dg.nodes)
+    xy = np.array(list(pos.values()))
+    assert xy.min() == 0 and xy.max() == 1
+    assert pos[0][1] == 1  # root at the top
+
+
+def test_weighted_crossings():
+    weights = np.array([[0.0, 5.0], [2.0, 0.0]])
+    assert weighted_crossings(weights, np.arange(2.0), np.arange(2.0)) == 10
+    assert weighted_crossings(weights, np.arange(2.0), np.array([1.0, 0.0])) == 0
+
+
+def test_layered_layout():
+    # 0 -> (1, 2); 1 -> 4; 2 -> 3, so 3 and 4 swap to remove the crossing
+    coords = layered_layout(
+        res=np.array([1, 2, 2, 3, 3]),
+        start=np.array([0, 0, 1, 2]),
+        end=np.array([1, 2, 4, 3]),
+        samples=np.array([1, 1, 5, 5]),
+    )
+    assert coords[:, 1].tolist() == [1, 2, 2, 3, 3]
+    assert coords[:, 0].tolist() == [0, -0.5, 0.5, 0.5, -0.5]
+
+
+def test_layered_layout_large():
+    kk = 50
+    cf = ClustreeConfig(
+        kk=kk,
+        data=hierarchical_membership(n=10_000, kk=kk, split="noisy", noise=0.3),
+        prefix="K",
+        _setup_cf=COUNT_ONLY_CONFIG,
+    )
+    args = dict(start=cf.edges.start, end=cf.edges.end, samples=cf.edges.samples)
+    coords = layered_layout(res=cf.nodes.res, **args)
+    initial = layered_layout(res=cf.nodes.res, max_sweeps=0, **args)
+
+    def crossings(xy: np.ndarray) -> float:
+        total = 0.0
+        for k_upper in range(2, kk + 1):
+            edges = cf.edges.res == k_upper
+            weights = np.zeros((k_upper - 1, k_upper))
+            k_start = cf.nodes.k[cf.edges.start[edges]] - 1
+            k_end = cf.nodes.k[cf.edges.end[edges]] - 1
+            weights[k_start, k_end] = cf.edges.samples[edges]
+            total += weighted_crossings(
+                weights,
+                xy[cf.nodes.res == k_upper - 1, 0],
+                xy[cf.nodes.res == k_upper, 0],
+            )
+        return total
+
+    assert crossings(coords) < crossings(initial)
+    for k_upper in range(1, kk + 1):
+        x = np.sort(coords[coords[:, 1] == k_upper, 0])
+        assert x.tolist() == (np.arange(k_upper) - (k_upper - 1) / 2).tolist()
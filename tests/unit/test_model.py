@@ -0,0 +1,122 @@
+import os
+import tempfile
+from pathlib import Path
+
+import matplotlib as mpl
+import numpy as np
+import pandas as pd
+import pytest
+
+from clustree import ClustreeModel, clear_image_cache, image_cache_info
+from clustree._graph import clustree
+from tests.helpers import INPUT_DIR
+
+
+def test_model_graph(iris_data):
+    model = ClustreeModel(data=iris_data, prefix="K")
+    exp = clustree(data=iris_data, prefix="K", images=INPUT_DIR, draw=False)
+    act = model.graph()
+    assert set(act.edges) == set(exp.edges)
+    assert dict(act.nodes.data("node_color")) == dict(exp.nodes.data("node_color"))
+    assert list(act.edges.data("edge_color")) == list(exp.edges.data("edge_color"))
+
+
+def test_model_graph_restyle(iris_data):
+    model = ClustreeModel(data=iris_data, prefix="K")
+    dg = model.graph()
+    assert model.graph() is dg
+
+    dg_fixed = model.graph(node_color="C1")
+    assert dg_fixed is not dg
+    assert dg_fixed.nodes[0]["node_color"] == mpl.colors.to_rgba("C1")
+    assert model.config.node_color_sm is None
+
+    dg_agg = model.graph(node_color="sepal_length", node_color_aggr="sum")
+    assert model.config.node_color_legend_title == "node: sum_sepal_length"
+    assert model.config.node_color_sm is not None
+
+    # colors are cached per style, switching back does not recompute
+    model.graph(node_color="C1")
+    assert len(model._node_colors) == 3
+    assert dg_agg.nodes[0]["node_color"] != dg_fixed.nodes[0]["node_color"]
+
+    dg_log = model.graph(node_color="samples", node_norm="log", edge_norm="quantile")
+    assert len(model._node_colors) == 4
+    assert len(model._edge_colors) == 2
+    exp = clustree(
+        data=iris_data,
+        prefix="K",
+        images=INPUT_DIR,
+        draw=False,
+        node_color="samples",
+        node_norm="log",
+        edge_norm="quantile",
+    )
+    assert dict(dg_log.nodes.data("node_color")) == dict(exp.nodes.data("node_color"))
+    assert list(dg_log.edges.data("edge_color")) == list(exp.edges.data("edge_color"))
+
+
+def test_model_render_cache(iris_data):
+    clear_image_cache()
+    model = ClustreeModel(data=iris_data, prefix="K")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_file = Path(temp_dir) / "test_plot.png"
+        model.render(images=INPUT_DIR, output_path=output_file)
+        assert os.path.isfile(output_file)
+        n_images = image_cache_info().n_images
+
+        model.render(images=INPUT_DIR, edge_color="C2", border_size=0.05)
+        assert len(model._pos) == 1
+        assert len(model._extent) == 1
+        assert image_cache_info().n_images == n_images
+
+        model.render(images=INPUT_DIR, orientation="horizontal")
+        assert len(model._pos) == 2
+        assert image_cache_info().n_images == n_images
+
+        model.render(images=INPUT_DIR, node_color="C7")
+        assert len(model._pos) == 2
+        assert image_cache_info().n_images == 2 * n_images
+
+
+def test_model_update(iris_data):
+    old, new = iris_data.iloc[:100], iris_data.iloc[100:]
+    style = dict(node_color="sepal_length", node_color_aggr="mean")
+    exp = ClustreeModel(data=iris_data, prefix="K").graph(**style)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        ClustreeModel(
+            data=old, prefix="K", metadata_cols=["sepal_length"], cache_dir=temp_dir
+        )
+        model = ClustreeModel(
+            data=old, prefix="K", metadata_cols=["sepal_length"], cache_dir=temp_dir
+        )
+        assert model._from_cache
+        model.render(images=INPUT_DIR, **style)
+        model.update(data=new)
+        assert model._cache is None
+        assert not model._pos
+        act = model.graph(**style)
+    assert dict(act.nodes.data("samples")) == dict(exp.nodes.data("samples"))
+    assert list(act.edges.data("in_prop")) == list(exp.edges.data("in_prop"))
+    assert np.allclose(
+        list(dict(act.nodes.data("node_color")).values()),
+        list(dict(exp.nodes.data("node_color")).values()),
+    )
+    with pytest.raises(ValueError, match="metadata_cols"):
+        model.graph(node_color="sepal_width", node_color_aggr="mean")
+
+
+def test_model_update_pruned_cache():
+    old = pd.DataFrame({"K1": 1, "K2": [1] * 50 + [2] * 50})
+    new = pd.DataFrame({"K1": [1, 1], "K2": [3, 3]})
+    pruning = dict(prefix="K", min_edge_samples=5)
+    exp = ClustreeModel(data=pd.concat([old, new]), **pruning).graph()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        ClustreeModel(data=old, cache_dir=temp_dir, **pruning)
+        model = ClustreeModel(data=old, cache_dir=temp_dir, **pruning)
+        assert model._from_cache
+        assert model.config.min_edge_samples == 5
+        model.update(data=new)
+    act = model.graph()
+    assert list(act.edges.data("samples")) == list(exp.edges.data("samples"))
+    assert [samples for *_, samples in act.edges.data("samples")] == [50, 50]
@@ -0,0 +1,109 @@
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from clustree import ClustreeModel, Profiler, clear_image_cache
+from clustree._graph import clustree
+from clustree._profile import profile_phase
+from tests.helpers import INPUT_DIR
+
+DRAW_PHASES = ["draw_edges", "images", "draw_nodes", "legend", "savefig"]
+
+
+def test_profiler_phase():
+    profiler = Profiler(trace_memory=True)
+    with profiler.phase("alloc") as counters:
+        x = np.ones(1 << 20)
+        counters["items"] = len(x)
+    del x
+    with profile_phase(profiler, "empty"):
+        pass
+
+    alloc, empty = profiler.records
+    assert alloc.name == "alloc"
+    assert alloc.seconds >= 0
+    assert alloc.peak_bytes >= 8 << 20
+    assert alloc.counters == {"items": 1 << 20}
+    assert empty.peak_bytes < 8 << 20
+    assert [r["name"] for r in profiler.report()] == ["alloc", "empty"]
+    assert profiler.report()[0]["items"] == 1 << 20
+    assert profiler.summary().splitlines()[0].startswith("alloc")
+
+
+def test_profiler_no_memory_tracing():
+    profiler = Profiler()
+    with profiler.phase("a"):
+        pass
+    assert profiler.records[0].peak_bytes is None
+
+
+def test_profile_phase_disabled():
+    with profile_phase(None, "a") as counters:
+        counters["n"] = 1  # accepted and discarded
+
+
+def test_clustree_profiler(iris_data):
+    clear_image_cache()
+    profiler = Profiler()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_path = str(Path(temp_dir) / "out.png")
+        clustree(
+            data=iris_data,
+            prefix="K",
+            images=INPUT_DIR,
+            output_path=output_path,
+            profiler=profiler,
+        )
+    names = [record.name for record in profiler.records]
+    assert names == [
+        "read",
+        "count",
+        "node_color",
+        "edge_color",
+        "construct",
+        "layout",
+        "extent",
+        *DRAW_PHASES,
+    ]
+    counters = {record.name: record.counters for record in profiler.records}
+    assert counters["count"] == {"nodes": 6, "edges": 6}
+    assert counters["images"]["images"] == 6
+    assert counters["images"]["images_decoded"] == 6
+    assert counters["savefig"]["bytes_written"] > 0
+
+
+def test_model_profiler_cached_phases(iris_data):
+    profiler = Profiler()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        model = ClustreeModel(
+            data=iris_data, prefix="K", cache_dir=temp_dir, profiler=profiler
+        )
+        assert [r.name for r in profiler.records] == [
+            "cache_load",
+            "read",
+            "count",
+            "cache_save",
+        ]
+        assert profiler.records[0].counters == {"hit": 0}
+        model.render(images=INPUT_DIR)
+        profiler.clear()
+
+        # layout, extent and colors are cached, images come from the image cache
+        model.render(images=INPUT_DIR)
+        assert [r.name for r in profiler.records] == DRAW_PHASES[:-1]
+        assert profiler.records[1].counters["images_decoded"] == 0
+
+        profiler.clear()
+        ClustreeModel(data=iris_data, prefix="K", cache_dir=temp_dir, profiler=profiler)
+        assert [r.name for r in profiler.records] == ["cache_load"]
+        assert profiler.records[0].counters == {"hit": 1}
+
+
+def test_model_profiler_input_bytes():
+    profiler = Profiler()
+    path = INPUT_DIR + "iris.csv"
+    ClustreeModel(data=path, prefix="K", profiler=profiler)
+    read = next(r for r in profiler.records if r.name == "read")
+    assert read.counters["input_bytes"] == os.path.getsize(path)
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from clustree._tables import NodeTable, TableView
+
+
+@pytest.fixture
+def node_table() -> NodeTable:
+    nodes = NodeTable(res=[1, 2, 2], k=[1, 1, 2])
+    nodes.samples = np.array([150, 70, 80])
+    return nodes
+
+
+def test_rows(node_table):
+    assert node_table.rows([2, 0]).tolist() == [2, 0]
+    with pytest.raises(KeyError):
+        node_table.rows([3])
+
+
+def test_table_view(node_table):
+    view = TableView(node_table)
+    assert len(view) == 3
+    assert list(view) == [0, 1, 2]
+    assert view[1] == {"k": 1, "res": 2, "samples": 70}
+    assert isinstance(view[1]["samples"], int)
+
+
+def test_table_view_color(node_table):
+    node_table.node_color = np.tile([0.1, 0.2, 0.3, 1.0], (3, 1))
+    assert TableView(node_table)[0]["node_color"] == (0.1, 0.2, 0.3, 1.0)